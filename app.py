@@ -1,20 +1,142 @@
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+import numpy as np
+from anyio import from_thread, to_thread
+
 from fastapi import FastAPI, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.responses import HTMLResponse, RedirectResponse
+from pydantic import BaseModel, Field, ValidationError
 from uvicorn import run as app_run
 
-from typing import Optional
+from typing import List, Optional
 
 # Importing constants and pipeline modules from the project
-from src.constants import APP_HOST, APP_PORT
-from src.pipline.prediction_pipeline import VehicleData, VehicleDataClassifier
-from src.pipline.training_pipeline import TrainingPipeline
+from src.constants import (APP_HOST, APP_PORT, METRICS_BATCH_SIZE_BUCKETS, METRICS_LATENCY_BUCKETS, MODEL_BUCKET_NAME,
+                           SERVING_WARM_UP_RETRY_SECONDS)
+from src.data_access.prediction_writer import PredictionWriter
+from src.logger import logging
+from src.pipline.prediction_pipeline import VehicleDataClassifier, build_vehicle_features_model, decode_features
+from src.utils.metrics import PROMETHEUS_CONTENT_TYPE, MetricsRegistry, RequestMetricsMiddleware
+
+
+async def warm_up_model():
+    """
+    Warms the model up in a worker thread, retrying until the model can be loaded.
+    Workers forked by server.py inherit a warm model and return immediately.
+    """
+    while not VehicleDataClassifier.is_ready():
+        try:
+            await asyncio.to_thread(VehicleDataClassifier().warm_up)
+        except Exception as e:
+            logging.info(f"Model warm-up failed, retrying in {SERVING_WARM_UP_RETRY_SECONDS}s: {e}")
+            await asyncio.sleep(SERVING_WARM_UP_RETRY_SECONDS)
+
+# Metrics of this worker process, served by /metrics
+metrics = MetricsRegistry()
+request_latency = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route",
+                                    METRICS_LATENCY_BUCKETS, labelnames=("route", "method", "status"))
+prediction_count = metrics.counter("predictions_total", "Predicted rows by route and class",
+                                   labelnames=("route", "prediction"))
+batch_size = metrics.histogram("prediction_batch_size_rows", "Rows per prediction request by route",
+                               METRICS_BATCH_SIZE_BUCKETS, labelnames=("route",))
+
+def count_predictions(route: str, labels: np.ndarray) -> None:
+    """Counts a request's predicted rows by class and its batch size"""
+    batch_size.observe(len(labels), (route,))
+    if len(labels) == 1:
+        prediction_count.inc(1, (route, str(int(labels[0]))))
+        return
+    for value, count in zip(*np.unique(labels, return_counts=True)):
+        prediction_count.inc(int(count), (route, str(int(value))))
+
+def collect_service_metrics():
+    """Values read at scrape time: model, prediction cache, executors and prediction writer"""
+    model_version = VehicleDataClassifier.get_model_version()
+    yield ("model_info", "gauge", "Version of the loaded model",
+           [({"version": model_version}, 1)] if model_version else [])
+    yield ("model_load_seconds", "gauge", "Seconds loading the model took",
+           [({}, VehicleDataClassifier.get_model_load_seconds())])
+    yield ("model_ready", "gauge", "1 once the model is loaded and warmed up",
+           [({}, int(VehicleDataClassifier.is_ready()))])
+
+    cache_stats = VehicleDataClassifier.prediction_cache.stats()
+    for name in ("hits", "misses", "evictions", "expirations"):
+        yield (f"prediction_cache_{name}_total", "counter", f"Prediction cache {name}", [({}, cache_stats[name])])
+    for name in ("entries", "bytes", "hit_rate"):
+        yield (f"prediction_cache_{name}", "gauge", f"Prediction cache {name}", [({}, cache_stats[name])])
+
+    # thread pool running the sync route handlers
+    limiter = to_thread.current_default_thread_limiter().statistics()
+    yield ("threadpool_busy_threads", "gauge", "Threads running sync handlers", [({}, limiter.borrowed_tokens)])
+    yield ("threadpool_queue_depth", "gauge", "Sync handlers waiting for a thread", [({}, limiter.tasks_waiting)])
+    if async_storage is not None:
+        yield ("storage_queue_depth", "gauge", "Storage calls waiting for a storage thread",
+               [({}, async_storage.queue_depth())])
+
+    writer_stats = prediction_writer.stats()
+    yield ("prediction_log_queue_depth", "gauge", "Prediction records waiting to be written",
+           [({}, writer_stats["queued"])])
+    for name in ("written", "dropped", "failed"):
+        yield (f"prediction_log_{name}_total", "counter", f"Prediction records {name}", [({}, writer_stats[name])])
+
+    # only reported once a MongoDB client exists, importing it here would load pymongo
+    if "src.configuration.mongo_db_connection" in sys.modules:
+        pool_stats = sys.modules["src.configuration.mongo_db_connection"].pool_metrics.stats()
+        yield ("mongodb_pool_checked_out", "gauge", "MongoDB connections in use", [({}, pool_stats["checked_out"])])
+        yield ("mongodb_pool_wait_seconds_total", "counter", "Time spent waiting for a MongoDB connection",
+               [({}, pool_stats["wait_seconds_total"])])
+
+metrics.register_collector(collect_service_metrics)
+
+# Storage client of the request handlers, created on first use so that importing the app
+# does not load the cloud clients
+async_storage = None
+
+def get_async_storage():
+    global async_storage
+    if async_storage is None:
+        from src.cloud_storage.async_storage import AsyncStorageService
+        async_storage = AsyncStorageService()
+    return async_storage
+
+# Background writer persisting served predictions to MongoDB
+prediction_writer = PredictionWriter()
+
+def prediction_records(route: str, instances: list, probabilities, predictions, threshold: float) -> List[dict]:
+    """
+    Builds the prediction log records of a request, one per row.
+    """
+    created_at = datetime.now(timezone.utc)
+    model_version = VehicleDataClassifier.get_model_version()
+    return [{"created_at": created_at, "route": route, "model_version": model_version,
+             "features": instance.model_dump(include=set(VehicleFeatures.model_fields)),
+             "probability": probability, "prediction": prediction, "threshold": threshold}
+            for instance, probability, prediction in zip(instances, probabilities.tolist(), predictions.tolist())]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts the model warm-up in the background, so that /healthz answers while it runs,
+    and the prediction writer, which flushes the queued records on shutdown
+    """
+    await prediction_writer.start()
+    warm_up_task = asyncio.create_task(warm_up_model())
+    yield
+    warm_up_task.cancel()
+    await prediction_writer.stop()
+    if async_storage is not None:
+        await asyncio.to_thread(async_storage.close)
 
 # Initialize FastAPI application
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Mount the 'static' directory for serving static files (like CSS)
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -22,6 +144,9 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Set up Jinja2 template engine for rendering HTML templates
 templates = Jinja2Templates(directory='templates')
 
+# Observe the latency of every request
+app.add_middleware(RequestMetricsMiddleware, histogram=request_latency)
+
 # Allow all origins for Cross-Origin Resource Sharing (CORS)
 origins = ["*"]
 
@@ -34,43 +159,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-class DataForm:
-    """
-    DataForm class to handle and process incoming form data.
-    This class defines the vehicle-related attributes expected from the form.
-    """
-    def __init__(self, request: Request):
-        self.request: Request = request
-        self.Gender: Optional[int] = None
-        self.Age: Optional[int] = None
-        self.Driving_License: Optional[int] = None
-        self.Region_Code: Optional[float] = None
-        self.Previously_Insured: Optional[int] = None
-        self.Annual_Premium: Optional[float] = None
-        self.Policy_Sales_Channel: Optional[float] = None
-        self.Vintage: Optional[int] = None
-        self.Vehicle_Age_lt_1_Year: Optional[int] = None
-        self.Vehicle_Age_gt_2_Years: Optional[int] = None
-        self.Vehicle_Damage_Yes: Optional[int] = None
-                
-
-    async def get_vehicle_data(self):
-        """
-        Method to retrieve and assign form data to class attributes.
-        This method is asynchronous to handle form data fetching without blocking.
-        """
-        form = await self.request.form()
-        self.Gender = form.get("Gender")
-        self.Age = form.get("Age")
-        self.Driving_License = form.get("Driving_License")
-        self.Region_Code = form.get("Region_Code")
-        self.Previously_Insured = form.get("Previously_Insured")
-        self.Annual_Premium = form.get("Annual_Premium")
-        self.Policy_Sales_Channel = form.get("Policy_Sales_Channel")
-        self.Vintage = form.get("Vintage")
-        self.Vehicle_Age_lt_1_Year = form.get("Vehicle_Age_lt_1_Year")
-        self.Vehicle_Age_gt_2_Years = form.get("Vehicle_Age_gt_2_Years")
-        self.Vehicle_Damage_Yes = form.get("Vehicle_Damage_Yes")
+# Typed request models generated from the model feature list
+VehicleFeatures = build_vehicle_features_model(VehicleDataClassifier.get_feature_names())
+
+class VehicleRequest(VehicleFeatures):
+    """
+    Single row prediction request, sent as form or JSON body, with an optional decision
+    threshold overriding the one stored with the model.
+    """
+    threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+
+class PredictRequest(BaseModel):
+    """
+    Batch prediction request: typed rows and an optional decision threshold overriding
+    the one stored with the model.
+    """
+    instances: List[VehicleFeatures]
+    threshold: Optional[float] = Field(default=None, ge=0.0, le=1.0)
+
+class RankRequest(BaseModel):
+    """
+    Ranking request: typed rows, of which the k most likely to respond are returned.
+    """
+    instances: List[VehicleFeatures]
+    k: int = Field(default=10, ge=1)
+
+def is_json_request(request: Request) -> bool:
+    return request.headers.get("content-type", "").startswith("application/json")
+
+async def parse_vehicle_request(request: Request) -> VehicleRequest:
+    """
+    Validates a form or JSON body into a VehicleRequest. Invalid input raises a
+    RequestValidationError, which FastAPI answers with 422.
+    """
+    if is_json_request(request):
+        try:
+            data = await request.json()
+        except ValueError:
+            raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": "Invalid JSON"}])
+    else:
+        # empty form fields count as missing
+        data = {key: value for key, value in (await request.form()).items() if value != ""}
+    try:
+        return VehicleRequest.model_validate(data)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False, include_input=False))
 
 # Route to render the main page with the form
 @app.get("/", tags=["authentication"])
@@ -79,7 +212,60 @@ async def index(request: Request):
     Renders the main HTML form page for vehicle data input.
     """
     return templates.TemplateResponse(
-            "vehicledata.html",{"request": request, "context": "Rendering"})
+            request, "vehicledata.html",{"context": "Rendering"})
+
+# Liveness probe: the process is up and its event loop responds
+@app.get("/healthz")
+async def healthz():
+    """
+    Liveness endpoint, independent of the model state.
+    """
+    return {"status": "ok"}
+
+# Readiness probe: only route traffic to replicas with a warm model
+@app.get("/readyz")
+async def readyz():
+    """
+    Readiness endpoint. Returns 503 until the model is loaded, its version is known
+    and the warm-up batches have run.
+    """
+    if VehicleDataClassifier.is_ready():
+        return {"status": "ready", "model_version": VehicleDataClassifier.get_model_version()}
+    return JSONResponse({"status": "warming up"}, status_code=503)
+
+# Hit rate and size of the prediction cache, to size PREDICTION_CACHE_MAX_BYTES
+@app.get("/cache/stats")
+async def cacheStats():
+    """
+    Returns the counters of the prediction cache of this worker process.
+    """
+    return VehicleDataClassifier.prediction_cache.stats()
+
+# Registry metadata of the production model, fetched without blocking the event loop
+@app.get("/model")
+async def modelRouteClient():
+    """
+    Returns the version served by this worker and the registry metadata of the current
+    production version.
+    """
+    try:
+        from src.entity.model_registry import ModelRegistry
+        storage = get_async_storage()
+        registry = ModelRegistry(bucket_name=MODEL_BUCKET_NAME, storage=storage.storage)
+        version = await storage.run(registry.get_production_version)
+        metadata = await storage.run(registry.get_metadata, version) if version else None
+        return {"served_version": VehicleDataClassifier.get_model_version(),
+                "production_version": version, "metadata": metadata}
+    except Exception as e:
+        return JSONResponse({"status": False, "error": f"{e}"}, status_code=503)
+
+# Prometheus scrape endpoint
+@app.get("/metrics")
+async def metricsRouteClient():
+    """
+    Returns the metrics of this worker process in the Prometheus text format.
+    """
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 # Route to trigger the model training process
 @app.get("/train")
@@ -88,6 +274,8 @@ async def trainRouteClient():
     Endpoint to initiate the model training pipeline.
     """
     try:
+        # imported here so that serving never loads the training stack
+        from src.pipline.training_pipeline import TrainingPipeline
         train_pipeline = TrainingPipeline()
         train_pipeline.run_pipeline()
         return Response("Training successful!!!")
@@ -99,47 +287,87 @@ async def trainRouteClient():
 @app.post("/")
 async def predictRouteClient(request: Request):
     """
-    Endpoint to receive form data, process it, and make a prediction.
+    Endpoint to receive form or JSON data, process it, and make a prediction.
     """
-    try:
-        form = DataForm(request)
-        await form.get_vehicle_data()
-        
-        vehicle_data = VehicleData(
-                                Gender= form.Gender,
-                                Age = form.Age,
-                                Driving_License = form.Driving_License,
-                                Region_Code = form.Region_Code,
-                                Previously_Insured = form.Previously_Insured,
-                                Annual_Premium = form.Annual_Premium,
-                                Policy_Sales_Channel = form.Policy_Sales_Channel,
-                                Vintage = form.Vintage,
-                                Vehicle_Age_lt_1_Year = form.Vehicle_Age_lt_1_Year,
-                                Vehicle_Age_gt_2_Years = form.Vehicle_Age_gt_2_Years,
-                                Vehicle_Damage_Yes = form.Vehicle_Damage_Yes
-                                )
-
-        # Convert form data into a DataFrame for the model
-        vehicle_df = vehicle_data.get_vehicle_input_data_frame()
+    vehicle_request = await parse_vehicle_request(request)
+    def predict():
+        # Decode the validated request straight into the model feature buffer
+        features = decode_features([vehicle_request])
 
         # Initialize the prediction pipeline
         model_predictor = VehicleDataClassifier()
 
         # Make a prediction and retrieve the result
-        value = model_predictor.predict(dataframe=vehicle_df)[0]
+        probability = model_predictor.predict_proba_array(features)
+        threshold = vehicle_request.threshold
+        if threshold is None:
+            threshold = model_predictor.get_decision_threshold()
+        return probability, threshold, model_predictor.label(probability, threshold=threshold)
+
+    try:
+        # the model call, and loading the model before the warm-up, would block the event loop
+        probability, threshold, labels = await asyncio.to_thread(predict)
+        value = labels[0]
+        count_predictions("/", labels)
+
+        if prediction_writer.enabled:
+            await prediction_writer.record(prediction_records("/", [vehicle_request], probability, labels, threshold))
+
+        if is_json_request(request):
+            return {"model_version": VehicleDataClassifier.get_model_version(),
+                    "probability": float(probability[0]), "prediction": int(value)}
 
         # Interpret the prediction result as 'Response-Yes' or 'Response-No'
         status = "Response-Yes" if value == 1 else "Response-No"
 
         # Render the same HTML page with the prediction result
         return templates.TemplateResponse(
+            request,
             "vehicledata.html",
-            {"request": request, "context": status},
+            {"context": status},
         )
         
     except Exception as e:
         return {"status": False, "error": f"{e}"}
 
+# Route to score a batch of rows with probabilities and labels
+@app.post("/predict")
+def predictBatchRouteClient(body: PredictRequest):
+    """
+    Returns the positive class probability and the label of every row, in request order.
+    """
+    classifier = VehicleDataClassifier()
+    probabilities = classifier.predict_proba_array(decode_features(body.instances))
+    threshold = classifier.get_decision_threshold() if body.threshold is None else body.threshold
+    predictions = classifier.label(probabilities, threshold=threshold)
+    count_predictions("/predict", predictions)
+    if prediction_writer.enabled:
+        # this handler runs in a worker thread, the writer queue lives on the event loop
+        from_thread.run(prediction_writer.record,
+                        prediction_records("/predict", body.instances, probabilities, predictions, threshold))
+    return {
+        "model_version": VehicleDataClassifier.get_model_version(),
+        "threshold": threshold,
+        "probabilities": probabilities.tolist(),
+        "predictions": predictions.tolist(),
+    }
+
+# Route to build lead lists: the k rows most likely to respond
+@app.post("/rank")
+def rankRouteClient(body: RankRequest):
+    """
+    Returns the positions of the k rows with the highest positive class probability in the
+    request, highest first, with their probabilities.
+    """
+    classifier = VehicleDataClassifier()
+    indices, probabilities = classifier.rank(decode_features(body.instances), k=body.k)
+    batch_size.observe(len(body.instances), ("/rank",))
+    return {
+        "model_version": VehicleDataClassifier.get_model_version(),
+        "indices": indices.tolist(),
+        "probabilities": probabilities.tolist(),
+    }
+
 # Main entry point to start the FastAPI server
 if __name__ == "__main__":
     app_run(app, host=APP_HOST, port=APP_PORT)
\ No newline at end of file
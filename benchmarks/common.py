@@ -0,0 +1,131 @@
+"""
+Shared helpers of the benchmark suites: latency statistics, JSON reports and the
+comparison of a report against a baseline. The synthetic data and model come from
+src.utils.synthetic_model.
+
+Every report has the same layout, so reports of two commits can be compared case by case:
+
+    {"benchmark": "inference", "environment": {...}, "config": {...},
+     "results": [{"name": ..., "batch_size": ..., "concurrency": ..., "p50_ms": ..., ...}]}
+"""
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from src.constants import BENCHMARK_MAX_REGRESSION, BENCHMARK_MIN_REPEATS, BENCHMARK_MIN_SECONDS
+
+# fields identifying a case in a report, the other fields are measurements
+CASE_KEY_FIELDS = ("name", "batch_size", "concurrency", "rows")
+
+
+def latency_summary(latencies: List[float], rows: int, wall_seconds: float) -> dict:
+    """
+    Summarizes per call latencies in seconds.
+    rows: rows processed by all calls together
+    wall_seconds: elapsed time of all calls, shorter than their sum when they ran concurrently
+    """
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99])
+    return {
+        "calls": len(latencies),
+        "p50_ms": round(float(p50), 4),
+        "p95_ms": round(float(p95), 4),
+        "p99_ms": round(float(p99), 4),
+        "mean_ms": round(float(latencies_ms.mean()), 4),
+        "max_ms": round(float(latencies_ms.max()), 4),
+        "rows_per_second": round(rows / wall_seconds, 2) if wall_seconds > 0 else None,
+    }
+
+
+def time_calls(func: Callable[[], object], rows_per_call: int, min_seconds: float = BENCHMARK_MIN_SECONDS,
+               min_repeats: int = BENCHMARK_MIN_REPEATS, warm_up: int = 1) -> dict:
+    """
+    Calls func sequentially, after warm_up untimed calls, until it ran for min_seconds and
+    at least min_repeats times, and summarizes the latencies.
+    """
+    for _ in range(warm_up):
+        func()
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < min_repeats or time.perf_counter() - start < min_seconds:
+        call_start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - call_start)
+    return latency_summary(latencies, rows_per_call * len(latencies), time.perf_counter() - start)
+
+
+def environment() -> dict:
+    """Describes the commit and machine a report was measured on"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except Exception:
+        commit = None
+    versions = {}
+    for package in ("numpy", "pandas", "sklearn", "fastapi"):
+        try:
+            versions[package] = __import__(package).__version__
+        except ImportError:
+            versions[package] = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def write_report(report: dict, output_path: str) -> None:
+    """Writes a report as JSON, creating its directory"""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    print(f"Report written to {output_path}")
+
+
+def case_key(result: dict) -> Tuple:
+    return tuple(result.get(field) for field in CASE_KEY_FIELDS)
+
+
+def compare_reports(report: dict, baseline: dict, max_regression: float = BENCHMARK_MAX_REGRESSION) -> List[str]:
+    """
+    Compares the cases of a report with the same cases of a baseline report.
+    Returns: one line per case whose p95 latency, or wall time and peak memory for the
+             pipeline benchmark, grew or whose throughput fell by more than max_regression,
+             empty if none did
+    """
+    baseline_results = {case_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        before = baseline_results.get(case_key(result))
+        if before is None:
+            continue
+        for field, higher_is_worse in (("p95_ms", True), ("wall_seconds", True), ("peak_rss_bytes", True),
+                                       ("rows_per_second", False)):
+            old, new = before.get(field), result.get(field)
+            if not old or new is None:
+                continue
+            change = (new - old) / old if higher_is_worse else (old - new) / old
+            if change > max_regression:
+                regressions.append(f"{case_key(result)} {field}: {old} -> {new} ({change:+.0%} worse)")
+    return regressions
+
+
+def check_against_baseline(report: dict, baseline_path: Optional[str], max_regression: float) -> int:
+    """Prints the regressions against the baseline report, if given, and returns the exit code"""
+    if not baseline_path:
+        return 0
+    with open(baseline_path) as baseline_file:
+        regressions = compare_reports(report, json.load(baseline_file), max_regression)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regressions over {max_regression:.0%} against {baseline_path}")
+    return 1 if regressions else 0
@@ -0,0 +1,178 @@
+"""
+Inference latency and throughput benchmark.
+
+    python -m benchmarks.inference                                   # full suite
+    python -m benchmarks.inference --batch-sizes 1 100 --concurrency 1 8 --min-seconds 0.5
+    python -m benchmarks.inference --baseline benchmark_results/inference_main.json
+
+Measures, on a model trained on synthetic data and without any storage or database:
+    model_predict        MyModel.predict, or CompiledModel.predict with --model-format compiled
+    classifier_predict   VehicleDataClassifier.predict
+    http_single          POST / with one JSON row
+    http_predict         POST /predict
+    http_rank            POST /rank
+The in-process cases run sequentially over the batch sizes; the HTTP cases run over the
+HTTP batch sizes at every concurrency level, through httpx's ASGI transport, so they
+include routing, validation and JSON encoding but no network. Request bodies are encoded
+before timing starts.
+
+The prediction cache is disabled unless --with-cache is given, in which case the repeated
+batches measure cache hits. With --baseline, the exit code is 1 if any case regressed by
+more than --max-regression. The HTTP cases need httpx, from the benchmarks extra:
+pip install -e .[benchmarks]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import check_against_baseline, environment, latency_summary, time_calls, write_report
+from src.constants import (BENCHMARK_BATCH_SIZES, BENCHMARK_CONCURRENCY_LEVELS, BENCHMARK_HTTP_BATCH_SIZES,
+                           BENCHMARK_HTTP_MAX_ROWS_IN_FLIGHT, BENCHMARK_MAX_REGRESSION, BENCHMARK_MIN_REPEATS,
+                           BENCHMARK_MIN_SECONDS, BENCHMARK_RESULTS_DIR, BENCHMARK_TRAIN_ROWS)
+from src.pipline.prediction_pipeline import VehicleDataClassifier
+from src.utils.prediction_cache import PredictionCache
+from src.utils.synthetic_model import build_synthetic_model, generate_features
+
+MODEL_VERSION = "benchmark"
+
+
+def prepare_model(train_rows: int, model_format: str, random_state: int = 0):
+    """
+    Trains the synthetic model and returns it in the requested format; the compiled model
+    is saved and mapped from a temporary file like a served one.
+    """
+    model = build_synthetic_model(train_rows, random_state)
+    if model_format == "compiled":
+        from src.entity.compiled_model import load_compiled_model, save_compiled_model
+        model_file = os.path.join(tempfile.mkdtemp(prefix="benchmark_model_"), "model.bin")
+        save_compiled_model(model_file, model)
+        model = load_compiled_model(model_file)
+    return model
+
+
+def install_model(model, with_cache: bool) -> None:
+    """Makes the model the warm model of VehicleDataClassifier, as after a warm-up"""
+    VehicleDataClassifier._model = model
+    VehicleDataClassifier._model_version = MODEL_VERSION
+    VehicleDataClassifier._model_load_seconds = 0.0
+    VehicleDataClassifier._is_warm = True
+    VehicleDataClassifier.prediction_cache = PredictionCache() if with_cache else PredictionCache(max_bytes=0)
+
+
+def run_in_process(model, batch_sizes, min_seconds: float, min_repeats: int) -> list:
+    results = []
+    classifier = VehicleDataClassifier()
+    for batch_size in batch_sizes:
+        features = generate_features(batch_size, random_state=batch_size)
+        for name, func in (("model_predict", lambda: model.predict(features)),
+                           ("classifier_predict", lambda: classifier.predict(features))):
+            summary = time_calls(func, batch_size, min_seconds=min_seconds, min_repeats=min_repeats)
+            results.append(report_case(name, batch_size, 1, summary))
+    return results
+
+
+async def run_http_case(client, path: str, body: bytes, rows_per_request: int, concurrency: int,
+                        min_seconds: float, min_repeats: int) -> dict:
+    """
+    Sends the same request from concurrency concurrent clients until min_seconds passed and
+    at least min_repeats requests were answered, and summarizes the latencies.
+    """
+    headers = {"content-type": "application/json"}
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + min_seconds
+
+    async def send_requests():
+        while True:
+            request_start = time.perf_counter()
+            response = await client.post(path, content=body, headers=headers)
+            latencies.append(time.perf_counter() - request_start)
+            if response.status_code != 200 or "error" in response.json():
+                raise Exception(f"{path} answered {response.status_code}: {response.text[:500]}")
+            if time.perf_counter() >= deadline and len(latencies) >= min_repeats:
+                return
+
+    await asyncio.gather(*(send_requests() for _ in range(concurrency)))
+    return latency_summary(latencies, rows_per_request * len(latencies), time.perf_counter() - start)
+
+
+async def run_http(http_batch_sizes, concurrency_levels, min_seconds: float, min_repeats: int) -> list:
+    import httpx
+    from app import app
+
+    # the client logs every request at INFO, which would be measured with it
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    cases = []
+    for batch_size in http_batch_sizes:
+        instances = generate_features(batch_size, random_state=batch_size).to_dict(orient="records")
+        if batch_size == 1:
+            cases.append(("http_single", "/", 1, json.dumps(instances[0]).encode()))
+        cases.append(("http_predict", "/predict", batch_size, json.dumps({"instances": instances}).encode()))
+        cases.append(("http_rank", "/rank", batch_size, json.dumps({"instances": instances, "k": 10}).encode()))
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for name, path, batch_size, body in cases:
+            # one untimed request, the first one pays for route and thread pool setup
+            await run_http_case(client, path, body, batch_size, 1, 0, 1)
+            for concurrency in concurrency_levels:
+                if batch_size * concurrency > BENCHMARK_HTTP_MAX_ROWS_IN_FLIGHT:
+                    print(f"Skipping {name} batch {batch_size} x concurrency {concurrency}, "
+                          f"over {BENCHMARK_HTTP_MAX_ROWS_IN_FLIGHT} rows in flight")
+                    continue
+                summary = await run_http_case(client, path, body, batch_size, concurrency, min_seconds, min_repeats)
+                results.append(report_case(name, batch_size, concurrency, summary))
+    return results
+
+
+def report_case(name: str, batch_size: int, concurrency: int, summary: dict) -> dict:
+    result = {"name": name, "batch_size": batch_size, "concurrency": concurrency, **summary}
+    print(f"{name:<20} batch {batch_size:>7} concurrency {concurrency:>4}  p50 {summary['p50_ms']:>10.3f} ms  "
+          f"p95 {summary['p95_ms']:>10.3f} ms  p99 {summary['p99_ms']:>10.3f} ms  "
+          f"{summary['rows_per_second']:>12.1f} rows/s")
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark inference latency and throughput.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BENCHMARK_BATCH_SIZES))
+    parser.add_argument("--http-batch-sizes", type=int, nargs="+", default=list(BENCHMARK_HTTP_BATCH_SIZES))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(BENCHMARK_CONCURRENCY_LEVELS))
+    parser.add_argument("--train-rows", type=int, default=BENCHMARK_TRAIN_ROWS)
+    parser.add_argument("--model-format", choices=("dill", "compiled"), default="dill")
+    parser.add_argument("--with-cache", action="store_true", help="keep the prediction cache enabled")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--min-seconds", type=float, default=BENCHMARK_MIN_SECONDS)
+    parser.add_argument("--min-repeats", type=int, default=BENCHMARK_MIN_REPEATS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_RESULTS_DIR, "inference.json"))
+    parser.add_argument("--baseline", help="report of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float, default=BENCHMARK_MAX_REGRESSION)
+    args = parser.parse_args(argv)
+
+    np.random.seed(args.seed)
+    model = prepare_model(args.train_rows, args.model_format, args.seed)
+    install_model(model, args.with_cache)
+
+    results = run_in_process(model, args.batch_sizes, args.min_seconds, args.min_repeats)
+    if not args.skip_http:
+        results += asyncio.run(run_http(args.http_batch_sizes, args.concurrency, args.min_seconds, args.min_repeats))
+
+    report = {"benchmark": "inference", "environment": environment(),
+              "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+              "results": results}
+    write_report(report, args.output)
+    return check_against_baseline(report, args.baseline, args.max_regression)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
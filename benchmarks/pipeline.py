@@ -0,0 +1,173 @@
+"""
+Training pipeline benchmark at growing collection sizes.
+
+    python -m benchmarks.pipeline                                    # 100k, 1M and 10M rows
+    python -m benchmarks.pipeline --rows 100000 --timeout 1800
+    python -m benchmarks.pipeline --rows 100000 --baseline benchmark_results/pipeline_main.json
+
+For every size a synthetic collection with the distributions of config/schema.yaml is
+generated once into the work directory by SyntheticDataGenerator, then TrainingPipeline
+runs in a fresh process, so that the peak memory of one size does not carry over to the
+next. The run uses local stand-ins instead of the
+services: the collection is read from the generated file instead of MongoDB, and the
+model registry is a local storage directory instead of S3. Its artifacts and the log of the
+run stay in the work directory.
+
+The report holds the wall time, CPU time, peak RSS and rows of every stage recorded by the
+pipeline's StageProfiler, plus the whole run as the "pipeline" case. With --baseline, the
+exit code is 1 if any stage regressed by more than --max-regression.
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import check_against_baseline, environment, write_report
+from src.constants import (BENCHMARK_MAX_REGRESSION, BENCHMARK_PIPELINE_ROWS, BENCHMARK_RESULTS_DIR,
+                           BENCHMARK_WORK_DIR, LOCAL_STORAGE_DIR_ENV_KEY, MODEL_CACHE_DIR_ENV_KEY,
+                           STORAGE_BACKEND_ENV_KEY)
+from src.data_access.synthetic_data import SyntheticDataGenerator
+from src.utils.profiler import profile_stage
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FileCollectionData:
+    """
+    Stand-in for Proj1Data that exports the collection from a CSV file, as MongoDB would
+    return it, so that the pipeline runs without a database.
+    """
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None) -> pd.DataFrame:
+        with profile_stage("mongo_fetch") as stage:
+            df = pd.read_csv(self.file_path)
+            stage.rows_out = len(df)
+        if "id" in df.columns.to_list():
+            df = df.drop(columns=["id"])
+        df.replace({"na": np.nan}, inplace=True)
+        return df
+
+
+def generate_collection(rows: int, work_dir: str, random_state: int) -> tuple:
+    """
+    Writes the synthetic collection of a size, unless an earlier run already did.
+    Returns: the file path and the seconds generating it took, 0 if it was reused
+    """
+    file_path = os.path.join(os.path.abspath(work_dir), f"collection_{rows}_{random_state}.csv")
+    if os.path.exists(file_path):
+        return file_path, 0.0
+    os.makedirs(work_dir, exist_ok=True)
+    start = time.perf_counter()
+    generator = SyntheticDataGenerator(random_state=random_state)
+    for chunk_index, chunk in enumerate(generator.iter_chunks(rows)):
+        # the ObjectId MongoDB adds to every record, exported with the collection
+        chunk.insert(0, "_id", np.char.mod("%024x", chunk["id"].to_numpy()))
+        chunk.to_csv(file_path + ".tmp", mode="w" if chunk_index == 0 else "a", header=chunk_index == 0, index=False)
+    os.replace(file_path + ".tmp", file_path)
+    return file_path, time.perf_counter() - start
+
+
+def run_pipeline_process(rows: int, data_file: str, work_dir: str, timeout: Optional[float]) -> tuple:
+    """
+    Runs the training pipeline on a collection file in a child process whose working
+    directory is a fresh run directory.
+    Returns: the status of the run, its profile, None if it wrote none, and the run directory
+    """
+    run_dir = os.path.abspath(os.path.join(work_dir, f"run_{rows}_{int(time.time())}"))
+    os.makedirs(run_dir)
+    # the pipeline reads config/ relative to its working directory
+    os.symlink(os.path.join(PROJECT_ROOT, "config"), os.path.join(run_dir, "config"))
+    env = {**os.environ,
+           "PYTHONPATH": os.pathsep.join(filter(None, [PROJECT_ROOT, os.getenv("PYTHONPATH")])),
+           STORAGE_BACKEND_ENV_KEY: "local",
+           LOCAL_STORAGE_DIR_ENV_KEY: os.path.join(run_dir, "local_storage"),
+           MODEL_CACHE_DIR_ENV_KEY: os.path.join(run_dir, "model_cache")}
+    command = [sys.executable, "-m", "benchmarks.pipeline", "--child", "--data-file", data_file]
+    with open(os.path.join(run_dir, "pipeline.log"), "w") as log_file:
+        try:
+            result = subprocess.run(command, cwd=run_dir, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+                                    timeout=timeout)
+            status = "ok" if result.returncode == 0 else "failed"
+        except subprocess.TimeoutExpired:
+            status = "timeout"
+    profile_files = glob.glob(os.path.join(run_dir, "artifact", "*", "profile.json"))
+    if not profile_files:
+        return status, None, run_dir
+    with open(profile_files[0]) as profile_file:
+        return status, json.load(profile_file), run_dir
+
+
+def profile_results(rows: int, status: str, profile: Optional[dict], generate_seconds: float) -> list:
+    """Turns the profile of a run into report cases, one per stage and one for the whole run"""
+    results = [{"name": "pipeline", "rows": rows, "status": status, "generate_seconds": round(generate_seconds, 3),
+                "wall_seconds": round(profile["wall_seconds"], 3) if profile else None,
+                "peak_rss_bytes": max((stage["peak_rss_bytes"] or 0 for stage in profile["stages"]), default=None)
+                if profile else None}]
+    for stage in (profile or {}).get("stages", []):
+        results.append({"name": stage["path"], "rows": rows, "rows_in": stage["rows_in"],
+                        "rows_out": stage["rows_out"], "wall_seconds": round(stage["wall_seconds"], 3),
+                        "cpu_seconds": round(stage["cpu_seconds"], 3), "peak_rss_bytes": stage["peak_rss_bytes"],
+                        "error": stage["error"]})
+    return results
+
+
+def print_results(results: list) -> None:
+    for result in results:
+        peak_mib = (result["peak_rss_bytes"] or 0) / 2 ** 20
+        wall = f"{result['wall_seconds']:>9.2f} s" if result["wall_seconds"] is not None else "        - s"
+        status = f"  {result['status']}" if "status" in result else ""
+        print(f"{result['rows']:>9} rows  {result['name']:<60} {wall}  {peak_mib:>8.0f} MiB{status}")
+
+
+def run_child(data_file: str) -> int:
+    """Entry point of the child process: runs the whole pipeline on the collection file"""
+    from src.pipline.training_pipeline import TrainingPipeline
+    TrainingPipeline(proj1_data=FileCollectionData(data_file)).run_pipeline()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the training pipeline at growing collection sizes.")
+    parser.add_argument("--rows", type=int, nargs="+", default=list(BENCHMARK_PIPELINE_ROWS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, help="seconds after which the run of a size is stopped")
+    parser.add_argument("--work-dir", default=BENCHMARK_WORK_DIR)
+    parser.add_argument("--output", default=os.path.join(BENCHMARK_RESULTS_DIR, "pipeline.json"))
+    parser.add_argument("--baseline", help="report of a previous run to compare with")
+    parser.add_argument("--max-regression", type=float, default=BENCHMARK_MAX_REGRESSION)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--data-file", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(args.data_file)
+
+    results = []
+    for rows in args.rows:
+        data_file, generate_seconds = generate_collection(rows, args.work_dir, args.seed)
+        status, profile, run_dir = run_pipeline_process(rows, data_file, args.work_dir, args.timeout)
+        size_results = profile_results(rows, status, profile, generate_seconds)
+        print_results(size_results)
+        if status != "ok":
+            print(f"The run of {rows} rows ended with status {status}, see {os.path.join(run_dir, 'pipeline.log')}")
+        results += size_results
+
+    report = {"benchmark": "pipeline", "environment": environment(),
+              "config": {key: value for key, value in vars(args).items()
+                         if key not in ("output", "baseline", "child", "data_file")},
+              "results": results}
+    write_report(report, args.output)
+    return check_against_baseline(report, args.baseline, args.max_regression)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+import uvicorn
+
+from src.constants import (APP_HOST, APP_PORT, SERVING_GRACEFUL_TIMEOUT, SERVING_LISTEN_BACKLOG,
+                           SERVING_WORKER_READY_TIMEOUT, SERVING_WORKERS_ENV_KEY)
+from src.exception import MyException
+from src.logger import logging, stop_logging
+from src.pipline.prediction_pipeline import VehicleDataClassifier
+from app import app
+
+
+class ServingMaster:
+    """
+    Pre-forking master process of the prediction server.
+
+    The master binds the listening socket once, loads and warms the model and then forks
+    the uvicorn workers, which all accept connections from the inherited socket. Workers
+    therefore start with the model already in memory, shared with the master.
+    SIGHUP reloads the model and replaces the workers one at a time: a new worker is
+    started and has to report ready before the old one is asked to drain its connections
+    and exit, so there is always a full set of workers accepting connections.
+    SIGTERM and SIGINT drain all workers and stop the server.
+    """
+    def __init__(self, host: str = APP_HOST, port: int = APP_PORT, workers: int = None):
+        """
+        host, port: address to listen on
+        workers: number of worker processes, defaults to the SERVING_WORKERS environment
+                 variable and then to the number of cores
+        """
+        self.host = host
+        self.port = port
+        self.worker_count = workers or int(os.getenv(SERVING_WORKERS_ENV_KEY, os.cpu_count() or 1))
+        self.sock: socket.socket = None
+        self.workers = set()
+        self._pending_signals = []
+        self._stopping = False
+
+    def bind(self) -> None:
+        """Creates the listening socket shared by all workers"""
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(SERVING_LISTEN_BACKLOG)
+        self.sock.set_inheritable(True)
+        logging.info(f"Listening on {self.host}:{self.port}")
+
+    def preload(self) -> None:
+        """
+        Loads and warms up the production model, so that forked workers inherit a warm model
+        and report ready right away. If the model cannot be loaded, workers load it on their first request.
+        """
+        try:
+            VehicleDataClassifier.preload_shared_model()
+            VehicleDataClassifier().warm_up()
+            logging.info(f"Preloaded model version {VehicleDataClassifier.get_model_version()}")
+        except Exception as e:
+            logging.info(f"Model could not be preloaded, workers load it on their first request: {e}")
+        # keep the preloaded objects out of the garbage collector, which would otherwise
+        # touch them in every worker and turn the shared pages into private copies
+        gc.freeze()
+
+    def _run_worker(self, ready_fd: int) -> None:
+        """Runs uvicorn on the shared socket in a forked worker process"""
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, signal.SIG_DFL)
+        config = uvicorn.Config(app, timeout_graceful_shutdown=SERVING_GRACEFUL_TIMEOUT)
+        server = uvicorn.Server(config)
+
+        def notify_ready():
+            while not server.started and not server.should_exit:
+                time.sleep(0.05)
+            os.write(ready_fd, b"1" if server.started else b"0")
+            os.close(ready_fd)
+
+        threading.Thread(target=notify_ready, daemon=True).start()
+        server.run(sockets=[self.sock])
+
+    def spawn_worker(self) -> tuple:
+        """
+        Forks a worker process.
+        Returns: pid of the worker and the file descriptor it reports readiness on
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            exit_code = 0
+            try:
+                self._run_worker(write_fd)
+            except BaseException as e:
+                logging.info(f"Worker {os.getpid()} failed: {e}")
+                exit_code = 1
+            finally:
+                # os._exit skips atexit, the queued log records are written out here
+                stop_logging()
+                os._exit(exit_code)
+        os.close(write_fd)
+        self.workers.add(pid)
+        logging.info(f"Started worker {pid}")
+        return pid, read_fd
+
+    @staticmethod
+    def wait_ready(read_fd: int, timeout: float = SERVING_WORKER_READY_TIMEOUT) -> bool:
+        """Waits until a new worker accepts connections"""
+        try:
+            readable, _, _ = select.select([read_fd], [], [], timeout)
+            return bool(readable) and os.read(read_fd, 1) == b"1"
+        finally:
+            os.close(read_fd)
+
+    def stop_worker(self, pid: int, timeout: float = SERVING_GRACEFUL_TIMEOUT + 5, send_signal: bool = True) -> None:
+        """
+        Asks a worker to drain its connections and exit, killing it after the timeout.
+        send_signal: False if the worker was already sent SIGTERM, as uvicorn force exits on a second one
+        """
+        self.workers.discard(pid)
+        try:
+            if send_signal:
+                os.kill(pid, signal.SIGTERM)
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if os.waitpid(pid, os.WNOHANG)[0] == pid:
+                    logging.info(f"Stopped worker {pid}")
+                    return
+                time.sleep(0.1)
+            logging.info(f"Worker {pid} did not stop within {timeout}s, killing it")
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+        except ProcessLookupError:
+            pass
+
+    def reload(self) -> None:
+        """Reloads the model in the master and replaces the workers one at a time"""
+        logging.info("Entered the reload method of ServingMaster class")
+        self.preload()
+        for old_pid in list(self.workers):
+            if self._stopping:
+                break
+            new_pid, ready_fd = self.spawn_worker()
+            if not self.wait_ready(ready_fd):
+                logging.info(f"Worker {new_pid} did not become ready, keeping the remaining old workers")
+                self.stop_worker(new_pid, timeout=0)
+                return
+            self.stop_worker(old_pid)
+        logging.info("Exited the reload method of ServingMaster class")
+
+    def reap_workers(self) -> None:
+        """Collects exited workers and replaces the ones that died unexpectedly"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                logging.info(f"Worker {pid} exited unexpectedly with status {status}, replacing it")
+                if not self._stopping:
+                    time.sleep(1)
+                    self.wait_ready(self.spawn_worker()[1])
+
+    def _on_signal(self, signum, frame) -> None:
+        self._pending_signals.append(signum)
+
+    def run(self) -> None:
+        """Binds, preloads and forks the workers, then supervises them until stopped"""
+        try:
+            self.bind()
+            self.preload()
+            ready_fds = [self.spawn_worker()[1] for _ in range(self.worker_count)]
+            ready_count = sum(self.wait_ready(ready_fd) for ready_fd in ready_fds)
+            logging.info(f"{ready_count} of {self.worker_count} workers ready")
+            for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+                signal.signal(signum, self._on_signal)
+
+            while not self._stopping:
+                while self._pending_signals:
+                    signum = self._pending_signals.pop(0)
+                    if signum == signal.SIGHUP:
+                        self.reload()
+                    else:
+                        self._stopping = True
+                self.reap_workers()
+                time.sleep(0.2)
+
+            logging.info("Stopping all workers")
+            for pid in list(self.workers):
+                os.kill(pid, signal.SIGTERM)
+            for pid in list(self.workers):
+                self.stop_worker(pid, send_signal=False)
+            self.sock.close()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+
+# Main entry point to start the production server
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-worker prediction server")
+    parser.add_argument("--host", default=APP_HOST)
+    parser.add_argument("--port", type=int, default=APP_PORT)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    ServingMaster(host=args.host, port=args.port, workers=args.workers).run()
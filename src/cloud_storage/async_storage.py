@@ -0,0 +1,101 @@
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, List, Optional, Tuple
+
+from pandas import DataFrame
+
+from src.cloud_storage.storage_service import StorageService, get_storage_service
+from src.constants import STORAGE_ASYNC_MAX_WORKERS, STORAGE_ASYNC_TIMEOUT_SECONDS
+from src.exception import MyException
+
+
+class AsyncStorageService:
+    """
+    Asyncio counterpart of StorageService for storage I/O done while handling requests.
+
+    boto3 has no asyncio API, so every call of the wrapped storage service runs in a
+    dedicated, bounded thread pool: the event loop keeps serving requests, concurrent calls
+    overlap up to max_workers, and storage calls cannot exhaust the default executor used
+    by the rest of the app. Each call is awaited with a timeout.
+    The S3 connection pool is sized for these threads, see S3_MAX_POOL_CONNECTIONS.
+    """
+    def __init__(self, storage: Optional[StorageService] = None, max_workers: int = STORAGE_ASYNC_MAX_WORKERS,
+                 timeout: float = STORAGE_ASYNC_TIMEOUT_SECONDS):
+        """
+        storage: storage service to wrap, defaults to the configured backend
+        max_workers: maximum number of storage calls running at the same time
+        timeout: seconds after which a call fails with a TimeoutError
+        """
+        self.storage = storage or get_storage_service()
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="storage")
+        self._queued = 0  # calls submitted that no storage thread has started yet
+        self._queued_lock = threading.Lock()
+
+    def _start(self, call: Callable):
+        """Runs in a storage thread: the call leaves the queue as it starts"""
+        with self._queued_lock:
+            self._queued -= 1
+        return call()
+
+    def _on_done(self, future) -> None:
+        # a call cancelled before it started, e.g. by the timeout, never ran _start
+        if future.cancelled():
+            with self._queued_lock:
+                self._queued -= 1
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        Runs a blocking storage bound call in the storage thread pool, e.g. a ModelRegistry
+        method, and returns its result.
+        """
+        try:
+            with self._queued_lock:
+                self._queued += 1
+            try:
+                future = self._executor.submit(self._start, partial(func, *args, **kwargs))
+            except Exception:
+                with self._queued_lock:
+                    self._queued -= 1
+                raise
+            future.add_done_callback(self._on_done)
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.timeout)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    async def s3_key_path_available(self, bucket_name, s3_key) -> bool:
+        return await self.run(self.storage.s3_key_path_available, bucket_name, s3_key)
+
+    async def list_keys(self, prefix: str, bucket_name: str) -> List[str]:
+        return await self.run(self.storage.list_keys, prefix, bucket_name)
+
+    async def get_object_etag(self, key: str, bucket_name: str) -> str:
+        return await self.run(self.storage.get_object_etag, key, bucket_name)
+
+    async def get_object_bytes(self, key: str, bucket_name: str) -> Tuple[bytes, str]:
+        return await self.run(self.storage.get_object_bytes, key, bucket_name)
+
+    async def put_object_bytes(self, data: bytes, key: str, bucket_name: str,
+                               if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        return await self.run(self.storage.put_object_bytes, data, key, bucket_name,
+                              if_match=if_match, if_none_match=if_none_match)
+
+    async def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True):
+        return await self.run(self.storage.upload_file, from_filename, to_filename, bucket_name, remove=remove)
+
+    async def download_file(self, key: str, to_filename: str, bucket_name: str) -> None:
+        return await self.run(self.storage.download_file, key, to_filename, bucket_name)
+
+    async def read_csv(self, filename: str, bucket_name: str) -> DataFrame:
+        return await self.run(self.storage.read_csv, filename, bucket_name)
+
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a free storage thread"""
+        return self._queued
+
+    def close(self) -> None:
+        """Waits for running calls and stops the threads, called on app shutdown."""
+        self._executor.shutdown(wait=True)
@@ -1,17 +1,22 @@
 import boto3
+from boto3.s3.transfer import TransferConfig
 from src.configuration.aws_connection import S3Client
+from src.cloud_storage.storage_service import StorageService
 from io import StringIO
-from typing import Union,List
+from typing import Union,List,Tuple,Optional
 import os,sys
 from src.logger import logging
 from mypy_boto3_s3.service_resource import Bucket
 from src.exception import MyException
 from botocore.exceptions import ClientError
 from pandas import DataFrame,read_csv
-import pickle
+from src.constants import (S3_TRANSFER_MULTIPART_THRESHOLD,S3_TRANSFER_MULTIPART_CHUNKSIZE,
+                           S3_TRANSFER_MAX_CONCURRENCY,S3_CHECKSUM_METADATA_KEY)
+from src.utils.main_utils import file_fingerprint
+import hashlib
 
 
-class SimpleStorageService:
+class SimpleStorageService(StorageService):
     """
     A class for interacting with AWS S3 storage, providing methods for file management, 
     data uploads, and data retrieval in S3 buckets.
@@ -25,6 +30,11 @@ class SimpleStorageService:
         s3_client = S3Client()
         self.s3_resource = s3_client.s3_resource
         self.s3_client = s3_client.s3_client
+        # model pickles are hundreds of MB: transfer them as concurrent multipart/ranged requests
+        self.transfer_config = TransferConfig(multipart_threshold=S3_TRANSFER_MULTIPART_THRESHOLD,
+                                              multipart_chunksize=S3_TRANSFER_MULTIPART_CHUNKSIZE,
+                                              max_concurrency=S3_TRANSFER_MAX_CONCURRENCY,
+                                              use_threads=True)
 
     def s3_key_path_available(self, bucket_name, s3_key) -> bool:
         """
@@ -111,25 +121,135 @@ class SimpleStorageService:
         except Exception as e:
             raise MyException(e, sys) from e
 
-    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
         """
-        Loads a serialized model from the specified S3 bucket.
+        Retrieves the ETag of the specified S3 object without downloading its content.
 
         Args:
-            model_name (str): Name of the model file in the bucket.
+            key (str): Key path of the object in the bucket.
             bucket_name (str): Name of the S3 bucket.
-            model_dir (str): Directory path within the bucket.
 
         Returns:
-            object: The deserialized model object.
+            str: The object's ETag with surrounding quotes removed.
         """
         try:
-            model_file = model_dir + "/" + model_name if model_dir else model_name
-            file_object = self.get_file_object(model_file, bucket_name)
-            model_obj = self.read_object(file_object, decode=False)
-            model = pickle.loads(model_obj)
-            logging.info("Production model loaded from S3 bucket.")
-            return model
+            return self.s3_resource.Object(bucket_name, key).e_tag.strip('"')
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def list_keys(self, prefix: str, bucket_name: str) -> List[str]:
+        """
+        Lists the keys of all objects under the given prefix.
+
+        Args:
+            prefix (str): Key prefix to list.
+            bucket_name (str): Name of the S3 bucket.
+
+        Returns:
+            List[str]: Keys of the matching objects.
+        """
+        try:
+            bucket = self.get_bucket(bucket_name)
+            return [file_object.key for file_object in bucket.objects.filter(Prefix=prefix)]
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_object_bytes(self, key: str, bucket_name: str) -> Tuple[bytes, str]:
+        """
+        Reads the content of the specified S3 object.
+
+        Args:
+            key (str): Key path of the object in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+
+        Returns:
+            Tuple[bytes, str]: The object content and its ETag.
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=key)
+            return response["Body"].read(), response["ETag"].strip('"')
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def put_object_bytes(self, data: bytes, key: str, bucket_name: str,
+                         if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        """
+        Writes bytes to the specified S3 object in a single atomic PUT.
+
+        Args:
+            data (bytes): Content to write.
+            key (str): Key path of the object in the bucket.
+            bucket_name (str): Name of the S3 bucket.
+            if_match (str): Only overwrite the object if its current ETag matches.
+            if_none_match (bool): Only write the object if it does not exist yet.
+
+        Returns:
+            str: ETag of the written object.
+        """
+        try:
+            conditions = {}
+            if if_match is not None:
+                conditions["IfMatch"] = if_match
+            if if_none_match:
+                conditions["IfNoneMatch"] = "*"
+            response = self.s3_client.put_object(Bucket=bucket_name, Key=key, Body=data, **conditions)
+            return response["ETag"].strip('"')
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise MyException(Exception(f"Object {key} in {bucket_name} was modified concurrently"), sys) from e
+            raise MyException(e, sys) from e
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @staticmethod
+    def _verify_checksum(file_path: str, head: dict) -> None:
+        """
+        Verifies a downloaded file against the sha256 recorded in the object metadata at upload.
+        Objects uploaded without it are checked against their ETag when it is a plain MD5
+        (single part upload).
+        """
+        expected_sha256 = head.get("Metadata", {}).get(S3_CHECKSUM_METADATA_KEY)
+        if expected_sha256 is not None:
+            if file_fingerprint(file_path) != expected_sha256:
+                raise Exception(f"Checksum mismatch for downloaded file {file_path}")
+            return
+        etag = head["ETag"].strip('"')
+        if "-" not in etag:
+            digest = hashlib.md5()
+            with open(file_path, "rb") as file_obj:
+                for chunk in iter(lambda: file_obj.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            if digest.hexdigest() != etag:
+                raise Exception(f"Checksum mismatch for downloaded file {file_path}")
+        else:
+            logging.info(f"No checksum recorded for {file_path}, skipping verification")
+
+    def download_file(self, key: str, to_filename: str, bucket_name: str) -> None:
+        """
+        Downloads the specified S3 object to a local file using concurrent ranged requests,
+        verifies its checksum and only then moves it into place.
+
+        Args:
+            key (str): Key path of the object in the bucket.
+            to_filename (str): Local path to write the object to.
+            bucket_name (str): Name of the S3 bucket.
+        """
+        logging.info("Entered the download_file method of SimpleStorageService class")
+        try:
+            os.makedirs(os.path.dirname(to_filename) or ".", exist_ok=True)
+            head = self.s3_client.head_object(Bucket=bucket_name, Key=key)
+            # pin the version that was inspected so that the checksum matches what is downloaded
+            extra_args = {"VersionId": head["VersionId"]} if head.get("VersionId") else None
+            part_filename = to_filename + ".part"
+            try:
+                self.s3_client.download_file(bucket_name, key, part_filename,
+                                             ExtraArgs=extra_args, Config=self.transfer_config)
+                self._verify_checksum(part_filename, head)
+                os.replace(part_filename, to_filename)
+            finally:
+                if os.path.exists(part_filename):
+                    os.remove(part_filename)
+            logging.info("Exited the download_file method of SimpleStorageService class")
         except Exception as e:
             raise MyException(e, sys) from e
 
@@ -165,7 +285,10 @@ class SimpleStorageService:
         logging.info("Entered the upload_file method of SimpleStorageService class")
         try:
             logging.info(f"Uploading {from_filename} to {to_filename} in {bucket_name}")
-            self.s3_resource.meta.client.upload_file(from_filename, bucket_name, to_filename)
+            # record a whole-file checksum, multipart ETags cannot be used to verify downloads
+            extra_args = {"Metadata": {S3_CHECKSUM_METADATA_KEY: file_fingerprint(from_filename)}}
+            self.s3_client.upload_file(from_filename, bucket_name, to_filename,
+                                       ExtraArgs=extra_args, Config=self.transfer_config)
             logging.info(f"Uploaded {from_filename} to {to_filename} in {bucket_name}")
 
             # Delete the local file if remove is True
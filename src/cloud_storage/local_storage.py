@@ -0,0 +1,186 @@
+import os
+import sys
+import fcntl
+import hashlib
+import shutil
+import tempfile
+from typing import List, Tuple, Optional
+from pandas import DataFrame, read_csv
+
+from src.cloud_storage.storage_service import StorageService
+from src.constants import LOCAL_STORAGE_DIR, LOCAL_STORAGE_DIR_ENV_KEY
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import load_object
+
+
+class LocalStorageService(StorageService):
+    """
+    StorageService that keeps buckets as directories on the local filesystem, so that
+    model storage can be used and tested without AWS.
+    Every bucket is a directory under the storage root and every key a file path in it.
+    """
+
+    def __init__(self, root_dir: Optional[str] = None):
+        """
+        Initializes the LocalStorageService with the storage root directory. The root defaults
+        to the LOCAL_STORAGE_DIR environment variable and then to the LOCAL_STORAGE_DIR constant.
+        """
+        self.root_dir = root_dir or os.getenv(LOCAL_STORAGE_DIR_ENV_KEY, LOCAL_STORAGE_DIR)
+
+    def _path(self, key: str, bucket_name: str) -> str:
+        """Maps a bucket/key pair to a path below the storage root."""
+        return os.path.join(self.root_dir, bucket_name, *key.strip("/").split("/"))
+
+    @staticmethod
+    def _md5(file_path: str) -> str:
+        """Computes the ETag of a file the way S3 does for single part uploads."""
+        digest = hashlib.md5()
+        with open(file_path, "rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _atomic_write(self, path: str, data: bytes) -> None:
+        """Writes data to a temporary file next to path and renames it into place."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file_obj:
+                file_obj.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def s3_key_path_available(self, bucket_name, s3_key) -> bool:
+        """
+        Checks if any file exists under the specified key path in the bucket directory.
+        """
+        try:
+            return len(self.list_keys(s3_key, bucket_name)) > 0
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def list_keys(self, prefix: str, bucket_name: str) -> List[str]:
+        """
+        Lists the keys of all files under the given prefix, like an S3 prefix listing.
+        """
+        try:
+            bucket_dir = os.path.join(self.root_dir, bucket_name)
+            keys = []
+            for dir_path, _, file_names in os.walk(bucket_dir):
+                for file_name in file_names:
+                    if file_name.startswith(".tmp-") or file_name.endswith(".lock"):
+                        continue
+                    key = os.path.relpath(os.path.join(dir_path, file_name), bucket_dir).replace(os.sep, "/")
+                    if key.startswith(prefix):
+                        keys.append(key)
+            return sorted(keys)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
+        """
+        Returns the md5 ETag of the file stored under key.
+        """
+        try:
+            return self._md5(self._path(key, bucket_name))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_object_bytes(self, key: str, bucket_name: str) -> Tuple[bytes, str]:
+        """
+        Reads the content of the file stored under key, with its ETag.
+        """
+        try:
+            with open(self._path(key, bucket_name), "rb") as file_obj:
+                data = file_obj.read()
+            return data, hashlib.md5(data).hexdigest()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def put_object_bytes(self, data: bytes, key: str, bucket_name: str,
+                         if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        """
+        Atomically writes bytes under key. The optional conditions mirror the S3 conditional
+        PUT semantics and are checked under a bucket level file lock.
+        """
+        try:
+            path = self._path(key, bucket_name)
+            os.makedirs(os.path.join(self.root_dir, bucket_name), exist_ok=True)
+            with open(os.path.join(self.root_dir, bucket_name, ".bucket.lock"), "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                exists = os.path.exists(path)
+                if if_none_match and exists:
+                    raise Exception(f"Object {key} in {bucket_name} already exists")
+                if if_match is not None and (not exists or self._md5(path) != if_match):
+                    raise Exception(f"Object {key} in {bucket_name} was modified concurrently")
+                self._atomic_write(path, data)
+            return hashlib.md5(data).hexdigest()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+        """
+        Loads a serialized model from the bucket directory, unpickled with dill.
+        """
+        try:
+            model_file = model_dir + "/" + model_name if model_dir else model_name
+            model = load_object(file_path=self._path(model_file, bucket_name))
+            logging.info("Production model loaded from local storage.")
+            return model
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def create_folder(self, folder_name: str, bucket_name: str) -> None:
+        """
+        Creates a folder in the bucket directory.
+        """
+        os.makedirs(self._path(folder_name, bucket_name), exist_ok=True)
+
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True):
+        """
+        Copies a local file into the bucket directory with an optional deletion of the source.
+        """
+        logging.info("Entered the upload_file method of LocalStorageService class")
+        try:
+            path = self._path(to_filename, bucket_name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            os.close(fd)
+            try:
+                shutil.copyfile(from_filename, tmp_path)
+                os.replace(tmp_path, path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            logging.info(f"Uploaded {from_filename} to {to_filename} in {bucket_name}")
+
+            if remove:
+                os.remove(from_filename)
+                logging.info(f"Removed local file {from_filename} after upload")
+            logging.info("Exited the upload_file method of LocalStorageService class")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def download_file(self, key: str, to_filename: str, bucket_name: str) -> None:
+        """
+        Copies the file stored under key to a local path.
+        """
+        try:
+            os.makedirs(os.path.dirname(to_filename) or ".", exist_ok=True)
+            shutil.copyfile(self._path(key, bucket_name), to_filename)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def read_csv(self, filename: str, bucket_name: str) -> DataFrame:
+        """
+        Reads a CSV file from the bucket directory into a DataFrame.
+        """
+        try:
+            return read_csv(self._path(filename, bucket_name), na_values="na")
+        except Exception as e:
+            raise MyException(e, sys) from e
@@ -0,0 +1,88 @@
+import os
+import sys
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.cloud_storage.storage_service import StorageService
+from src.exception import MyException
+from src.logger import logging
+
+
+class InMemoryStorageService(StorageService):
+    """
+    StorageService keeping objects in a dictionary shared by all instances of the process.
+    Meant for tests and benchmarks that must not touch the network or the disk.
+    """
+
+    buckets: Dict[str, Dict[str, bytes]] = {}  # Shared across all InMemoryStorageService instances
+    _lock = threading.Lock()
+
+    def _bucket(self, bucket_name: str) -> Dict[str, bytes]:
+        return InMemoryStorageService.buckets.setdefault(bucket_name, {})
+
+    def _get(self, key: str, bucket_name: str) -> bytes:
+        bucket = self._bucket(bucket_name)
+        if key not in bucket:
+            raise Exception(f"Object {key} not found in {bucket_name}")
+        return bucket[key]
+
+    def s3_key_path_available(self, bucket_name, s3_key) -> bool:
+        try:
+            return len(self.list_keys(s3_key, bucket_name)) > 0
+        except Exception as e:
+            raise MyException(e, sys)
+
+    def list_keys(self, prefix: str, bucket_name: str) -> List[str]:
+        try:
+            return sorted(key for key in list(self._bucket(bucket_name)) if key.startswith(prefix))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
+        try:
+            return hashlib.md5(self._get(key, bucket_name)).hexdigest()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_object_bytes(self, key: str, bucket_name: str) -> Tuple[bytes, str]:
+        try:
+            data = self._get(key, bucket_name)
+            return data, hashlib.md5(data).hexdigest()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def put_object_bytes(self, data: bytes, key: str, bucket_name: str,
+                         if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        try:
+            with InMemoryStorageService._lock:
+                bucket = self._bucket(bucket_name)
+                if if_none_match and key in bucket:
+                    raise Exception(f"Object {key} in {bucket_name} already exists")
+                if if_match is not None and (key not in bucket or hashlib.md5(bucket[key]).hexdigest() != if_match):
+                    raise Exception(f"Object {key} in {bucket_name} was modified concurrently")
+                bucket[key] = bytes(data)
+            return hashlib.md5(data).hexdigest()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True):
+        try:
+            with open(from_filename, "rb") as file_obj:
+                self.put_object_bytes(file_obj.read(), to_filename, bucket_name)
+            logging.info(f"Uploaded {from_filename} to {to_filename} in {bucket_name}")
+            if remove:
+                os.remove(from_filename)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def download_file(self, key: str, to_filename: str, bucket_name: str) -> None:
+        try:
+            os.makedirs(os.path.dirname(to_filename) or ".", exist_ok=True)
+            with open(to_filename, "wb") as file_obj:
+                file_obj.write(self._get(key, bucket_name))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def create_folder(self, folder_name: str, bucket_name: str) -> None:
+        self._bucket(bucket_name).setdefault(folder_name.rstrip("/") + "/", b"")
@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import fcntl
+import hashlib
+from contextlib import contextmanager
+from typing import Optional
+
+from src.cloud_storage.storage_service import StorageService
+from src.constants import MODEL_CACHE_DIR, MODEL_CACHE_DIR_ENV_KEY, MODEL_CACHE_MAX_BYTES
+from src.exception import MyException
+from src.logger import logging
+
+
+class LocalModelCache:
+    """
+    Size bounded on-disk cache of model files, shared by all processes of a host.
+
+    Entries are named <hash of bucket/key>-<etag><ext>, so a new model version gets a new
+    entry and a cached entry never has to be invalidated. Processes coordinate through
+    file locks: the first one to miss downloads the entry while the others wait for it,
+    and eviction of the least recently used entries runs under a cache wide lock.
+
+    The cache also remembers the last model key resolved through a manifest, so that a
+    process starting while the storage is unreachable can still find its cached entry.
+    """
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = MODEL_CACHE_MAX_BYTES):
+        """
+        cache_dir: directory of the cache, defaults to the MODEL_CACHE_DIR environment variable
+                   and then to the MODEL_CACHE_DIR constant
+        max_bytes: total size above which least recently used entries are evicted
+        """
+        self.cache_dir = cache_dir or os.getenv(MODEL_CACHE_DIR_ENV_KEY, MODEL_CACHE_DIR)
+        self.max_bytes = max_bytes
+
+    @contextmanager
+    def _lock(self, name: str):
+        """Holds an exclusive lock on a lock file of the cache directory"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(os.path.join(self.cache_dir, f"{name}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _entries(self):
+        """Returns the (path, size, mtime) of every cached entry"""
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if file_name.endswith((".lock", ".part", ".resolved")):
+                continue
+            path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict(self, keep_path: str) -> None:
+        """Removes least recently used entries until the cache fits in max_bytes"""
+        with self._lock("cache"):
+            entries = sorted(self._entries(), key=lambda entry: entry[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep_path:
+                    continue
+                entry_name = os.path.splitext(os.path.basename(path))[0]
+                with open(os.path.join(self.cache_dir, f"{entry_name}.lock"), "w") as entry_lock:
+                    try:
+                        fcntl.flock(entry_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except BlockingIOError:
+                        continue  # the entry is being looked up right now
+                    # processes that already opened the file keep reading it after the unlink
+                    os.remove(path)
+                total -= size
+                logging.info(f"Evicted {path} from the model cache")
+
+    def _resolution_path(self, bucket_name: str, manifest_key: str) -> str:
+        manifest_hash = hashlib.sha256(f"{bucket_name}/{manifest_key}".encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{manifest_hash}.resolved")
+
+    def save_resolution(self, bucket_name: str, manifest_key: str, key: str, version: Optional[str]) -> None:
+        """Remembers the model key and version the manifest resolved to, replacing the file atomically"""
+        try:
+            path = self._resolution_path(bucket_name, manifest_key)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".part", "w") as resolution_file:
+                json.dump({"key": key, "version": version}, resolution_file)
+            os.replace(path + ".part", path)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_resolution(self, bucket_name: str, manifest_key: str) -> Optional[dict]:
+        """Returns the last {"key": ..., "version": ...} saved for the manifest, or None"""
+        try:
+            with open(self._resolution_path(bucket_name, manifest_key)) as resolution_file:
+                return json.load(resolution_file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_model_file(self, storage: StorageService, bucket_name: str, key: str) -> str:
+        """
+        Returns the path of a local copy of the object, downloading it only if the cache has
+        no entry for its current ETag. If the storage cannot be reached, the most recently
+        used entry of the key is returned instead.
+        """
+        try:
+            key_hash = hashlib.sha256(f"{bucket_name}/{key}".encode()).hexdigest()[:16]
+            extension = os.path.splitext(key)[1]
+            try:
+                etag = storage.get_object_etag(key=key, bucket_name=bucket_name)
+            except Exception as e:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                cached = [entry for entry in self._entries()
+                          if os.path.basename(entry[0]).startswith(key_hash + "-")]
+                if not cached:
+                    raise
+                path = max(cached, key=lambda entry: entry[2])[0]
+                logging.info(f"Storage unreachable ({e}), using cached model file {path}")
+                return path
+
+            path = os.path.join(self.cache_dir, f"{key_hash}-{etag}{extension}")
+            with self._lock(f"{key_hash}-{etag}"):
+                # another process may have downloaded it while we waited for the lock
+                if os.path.exists(path):
+                    logging.info(f"Model cache hit for {key}")
+                    os.utime(path)  # mark as recently used
+                    return path
+                logging.info(f"Model cache miss, downloading {key} from {bucket_name}")
+                storage.download_file(key=key, to_filename=path + ".part", bucket_name=bucket_name)
+                os.replace(path + ".part", path)
+            self._evict(keep_path=path)
+            return path
+        except Exception as e:
+            raise MyException(e, sys) from e
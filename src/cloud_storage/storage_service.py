@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+from abc import ABC, abstractmethod
+from io import BytesIO
+from typing import List, Optional, Tuple
+from pandas import DataFrame, read_csv
+
+from src.constants import STORAGE_BACKEND, STORAGE_BACKEND_ENV_KEY
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import load_object
+
+
+class StorageService(ABC):
+    """
+    Interface of the object storage used for models and artifacts. Buckets and keys follow
+    S3 semantics; SimpleStorageService talks to S3 (or any S3 compatible endpoint such as
+    MinIO), LocalStorageService to a local directory and InMemoryStorageService to a
+    process local dictionary.
+    """
+
+    @abstractmethod
+    def s3_key_path_available(self, bucket_name, s3_key) -> bool:
+        """Checks if any object exists under the specified key path in the bucket."""
+
+    @abstractmethod
+    def list_keys(self, prefix: str, bucket_name: str) -> List[str]:
+        """Lists the keys of all objects under the given prefix."""
+
+    @abstractmethod
+    def get_object_etag(self, key: str, bucket_name: str) -> str:
+        """Returns the ETag of the object without reading its content."""
+
+    @abstractmethod
+    def get_object_bytes(self, key: str, bucket_name: str) -> Tuple[bytes, str]:
+        """Returns the content of the object and its ETag."""
+
+    @abstractmethod
+    def put_object_bytes(self, data: bytes, key: str, bucket_name: str,
+                         if_match: Optional[str] = None, if_none_match: bool = False) -> str:
+        """Atomically writes bytes under key, optionally conditioned on the current ETag."""
+
+    @abstractmethod
+    def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True):
+        """Uploads a local file to the bucket with an optional deletion of the local file."""
+
+    @abstractmethod
+    def download_file(self, key: str, to_filename: str, bucket_name: str) -> None:
+        """Downloads the object to a local file."""
+
+    @abstractmethod
+    def create_folder(self, folder_name: str, bucket_name: str) -> None:
+        """Creates a folder in the bucket."""
+
+    def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
+        """
+        Loads a serialized model from the bucket. The model is downloaded to a temporary
+        file and unpickled from there with dill, like every model of the project, so the
+        object is never held in memory as one bytes copy.
+        """
+        try:
+            model_file = model_dir + "/" + model_name if model_dir else model_name
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                local_path = os.path.join(tmp_dir, os.path.basename(model_file))
+                self.download_file(model_file, local_path, bucket_name)
+                model = load_object(file_path=local_path)
+            logging.info(f"Production model loaded from {type(self).__name__}.")
+            return model
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def upload_df_as_csv(self, data_frame: DataFrame, local_filename: str, bucket_filename: str, bucket_name: str) -> None:
+        """
+        Uploads a DataFrame as a CSV file to the bucket.
+        """
+        try:
+            data_frame.to_csv(local_filename, index=None, header=True)
+            self.upload_file(local_filename, bucket_filename, bucket_name)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def read_csv(self, filename: str, bucket_name: str) -> DataFrame:
+        """
+        Reads a CSV file from the bucket into a DataFrame.
+        """
+        try:
+            data, _ = self.get_object_bytes(filename, bucket_name)
+            return read_csv(BytesIO(data), na_values="na")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+
+def get_storage_service(backend: Optional[str] = None) -> StorageService:
+    """
+    Returns the storage service selected by backend, the STORAGE_BACKEND environment variable
+    or the STORAGE_BACKEND constant, in that order. Supported backends: s3, local, memory.
+    Backends are imported lazily so that boto3 is only loaded when S3 is actually used.
+    """
+    try:
+        backend = (backend or os.getenv(STORAGE_BACKEND_ENV_KEY, STORAGE_BACKEND)).lower()
+        if backend == "s3":
+            from src.cloud_storage.aws_storage import SimpleStorageService
+            return SimpleStorageService()
+        if backend == "local":
+            from src.cloud_storage.local_storage import LocalStorageService
+            return LocalStorageService()
+        if backend == "memory":
+            from src.cloud_storage.memory_storage import InMemoryStorageService
+            return InMemoryStorageService()
+        raise Exception(f"Unknown storage backend: {backend}")
+    except Exception as e:
+        raise MyException(e, sys) from e
@@ -9,15 +9,18 @@ from src.entity.artifact_entity import DataIngestionArtifact
 from src.exception import MyException
 from src.logger import logging
 from src.data_access.proj1_data import Proj1Data
+from src.utils.profiler import profile_stage
 
 
 class DataIngestion:
-    def __init__(self,data_ingestion_config:DataIngestionConfig = DataIngestionConfig() ):
+    def __init__(self,data_ingestion_config:DataIngestionConfig = DataIngestionConfig(),proj1_data:Proj1Data = None):
         """
         param_data_ingestion_config: configuration for data ingestion
+        proj1_data: source the collection is exported from, a Proj1Data connected to MongoDB by default
         """
         try:
             self.data_ingestion_config = data_ingestion_config
+            self.proj1_data = proj1_data
         except Exception as e:
             raise MyException(e,sys) from e
         
@@ -30,7 +33,7 @@ class DataIngestion:
         """
         try:
             logging.info(f"Exporting data from momgodb")
-            my_data = Proj1Data()
+            my_data = self.proj1_data if self.proj1_data is not None else Proj1Data()
             dataframe = my_data.export_collection_as_dataframe(collection_name=
                                                                self.data_ingestion_config.collection_name)
             logging.info(f"Shape of dataframe: {dataframe.shape}")
@@ -38,7 +41,8 @@ class DataIngestion:
             dir_path = os.path.dirname(feature_store_file_path)
             os.makedirs(dir_path,exist_ok=True)
             logging.info(f"Saving exported data into feature store file path:{feature_store_file_path}")
-            dataframe.to_csv(feature_store_file_path,index = False,header = True)
+            with profile_stage("feature_store_csv_write", rows_in=len(dataframe)):
+                dataframe.to_csv(feature_store_file_path,index = False,header = True)
             return dataframe
         
         except Exception as e:
@@ -63,8 +67,9 @@ class DataIngestion:
             os.makedirs(dir_path,exist_ok=True)
 
             logging.info(f"Exporting train and test file path")
-            train_set.to_csv(self.data_ingestion_config.training_file_path,index = False,header = True)
-            test_set.to_csv(self.data_ingestion_config.testing_file_path,index = False,header = True)
+            with profile_stage("train_test_csv_write", rows_in=len(train_set) + len(test_set)):
+                train_set.to_csv(self.data_ingestion_config.training_file_path,index = False,header = True)
+                test_set.to_csv(self.data_ingestion_config.testing_file_path,index = False,header = True)
 
             logging.info("Exported train and test file path")
             
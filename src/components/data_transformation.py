@@ -12,6 +12,7 @@ from src.entity.artifact_entity import DataTransformationArtifact,DataIngestionA
 from src.exception import MyException
 from src.logger import logging
 from src.utils.main_utils import save_object,save_numpy_array_data,read_yaml_file
+from src.utils.profiler import profile_stage
 
 
 class DataTransformation:
@@ -128,10 +129,10 @@ class DataTransformation:
             test_df = self.read_data(file_path=self.data_ingestion_artifact.test_file_path)
             logging.info("Train and test data loaded")
 
-            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN],axis = 1)
+            input_feature_train_df = train_df.drop(columns=[TARGET_COLUMN])
             target_feature_train_df = train_df[TARGET_COLUMN]
 
-            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN],axis = 1)
+            input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN])
             target_feature_test_df = test_df[TARGET_COLUMN]
             logging.info("Input and Target cols defined for both train and test df")
 
@@ -153,7 +154,9 @@ class DataTransformation:
             logging.info("Got the processor object")
 
             logging.info("Initialising scaling transformation for Training Data")
-            input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
+            with profile_stage("preprocessor_fit_transform", rows_in=len(input_feature_train_df)) as stage:
+                input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
+                stage.rows_out = len(input_feature_train_arr)
             logging.info("Initialising scaling transformation for Testing Data")
             input_feature_test_arr = preprocessor.transform(input_feature_test_df)
             logging.info("Scaling transformations done for both training and testing data")
@@ -163,9 +166,11 @@ class DataTransformation:
 
             logging.info("Applying SMOTEENN for handling imbalanced dataset.")
             smt = SMOTEENN(sampling_strategy="minority")
-            input_feature_train_final,target_feature_train_final = smt.fit_resample(
-                input_feature_train_arr,target_feature_train_df
-            )
+            with profile_stage("smoteenn", rows_in=len(input_feature_train_arr)) as stage:
+                input_feature_train_final,target_feature_train_final = smt.fit_resample(
+                    input_feature_train_arr,target_feature_train_df
+                )
+                stage.rows_out = len(input_feature_train_final)
             logging.info("SMOTEENN applied to training data")
             input_feature_test_final = input_feature_test_arr
             target_feature_test_final = target_feature_test_df
@@ -1,14 +1,18 @@
-import sys 
+import os
+import sys
+import json
+import numpy as np
 import pandas as pd 
 from src.entity.config_entity import ModelEvaluationConfig
-from src.entity.artifact_entity import ModelTrainerArtifact,ModelEvaluationArtifact,DataIngestionArtifact
-from sklearn.metrics import f1_score
+from src.entity.artifact_entity import ModelTrainerArtifact,ModelEvaluationArtifact,DataIngestionArtifact,ClassificationMetricArtifact
+from sklearn.metrics import f1_score,precision_score,recall_score,roc_auc_score,roc_curve,precision_recall_curve
 from src.exception import MyException
 from src.logger import logging
 from src.constants import TARGET_COLUMN
-from src.utils.main_utils import load_object
-from typing import Optional
+from src.utils.main_utils import load_object,file_fingerprint
+from typing import Optional,Tuple
 from src.entity.s3_estimator import Proj1Estimator
+from src.entity.estimator import MyModel
 from dataclasses import dataclass
 
 @dataclass
@@ -17,6 +21,10 @@ class EvaluateModelResponse:
     best_model_f1_score: float
     is_model_accepted: bool 
     difference : float 
+    trained_model_metric_artifact: Optional[ClassificationMetricArtifact] = None
+    best_model_metric_artifact: Optional[ClassificationMetricArtifact] = None
+    difference_ci_low: Optional[float] = None
+    difference_ci_high: Optional[float] = None
 
 class ModelEvaluation:
     def __init__(self,model_eval_config: ModelEvaluationConfig,data_ingestion_artifact: DataIngestionArtifact,
@@ -42,7 +50,7 @@ class ModelEvaluation:
             model_path = self.model_eval_config.s3_model_key_path
             proj1_estimator = Proj1Estimator(bucket_name=bucket_name,
                                              model_path=model_path)
-            if proj1_estimator.is_model_present(model_path=model_path):
+            if proj1_estimator.is_model_present(model_path=proj1_estimator.resolve_model_path()):
                 return proj1_estimator
             return None
         
@@ -81,6 +89,116 @@ class ModelEvaluation:
             df = df.drop("_id", axis=1)
         return df
 
+    def _transform_test_data(self)->Tuple[pd.DataFrame,np.ndarray]:
+        """
+        Loads the test file and applies the custom transformations once, so that both the
+        trained and the production model are scored over the same feature matrix.
+        """
+        test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+        x, y = test_df.drop(TARGET_COLUMN, axis=1), test_df[TARGET_COLUMN].to_numpy()
+
+        x = self._map_gender_column(x)
+        x = self._drop_id_column(x)
+        x = self._create_dummy_columns(x)
+        x = self._rename_columns(x)
+        return x, y
+
+    @staticmethod
+    def _score_model(model: MyModel, x: pd.DataFrame)->np.ndarray:
+        """Returns the positive class probability of the model for every row of x."""
+        return model.predict_proba(x)[:, -1]
+
+    @staticmethod
+    def _compute_metrics(y: np.ndarray, y_score: np.ndarray, threshold: float = 0.5)->ClassificationMetricArtifact:
+        """Computes the classification metric suite from positive class probabilities."""
+        y_hat = (y_score > threshold).astype(int)
+        roc_auc = roc_auc_score(y, y_score) if len(np.unique(y)) > 1 else None
+        return ClassificationMetricArtifact(f1_score=f1_score(y, y_hat),
+                                            precision_score=precision_score(y, y_hat, zero_division=0),
+                                            recall_score=recall_score(y, y_hat),
+                                            roc_auc_score=roc_auc)
+
+    @staticmethod
+    def _threshold_curves(y: np.ndarray, y_score: np.ndarray)->dict:
+        """Computes ROC and precision/recall/F1 curves over every distinct score threshold."""
+        fpr, tpr, roc_thresholds = roc_curve(y, y_score)
+        precision, recall, pr_thresholds = precision_recall_curve(y, y_score)
+        # precision/recall carry one trailing point (recall=0) that has no threshold
+        precision, recall = precision[:-1], recall[:-1]
+        f1 = np.divide(2 * precision * recall, precision + recall,
+                       out=np.zeros_like(precision), where=(precision + recall) > 0)
+        return {
+            "roc": {"fpr": fpr.tolist(), "tpr": tpr.tolist(), "thresholds": roc_thresholds.tolist()},
+            "precision_recall": {"precision": precision.tolist(), "recall": recall.tolist(),
+                                 "f1": f1.tolist(), "thresholds": pr_thresholds.tolist()},
+        }
+
+    def _bootstrap_f1_difference(self, y: np.ndarray, trained_y_hat: np.ndarray,
+                                 best_y_hat: np.ndarray)->Tuple[float,float]:
+        """
+        Computes a paired bootstrap confidence interval of F1(trained) - F1(best).
+
+        Every test row falls into one of 8 cells given by (label, trained prediction, best
+        prediction), and F1 of both models only depends on the cell counts. Resampling n row
+        indices with replacement is therefore equivalent to drawing the cell counts from a
+        multinomial with the observed cell frequencies, which lets all resamples be drawn
+        in a single vectorized call instead of materialising n-sized index arrays.
+        """
+        cells = (y.astype(int) * 4 + trained_y_hat.astype(int) * 2 + best_y_hat.astype(int))
+        n = len(cells)
+        cell_probs = np.bincount(cells, minlength=8) / n
+
+        rng = np.random.default_rng(self.model_eval_config.bootstrap_random_state)
+        counts = rng.multinomial(n, cell_probs, size=self.model_eval_config.bootstrap_resamples)
+
+        def _f1(tp, fp, fn):
+            denominator = 2 * tp + fp + fn
+            return np.divide(2 * tp, denominator, out=np.zeros(len(tp)), where=denominator > 0)
+
+        # cell index = label*4 + trained*2 + best
+        trained_f1 = _f1(tp=counts[:, 6] + counts[:, 7], fp=counts[:, 2] + counts[:, 3],
+                         fn=counts[:, 4] + counts[:, 5])
+        best_f1 = _f1(tp=counts[:, 5] + counts[:, 7], fp=counts[:, 1] + counts[:, 3],
+                      fn=counts[:, 4] + counts[:, 6])
+
+        alpha = 1 - self.model_eval_config.bootstrap_confidence
+        ci_low, ci_high = np.quantile(trained_f1 - best_f1, [alpha / 2, 1 - alpha / 2])
+        return float(ci_low), float(ci_high)
+
+    def _get_best_model_scores(self, best_model: Proj1Estimator, x: pd.DataFrame,
+                               y: np.ndarray)->Tuple[np.ndarray,ClassificationMetricArtifact,float]:
+        """
+        Returns the production model's scores, its metrics on the test set at the decision
+        threshold stored with it, and that threshold. Results are cached on disk keyed on the
+        production model ETag and the test file fingerprint, so the production model is only
+        downloaded and re-scored when either of them changes.
+        """
+        etag = best_model.get_model_etag()
+        fingerprint = file_fingerprint(self.data_ingestion_artifact.test_file_path)
+        cache_key = f"{etag}_{fingerprint[:16]}"
+        cache_dir = self.model_eval_config.scoring_cache_dir
+        scores_path = os.path.join(cache_dir, f"{cache_key}.npy")
+        metrics_path = os.path.join(cache_dir, f"{cache_key}.json")
+
+        if os.path.exists(scores_path) and os.path.exists(metrics_path):
+            logging.info(f"Using cached production model scores: {cache_key}")
+            with open(metrics_path, "r") as metrics_file:
+                cached = json.load(metrics_file)
+            return (np.load(scores_path), ClassificationMetricArtifact(**cached["metrics"]),
+                    cached["decision_threshold"])
+
+        logging.info("Computing scores for production model..")
+        model = best_model.load_model()
+        decision_threshold = model.decision_threshold
+        y_score = self._score_model(model, x)
+        metrics = self._compute_metrics(y, y_score, decision_threshold)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(scores_path, y_score)
+        with open(metrics_path, "w") as metrics_file:
+            json.dump({"decision_threshold": decision_threshold, "metrics": metrics.__dict__}, metrics_file, indent=4)
+        return y_score, metrics, decision_threshold
+
     def evaluate_model(self) -> EvaluateModelResponse:
         """
         Method Name :   evaluate_model
@@ -91,35 +209,65 @@ class ModelEvaluation:
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
-            x, y = test_df.drop(TARGET_COLUMN, axis=1), test_df[TARGET_COLUMN]
-
-            logging.info("Test data loaded and now transforming it for prediction...")
-
-            x = self._map_gender_column(x)
-            x = self._drop_id_column(x)
-            x = self._create_dummy_columns(x)
-            x = self._rename_columns(x)
+            x, y = self._transform_test_data()
+            logging.info("Test data loaded and transformed for prediction.")
 
             trained_model = load_object(file_path=self.model_trainer_artifact.trained_model_file_path)
             logging.info("Trained model loaded/exists.")
-            trained_model_f1_score = self.model_trainer_artifact.metric_artifact.f1_score
+            trained_model_score = self._score_model(trained_model, x)
+            # each model is scored at the decision threshold stored with it, as it is served
+            decision_threshold = trained_model.decision_threshold
+            trained_model_metrics = self._compute_metrics(y, trained_model_score, decision_threshold)
+            trained_model_f1_score = trained_model_metrics.f1_score
             logging.info(f"F1_Score for this model: {trained_model_f1_score}")
 
+            report = {"comparison": "each model at its own decision_threshold",
+                      "trained_model": {"decision_threshold": decision_threshold,
+                                        "metrics": trained_model_metrics.__dict__,
+                                        "curves": self._threshold_curves(y, trained_model_score)}}
+
             best_model_f1_score=None
+            best_model_metrics=None
+            ci_low, ci_high = None, None
+            threshold = self.model_eval_config.changed_threshold_score
             best_model = self.get_best_model()
             if best_model is not None:
-                logging.info(f"Computing F1_Score for production model..")
-                y_hat_best_model = best_model.predict(x)
-                best_model_f1_score = f1_score(y, y_hat_best_model)
+                best_model_score, best_model_metrics, best_model_threshold = self._get_best_model_scores(best_model, x, y)
+                best_model_f1_score = best_model_metrics.f1_score
+                report["best_model"] = {"decision_threshold": best_model_threshold,
+                                        "metrics": best_model_metrics.__dict__,
+                                        "curves": self._threshold_curves(y, best_model_score)}
                 logging.info(f"F1_Score-Production Model: {best_model_f1_score}, F1_Score-New Trained Model: {trained_model_f1_score}")
             
             tmp_best_model_score = 0 if best_model_f1_score is None else best_model_f1_score
+            difference = trained_model_f1_score - tmp_best_model_score
+            if best_model is None:
+                is_model_accepted = True
+            elif self.model_eval_config.evaluation_mode == "bootstrap":
+                ci_low, ci_high = self._bootstrap_f1_difference(y, trained_model_score > decision_threshold,
+                                                              best_model_score > best_model_threshold)
+                logging.info(f"F1 difference {difference}, {self.model_eval_config.bootstrap_confidence} CI: [{ci_low}, {ci_high}]")
+                # accept only if the improvement exceeds the threshold with the configured confidence
+                is_model_accepted = ci_low > threshold
+                report["bootstrap"] = {"difference": difference, "ci_low": ci_low, "ci_high": ci_high,
+                                       "confidence": self.model_eval_config.bootstrap_confidence,
+                                       "resamples": self.model_eval_config.bootstrap_resamples}
+            else:
+                is_model_accepted = difference > threshold
+
             result = EvaluateModelResponse(trained_model_f1_score=trained_model_f1_score,
                                            best_model_f1_score=best_model_f1_score,
-                                           is_model_accepted=trained_model_f1_score > tmp_best_model_score,
-                                           difference=trained_model_f1_score - tmp_best_model_score
+                                           is_model_accepted=is_model_accepted,
+                                           difference=difference,
+                                           trained_model_metric_artifact=trained_model_metrics,
+                                           best_model_metric_artifact=best_model_metrics,
+                                           difference_ci_low=ci_low,
+                                           difference_ci_high=ci_high
                                            )
+
+            os.makedirs(self.model_eval_config.model_evaluation_dir, exist_ok=True)
+            with open(self.model_eval_config.evaluation_report_file_path, "w") as report_file:
+                json.dump(report, report_file)
             logging.info(f"Result: {result}")
             return result
 
@@ -144,7 +292,10 @@ class ModelEvaluation:
                 is_model_accepted=evaluate_model_response.is_model_accepted,
                 s3_model_path=s3_model_path,
                 trained_model_path=self.model_trainer_artifact.trained_model_file_path,
-                changed_accuracy=evaluate_model_response.difference)
+                changed_accuracy=evaluate_model_response.difference,
+                trained_model_metric_artifact=evaluate_model_response.trained_model_metric_artifact,
+                data_fingerprint=file_fingerprint(self.data_ingestion_artifact.trained_file_path),
+                compiled_model_path=self.model_trainer_artifact.compiled_model_file_path)
 
             logging.info(f"Model evaluation artifact: {model_evaluation_artifact}")
             return model_evaluation_artifact
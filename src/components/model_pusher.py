@@ -1,11 +1,15 @@
 import sys
 
-from src.cloud_storage.aws_storage import SimpleStorageService
+from src.cloud_storage.storage_service import get_storage_service
 from src.exception import MyException
 from src.logger import logging
 from src.entity.config_entity import ModelPusherConfig
 from src.entity.artifact_entity import ModelEvaluationArtifact,ModelPusherArtifact
 from src.entity.s3_estimator import Proj1Estimator
+from src.entity.model_registry import ModelRegistry
+from src.constants import SCHEMA_FILE_PATH,MODEL_COMPILED_FILE_NAME
+from src.utils.main_utils import file_fingerprint
+from src.utils.profiler import profile_stage
 
 class ModelPusher:
     def __init__(self,model_evaluation_artifact: ModelEvaluationArtifact,
@@ -15,11 +19,15 @@ class ModelPusher:
         model_pusher_config : Configuration for model pusher
         """
 
-        self.s3 = SimpleStorageService()
+        self.s3 = get_storage_service()
         self.model_evaluation_artifact = model_evaluation_artifact
         self.model_pusher_config = model_pusher_config
         self.proj1_estimator = Proj1Estimator(bucket_name=model_pusher_config.bucket_name,
-                                              model_path=model_pusher_config.s3_model_key_path)
+                                              model_path=model_pusher_config.s3_model_key_path,
+                                              storage=self.s3)
+        self.model_registry = ModelRegistry(bucket_name=model_pusher_config.bucket_name,
+                                            storage=self.s3,
+                                            registry_prefix=model_pusher_config.registry_prefix)
         
     def initiate_model_pusher(self)->ModelPusherArtifact:
         """
@@ -36,10 +44,25 @@ class ModelPusher:
             print("-------------------------------------------------------------------------------------")
             logging.info("Uploading artifacts folder to s3 bucket")
 
-            logging.info("Uploaidng new model to S3 bucket....")
-            self.proj1_estimator.save_model(from_file=self.model_evaluation_artifact.trained_model_path)
+            logging.info("Registering new model version in the model registry....")
+            metric_artifact = self.model_evaluation_artifact.trained_model_metric_artifact
+            metadata = {
+                "metrics": metric_artifact.__dict__ if metric_artifact is not None else None,
+                "changed_accuracy": self.model_evaluation_artifact.changed_accuracy,
+                "data_fingerprint": self.model_evaluation_artifact.data_fingerprint,
+                "schema_hash": file_fingerprint(SCHEMA_FILE_PATH),
+            }
+            extra_files = {}
+            if self.model_evaluation_artifact.compiled_model_path is not None:
+                extra_files[MODEL_COMPILED_FILE_NAME] = self.model_evaluation_artifact.compiled_model_path
+            with profile_stage("registry_push"):
+                model_version = self.model_registry.register_model(
+                    from_file=self.model_evaluation_artifact.trained_model_path, metadata=metadata,
+                    extra_files=extra_files)
+                self.model_registry.promote(model_version)
             model_pusher_artifact = ModelPusherArtifact(bucket_name=self.model_pusher_config.bucket_name,
-                                                        s3_model_path=self.model_pusher_config.s3_model_key_path)
+                                                        s3_model_path=self.model_registry.get_model_key(model_version),
+                                                        model_version=model_version)
             logging.info("Uploaded artifacts folder to a s3 bucket")
             logging.info(f"Model pusher artifact:  [{model_pusher_artifact}]")
             logging.info("Exited the initaite_model_pusher method")
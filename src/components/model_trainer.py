@@ -8,9 +8,11 @@ from sklearn.metrics import accuracy_score,f1_score,precision_score,recall_score
 from src.exception import MyException
 from src.logger import logging
 from src.utils.main_utils import load_numpy_array_data,load_object,save_object
+from src.utils.profiler import profile_stage
 from src.entity.config_entity import ModelTrainerConfig
 from src.entity.artifact_entity import DataTransformationArtifact,ModelTrainerArtifact,ClassificationMetricArtifact
 from src.entity.estimator import MyModel
+from src.entity.compiled_model import save_compiled_model
 
 class ModelTrainer:
     def __init__(self,data_transformation_artifact: DataTransformationArtifact,
@@ -49,7 +51,8 @@ class ModelTrainer:
 
             #fit the model
             logging.info("Model Training going on...")
-            model.fit(x_train,y_train)
+            with profile_stage("model_fit", rows_in=len(x_train)):
+                model.fit(x_train,y_train)
             logging.info("Model training done !!!")
 
             # PRedictions and evaluation metrics
@@ -98,14 +101,25 @@ class ModelTrainer:
             
             # Save the final model object that includes both preprocessing and trained model 
             logging.info("Saving new model as performance is better than previous one")
-            my_model = MyModel(preprocessing_object = preprocessing_obj,trained_model_object = trained_model)
+            my_model = MyModel(preprocessing_object = preprocessing_obj,trained_model_object = trained_model,
+                               decision_threshold = self.model_trainer_config.decision_threshold)
             save_object(self.model_trainer_config.trained_model_file_path,my_model)
             logging.info("Saved final model object that includes both preprpcessing and the trained model")
 
+            # Also save the flat array form that serving can mmap instead of unpickling
+            compiled_model_file_path = self.model_trainer_config.compiled_model_file_path
+            try:
+                save_compiled_model(compiled_model_file_path,my_model)
+                logging.info("Saved compiled model")
+            except Exception as e:
+                logging.info(f"Model could not be compiled, only the dill artifact is available: {e}")
+                compiled_model_file_path = None
+
             # create and return ModelTrainerArtifact
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path= self.model_trainer_config.trained_model_file_path,
-                metric_artifact= metric_artifact
+                metric_artifact= metric_artifact,
+                compiled_model_file_path= compiled_model_file_path
             ) 
             logging.info(f"Model trainer artifact : {model_trainer_artifact}")
             return model_trainer_artifact
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sys
+
+import certifi
+from pymongo import AsyncMongoClient
+
+from src.exception import MyException
+from src.logger import logging
+from src.configuration.mongo_db_connection import get_mongo_client_options, pool_metrics
+from src.constants import (DATABASE_NAME, MONGODB_URL_KEY, MONGODB_OPERATION_TIMEOUT_MS,
+                           MONGODB_OPERATION_TIMEOUT_MS_ENV_KEY)
+
+# Load the certificate authority file to avoid timeout errors when connecting to MongoDB
+ca = certifi.where()
+
+
+class AsyncMongoDBClient:
+    """
+    AsyncMongoDBClient is the asyncio counterpart of MongoDBClient, for MongoDB I/O done
+    while handling requests of the FastAPI app.
+
+    It uses pymongo's native AsyncMongoClient, so queries are awaited on the event loop
+    instead of blocking it, and concurrent requests share one bounded connection pool.
+    The client has the pool, compression and retry settings of MongoDBClient, and every
+    operation is limited by MONGODB_OPERATION_TIMEOUT_MS, so a slow or unreachable database
+    fails the request rather than piling up waiting coroutines.
+
+    An AsyncMongoClient belongs to the event loop it is used on: the shared client is
+    created lazily on the first use and recreated if a different loop uses it.
+    """
+
+    client = None  # Shared AsyncMongoClient instance across all AsyncMongoDBClient instances
+    _client_loop = None
+
+    def __init__(self, database_name: str = DATABASE_NAME) -> None:
+        """
+        Connects lazily to the database, no I/O is done until the first operation.
+
+        Raises:
+        ------
+        MyException
+            If the environment variable for the MongoDB URL is not set.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+            if AsyncMongoDBClient.client is None or AsyncMongoDBClient._client_loop is not loop:
+                mongo_db_url = os.getenv(MONGODB_URL_KEY)
+                if mongo_db_url is None:
+                    raise Exception(f"Environment variable '{MONGODB_URL_KEY}' is not set.")
+
+                options = get_mongo_client_options()
+                # timeoutMS bounds each whole operation; socketTimeoutMS would be ignored with it
+                options.pop("socketTimeoutMS")
+                options["timeoutMS"] = int(os.getenv(MONGODB_OPERATION_TIMEOUT_MS_ENV_KEY, MONGODB_OPERATION_TIMEOUT_MS))
+                AsyncMongoDBClient.client = AsyncMongoClient(mongo_db_url, tlsCAFile=ca, event_listeners=[pool_metrics],
+                                                             **options)
+                AsyncMongoDBClient._client_loop = loop
+                logging.info("Async MongoDB client created.")
+
+            self.client = AsyncMongoDBClient.client
+            self.database = self.client[database_name]
+            self.database_name = database_name
+
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    @classmethod
+    async def close(cls) -> None:
+        """Closes the shared client and its connections, called on app shutdown."""
+        if cls.client is not None:
+            client, cls.client, cls._client_loop = cls.client, None, None
+            await client.close()
+            logging.info("Async MongoDB client closed.")
@@ -1,6 +1,8 @@
 import boto3
 import os
-from src.constants import AWS_ACCESS_KEY_ID_ENV_KEY,AWS_SECRET_ACCESS_KEY_ENV_KEY,REGION_NAME
+from botocore.config import Config
+from src.constants import (AWS_ACCESS_KEY_ID_ENV_KEY,AWS_SECRET_ACCESS_KEY_ENV_KEY,REGION_NAME,AWS_ENDPOINT_URL_ENV_KEY,
+                           S3_MAX_POOL_CONNECTIONS,S3_CONNECT_TIMEOUT_SECONDS,S3_READ_TIMEOUT_SECONDS)
 
 
 class S3Client:
@@ -9,31 +11,43 @@ class S3Client:
     def __init__(self,region_name = REGION_NAME):
         """
         This class gets aws credentials from env_variable and creates an connection with the s3 bucket
-        and raise an exception when environment variable is not set
+        and raise an exception when environment variable is not set.
+        If AWS_ENDPOINT_URL is set, the connection goes to that S3 compatible endpoint (e.g. MinIO).
         """
 
-        if S3Client.s3_resource == None or S3Client.s3_resource == None:
+        if S3Client.s3_resource == None or S3Client.s3_client == None:
             _access_key_id = os.getenv(AWS_ACCESS_KEY_ID_ENV_KEY,)
             _secret_access_key = os.getenv(AWS_SECRET_ACCESS_KEY_ENV_KEY,)
+            _endpoint_url = os.getenv(AWS_ENDPOINT_URL_ENV_KEY,)
 
             if _access_key_id is None:
                 raise Exception(f"Environment variable: {AWS_ACCESS_KEY_ID_ENV_KEY} is not set")
             if _secret_access_key is None:
                 raise Exception(f"Environment variable: {AWS_SECRET_ACCESS_KEY_ENV_KEY} is not set")
             
+            # connection pools sized for the transfer threads plus the async storage threads
+            _config = Config(max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+                             connect_timeout=S3_CONNECT_TIMEOUT_SECONDS,
+                             read_timeout=S3_READ_TIMEOUT_SECONDS,
+                             retries={"mode": "standard"})
+
             S3Client.s3_resource = boto3.resource(
                 's3',
                 aws_access_key_id = _access_key_id,
                 aws_secret_access_key = _secret_access_key,
-                region_name = region_name
+                region_name = region_name,
+                endpoint_url = _endpoint_url,
+                config = _config
             )
 
             S3Client.s3_client = boto3.client(
                 's3',
                 aws_access_key_id = _access_key_id,
                 aws_secret_access_key = _secret_access_key,
-                region_name = region_name
+                region_name = region_name,
+                endpoint_url = _endpoint_url,
+                config = _config
             )
 
-            self.s3_resource = S3Client.s3_resource
-            self.s3_client = S3Client.s3_client
\ No newline at end of file
+        self.s3_resource = S3Client.s3_resource
+        self.s3_client = S3Client.s3_client
\ No newline at end of file
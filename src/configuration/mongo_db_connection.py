@@ -1,15 +1,156 @@
 import os
 import sys
+import threading
+import importlib.util
 import pymongo
 import certifi
+from pymongo import monitoring
 
 from src.exception import MyException
 from src.logger import logging
-from src.constants import DATABASE_NAME, MONGODB_URL_KEY
+from src.constants import (DATABASE_NAME, MONGODB_URL_KEY, MONGODB_MAX_POOL_SIZE, MONGODB_MAX_POOL_SIZE_ENV_KEY,
+                           MONGODB_MIN_POOL_SIZE, MONGODB_MIN_POOL_SIZE_ENV_KEY, MONGODB_MAX_IDLE_TIME_MS,
+                           MONGODB_MAX_IDLE_TIME_MS_ENV_KEY, MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                           MONGODB_WAIT_QUEUE_TIMEOUT_MS_ENV_KEY, MONGODB_CONNECT_TIMEOUT_MS,
+                           MONGODB_CONNECT_TIMEOUT_MS_ENV_KEY, MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                           MONGODB_SERVER_SELECTION_TIMEOUT_MS_ENV_KEY, MONGODB_SOCKET_TIMEOUT_MS,
+                           MONGODB_SOCKET_TIMEOUT_MS_ENV_KEY, MONGODB_COMPRESSORS, MONGODB_COMPRESSORS_ENV_KEY,
+                           MONGODB_READ_PREFERENCE, MONGODB_READ_PREFERENCE_ENV_KEY, MONGODB_RETRY_READS,
+                           MONGODB_RETRY_READS_ENV_KEY, MONGODB_RETRY_WRITES, MONGODB_RETRY_WRITES_ENV_KEY)
 
 # Load the certificate authority file to avoid timeout errors when connecting to MongoDB
 ca = certifi.where()
 
+# wire protocol compressors supported by MongoDB and the module each one needs
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def _env_bool(key: str, default: bool) -> bool:
+    return os.getenv(key, str(default)).lower() in ("1", "true", "yes")
+
+
+def _get_compressors(value: str) -> list:
+    """
+    Parses a comma separated list of compressors, keeping the order of preference and
+    leaving out those whose module is not installed. Unknown names raise.
+    """
+    compressors = []
+    for name in filter(None, (name.strip().lower() for name in value.split(","))):
+        if name not in COMPRESSOR_MODULES:
+            raise ValueError(f"Unknown MongoDB compressor {name}, expected some of {', '.join(COMPRESSOR_MODULES)}")
+        if importlib.util.find_spec(COMPRESSOR_MODULES[name]) is not None:
+            compressors.append(name)
+    return compressors
+
+
+def get_mongo_client_options() -> dict:
+    """
+    Returns the MongoClient keyword arguments of the pool, timeout, compression and retry
+    settings, taken from the environment variables and then from the constants.
+    Compressors whose library is not installed are left out.
+    """
+    compressors = _get_compressors(os.getenv(MONGODB_COMPRESSORS_ENV_KEY, MONGODB_COMPRESSORS))
+    return {
+        "maxPoolSize": int(os.getenv(MONGODB_MAX_POOL_SIZE_ENV_KEY, MONGODB_MAX_POOL_SIZE)),
+        "minPoolSize": int(os.getenv(MONGODB_MIN_POOL_SIZE_ENV_KEY, MONGODB_MIN_POOL_SIZE)),
+        "maxIdleTimeMS": int(os.getenv(MONGODB_MAX_IDLE_TIME_MS_ENV_KEY, MONGODB_MAX_IDLE_TIME_MS)),
+        "waitQueueTimeoutMS": int(os.getenv(MONGODB_WAIT_QUEUE_TIMEOUT_MS_ENV_KEY, MONGODB_WAIT_QUEUE_TIMEOUT_MS)),
+        "connectTimeoutMS": int(os.getenv(MONGODB_CONNECT_TIMEOUT_MS_ENV_KEY, MONGODB_CONNECT_TIMEOUT_MS)),
+        "serverSelectionTimeoutMS": int(os.getenv(MONGODB_SERVER_SELECTION_TIMEOUT_MS_ENV_KEY,
+                                                  MONGODB_SERVER_SELECTION_TIMEOUT_MS)),
+        "socketTimeoutMS": int(os.getenv(MONGODB_SOCKET_TIMEOUT_MS_ENV_KEY, MONGODB_SOCKET_TIMEOUT_MS)),
+        "compressors": compressors or None,
+        "readPreference": os.getenv(MONGODB_READ_PREFERENCE_ENV_KEY, MONGODB_READ_PREFERENCE),
+        "retryReads": _env_bool(MONGODB_RETRY_READS_ENV_KEY, MONGODB_RETRY_READS),
+        "retryWrites": _env_bool(MONGODB_RETRY_WRITES_ENV_KEY, MONGODB_RETRY_WRITES),
+    }
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener counting how often and how long threads wait for a pooled
+    connection, to size MONGODB_MAX_POOL_SIZE for parallel workers: a growing wait time
+    means the pool is too small, many open connections per process that it is too large.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        """Zeroes the counters, with a new lock since a forked child may inherit the lock held"""
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkout_failures = {}
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.checked_out = 0
+        self.connections_open = 0
+        self.pool_clears = 0
+
+    def _record_wait(self, duration: float) -> None:
+        self.wait_seconds_total += duration
+        self.wait_seconds_max = max(self.wait_seconds_max, duration)
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self._record_wait(event.duration)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures[event.reason] = self.checkout_failures.get(event.reason, 0) + 1
+            self._record_wait(event.duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def stats(self) -> dict:
+        """Returns the pool counters of this process"""
+        with self._lock:
+            waits = self.checkouts + sum(self.checkout_failures.values())
+            return {
+                "checkouts": self.checkouts,
+                "checkout_failures": dict(self.checkout_failures),
+                "wait_seconds_total": self.wait_seconds_total,
+                "wait_seconds_mean": self.wait_seconds_total / waits if waits else 0.0,
+                "wait_seconds_max": self.wait_seconds_max,
+                "checked_out": self.checked_out,
+                "connections_open": self.connections_open,
+                "pool_clears": self.pool_clears,
+            }
+
+
+# Pool metrics of the MongoDB clients of this process
+pool_metrics = MongoPoolMetrics()
+
 class MongoDBClient:
     """
     MongoDBClient is responsible for establishing a connection to the MongoDB database.
@@ -17,7 +158,7 @@ class MongoDBClient:
     Attributes:
     ----------
     client : MongoClient
-        A shared MongoClient instance for the class.
+        A MongoClient instance shared by all instances of the class within a process.
     database : Database
         The specific database instance that MongoDBClient connects to.
 
@@ -25,9 +166,14 @@ class MongoDBClient:
     -------
     __init__(database_name: str) -> None
         Initializes the MongoDB connection using the given database name.
+
+    A MongoClient must not be used across fork: its pooled sockets and monitor threads
+    belong to the parent. The shared client is therefore dropped in forked children and
+    recreated lazily by the first MongoDBClient of the child process.
     """
 
     client = None  # Shared MongoClient instance across all MongoDBClient instances
+    _client_pid = None  # Process that created the shared client
 
     def __init__(self, database_name: str = DATABASE_NAME) -> None:
         """
@@ -44,14 +190,16 @@ class MongoDBClient:
             If there is an issue connecting to MongoDB or if the environment variable for the MongoDB URL is not set.
         """
         try:
-            # Check if a MongoDB client connection has already been established; if not, create a new one
-            if MongoDBClient.client is None:
+            # Check if a MongoDB client connection has already been established in this process; if not, create a new one
+            if MongoDBClient.client is None or MongoDBClient._client_pid != os.getpid():
                 mongo_db_url = os.getenv(MONGODB_URL_KEY)  # Retrieve MongoDB URL from environment variables
                 if mongo_db_url is None:
                     raise Exception(f"Environment variable '{MONGODB_URL_KEY}' is not set.")
                 
                 # Establish a new MongoDB client connection
-                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca)
+                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca, event_listeners=[pool_metrics],
+                                                           **get_mongo_client_options())
+                MongoDBClient._client_pid = os.getpid()
                 
             # Use the shared MongoClient for this instance
             self.client = MongoDBClient.client
@@ -61,4 +209,19 @@ class MongoDBClient:
             
         except Exception as e:
             # Raise a custom exception with traceback details if connection fails
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+    @staticmethod
+    def _reset_after_fork() -> None:
+        """Forgets the parent's client in a forked child, without closing the parent's sockets"""
+        MongoDBClient.client = None
+        MongoDBClient._client_pid = None
+        pool_metrics.reset()
+
+    @staticmethod
+    def get_pool_stats() -> dict:
+        """Returns the connection pool counters of this process"""
+        return pool_metrics.stats()
+
+
+os.register_at_fork(after_in_child=MongoDBClient._reset_after_fork)
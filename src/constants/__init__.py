@@ -1,15 +1,59 @@
 import os
+import tempfile
 from datetime import date
 
 # For MongoDB connection
 DATABASE_NAME = "Proj1"
 COLLECTION_NAME = "Proj1-Data"
 MONGODB_URL_KEY = "MONGODB_URL"
+# MongoDB client options, each can be overridden by the environment variable of the same name
+MONGODB_MAX_POOL_SIZE_ENV_KEY = "MONGODB_MAX_POOL_SIZE"
+MONGODB_MAX_POOL_SIZE: int = 100 # per process; size it for the threads or coroutines sharing the client
+MONGODB_MIN_POOL_SIZE_ENV_KEY = "MONGODB_MIN_POOL_SIZE"
+MONGODB_MIN_POOL_SIZE: int = 0
+MONGODB_MAX_IDLE_TIME_MS_ENV_KEY = "MONGODB_MAX_IDLE_TIME_MS"
+MONGODB_MAX_IDLE_TIME_MS: int = 60000
+MONGODB_WAIT_QUEUE_TIMEOUT_MS_ENV_KEY = "MONGODB_WAIT_QUEUE_TIMEOUT_MS"
+MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 30000 # fail instead of waiting forever for a free pooled connection
+MONGODB_CONNECT_TIMEOUT_MS_ENV_KEY = "MONGODB_CONNECT_TIMEOUT_MS"
+MONGODB_CONNECT_TIMEOUT_MS: int = 5000
+MONGODB_SERVER_SELECTION_TIMEOUT_MS_ENV_KEY = "MONGODB_SERVER_SELECTION_TIMEOUT_MS"
+MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+MONGODB_SOCKET_TIMEOUT_MS_ENV_KEY = "MONGODB_SOCKET_TIMEOUT_MS"
+MONGODB_SOCKET_TIMEOUT_MS: int = 120000 # per network round trip, e.g. one batch of a collection export
+MONGODB_OPERATION_TIMEOUT_MS_ENV_KEY = "MONGODB_OPERATION_TIMEOUT_MS"
+MONGODB_OPERATION_TIMEOUT_MS: int = 10000 # client side timeout of a whole operation of the async client, retries included
+MONGODB_COMPRESSORS_ENV_KEY = "MONGODB_COMPRESSORS"
+MONGODB_COMPRESSORS: str = "zstd,snappy,zlib" # in order of preference, the ones not installed are skipped
+MONGODB_READ_PREFERENCE_ENV_KEY = "MONGODB_READ_PREFERENCE"
+MONGODB_READ_PREFERENCE: str = "primary" # e.g. "secondaryPreferred" keeps collection exports off the primary
+MONGODB_RETRY_READS_ENV_KEY = "MONGODB_RETRY_READS"
+MONGODB_RETRY_READS: bool = True
+MONGODB_RETRY_WRITES_ENV_KEY = "MONGODB_RETRY_WRITES"
+MONGODB_RETRY_WRITES: bool = True
+
+# Logging configuration, each can be overridden by the environment variable of the same name
+LOG_QUEUE_ENABLED_ENV_KEY = "LOG_QUEUE"
+LOG_QUEUE_ENABLED: bool = True # log through a queue and a listener thread instead of writing in the caller
+LOG_QUEUE_SIZE: int = 10000 # records beyond it are dropped rather than blocking the caller
+LOG_FORMAT_ENV_KEY = "LOG_FORMAT"
+LOG_FORMAT: str = "text" # "text" or "json"
+LOG_LEVELS_ENV_KEY = "LOG_LEVELS"
+LOG_LEVELS: str = "DEBUG,botocore=INFO,urllib3=INFO,pymongo=INFO" # default level, then module=level pairs
+LOG_DEBUG_SAMPLE_RATE_ENV_KEY = "LOG_DEBUG_SAMPLE_RATE"
+LOG_DEBUG_SAMPLE_RATE: float = 0.01 # share of DEBUG records kept
 
 PIPELINE_NAME: str = ""
 ARTIFACT_DIR: str = "artifact"
+PIPELINE_PROFILE_FILE_NAME: str = "profile.json"
+PIPELINE_PROFILE_FLAMEGRAPH_FILE_NAME: str = "flamegraph.svg"
+PIPELINE_PROFILE_FLAMEGRAPH_ENV_KEY = "PIPELINE_PROFILE_FLAMEGRAPH" # set to 1 to record a flamegraph with py-spy
+PIPELINE_PROFILE_SAMPLING_RATE: int = 100 # py-spy samples per second
 
 MODEL_FILE_NAME = "model.pkl"
+MODEL_COMPILED_FILE_NAME = "model.bin"
+MODEL_ARTIFACT_FORMAT_ENV_KEY = "MODEL_ARTIFACT_FORMAT"
+MODEL_ARTIFACT_FORMAT: str = "dill" # "dill" or "compiled"
 
 TARGET_COLUMN = "Response"
 CURRENT_YEAR = date.today().year
@@ -24,6 +68,25 @@ SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
 AWS_ACCESS_KEY_ID_ENV_KEY = "AWS_ACCESS_KEY_ID"
 AWS_SECRET_ACCESS_KEY_ENV_KEY = "AWS_SECRET_ACCESS_KEY"
 REGION_NAME = "us-east-1"
+AWS_ENDPOINT_URL_ENV_KEY = "AWS_ENDPOINT_URL" # point S3 at a compatible endpoint such as MinIO
+S3_TRANSFER_MULTIPART_THRESHOLD: int = 16 * 1024 * 1024
+S3_TRANSFER_MULTIPART_CHUNKSIZE: int = 16 * 1024 * 1024
+S3_TRANSFER_MAX_CONCURRENCY: int = 16
+S3_CHECKSUM_METADATA_KEY: str = "sha256"
+S3_MAX_POOL_CONNECTIONS: int = 32 # at least S3_TRANSFER_MAX_CONCURRENCY + STORAGE_ASYNC_MAX_WORKERS
+S3_CONNECT_TIMEOUT_SECONDS: int = 5
+S3_READ_TIMEOUT_SECONDS: int = 60
+
+STORAGE_BACKEND_ENV_KEY = "STORAGE_BACKEND"
+STORAGE_BACKEND: str = "s3" # "s3", "local" or "memory"
+LOCAL_STORAGE_DIR_ENV_KEY = "LOCAL_STORAGE_DIR"
+LOCAL_STORAGE_DIR: str = "local_storage"
+STORAGE_ASYNC_MAX_WORKERS: int = 16 # threads serving the storage calls of the async app
+STORAGE_ASYNC_TIMEOUT_SECONDS: float = 30.0
+
+MODEL_CACHE_DIR_ENV_KEY = "MODEL_CACHE_DIR"
+MODEL_CACHE_DIR: str = os.path.join(tempfile.gettempdir(), "proj1_model_cache") # shared by the processes of a host
+MODEL_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
 
 
 """
@@ -55,6 +118,7 @@ MODEL_TRAINER_DIR_NAME: str = "model_trainer"
 MODEL_TRAINER_TRAINED_MODEL_DIR: str = "trained_model"
 MODEL_TRAINER_TRAINED_MODEL_NAME: str = "model.pkl"
 MODEL_TRAINER_EXPECTED_SCORE: float = 0.6
+MODEL_TRAINER_DECISION_THRESHOLD: float = 0.5 # stored with the model, tune it from the evaluation report curves
 MODEL_TRAINER_MODEL_CONFIG_FILE_PATH: str = os.path.join("config", "model.yaml")
 MODEL_TRAINER_N_ESTIMATORS=200
 MODEL_TRAINER_MIN_SAMPLES_SPLIT: int = 7
@@ -67,9 +131,80 @@ MIN_SAMPLES_SPLIT_RANDOM_STATE: int = 101
 MODEL Evaluation related constants
 """
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
+MODEL_EVALUATION_DIR_NAME: str = "model_evaluation"
+MODEL_EVALUATION_REPORT_FILE_NAME: str = "report.json"
+MODEL_EVALUATION_SCORING_CACHE_DIR: str = os.path.join(ARTIFACT_DIR, "model_evaluation_cache")
+MODEL_EVALUATION_MODE: str = "bootstrap" # "bootstrap" or "point"
+MODEL_EVALUATION_BOOTSTRAP_RESAMPLES: int = 10000
+MODEL_EVALUATION_BOOTSTRAP_CONFIDENCE: float = 0.95
+MODEL_EVALUATION_BOOTSTRAP_RANDOM_STATE: int = 42
 MODEL_BUCKET_NAME = "762233744612-my-model-mlopsproj"
 MODEL_PUSHER_S3_KEY = "model-registry"
+MODEL_REGISTRY_MANIFEST_FILE_NAME: str = "manifest.json"
+MODEL_REGISTRY_METADATA_FILE_NAME: str = "metadata.json"
 
 
 APP_HOST = "0.0.0.0"
-APP_PORT = 5000
\ No newline at end of file
+APP_PORT = 5000
+
+"""
+Serving related constant start with SERVING var name
+"""
+# set by the parent process of the serving workers to the local model file all workers map
+SERVING_SHARED_MODEL_PATH_ENV_KEY = "SHARED_MODEL_PATH"
+SERVING_SHARED_MODEL_VERSION_ENV_KEY = "SHARED_MODEL_VERSION"
+SERVING_WORKERS_ENV_KEY = "SERVING_WORKERS" # defaults to the number of cores
+SERVING_LISTEN_BACKLOG: int = 2048
+SERVING_GRACEFUL_TIMEOUT: int = 30 # seconds a retiring worker gets to finish its requests
+SERVING_WORKER_READY_TIMEOUT: int = 60 # seconds a new worker gets to start accepting connections
+SERVING_WARM_UP_BATCH_SIZES = (1, 16, 256)
+SERVING_WARM_UP_RETRY_SECONDS: int = 10
+PREDICTION_CACHE_MAX_BYTES_ENV_KEY = "PREDICTION_CACHE_MAX_BYTES"
+PREDICTION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024 # 0 disables the prediction cache
+PREDICTION_CACHE_TTL_SECONDS_ENV_KEY = "PREDICTION_CACHE_TTL_SECONDS"
+PREDICTION_CACHE_TTL_SECONDS: int = 3600
+PREDICTION_CACHE_MAX_BATCH_ROWS: int = 1024 # larger batches bypass the cache instead of flushing it
+# served predictions persisted to MongoDB for auditing and retraining, needs MONGODB_URL
+PREDICTION_LOG_ENABLED_ENV_KEY = "PREDICTION_LOG_ENABLED"
+PREDICTION_LOG_ENABLED: bool = True
+PREDICTION_LOG_COLLECTION_NAME_ENV_KEY = "PREDICTION_LOG_COLLECTION_NAME"
+PREDICTION_LOG_COLLECTION_NAME: str = "Proj1-Predictions"
+PREDICTION_LOG_POLICY_ENV_KEY = "PREDICTION_LOG_POLICY"
+PREDICTION_LOG_POLICY: str = "drop" # "drop" records or "block" requests when the queue is full
+PREDICTION_LOG_QUEUE_SIZE: int = 10000
+PREDICTION_LOG_BATCH_SIZE: int = 500
+PREDICTION_LOG_FLUSH_INTERVAL_SECONDS: float = 1.0
+PREDICTION_LOG_SHUTDOWN_TIMEOUT_SECONDS: float = 10.0
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384)
+SERVING_IMPORT_BUDGET_SECONDS: float = 2.0 # budget for importing the serving app, checked by src.utils.startup_profile
+# modules of the training stack and cloud clients that importing the serving app must not load
+SERVING_FORBIDDEN_IMPORTS = ("imblearn", "sklearn", "scipy", "matplotlib", "boto3", "botocore", "pymongo")
+
+"""
+Batch scoring related constant start with BATCH_SCORING var name
+"""
+BATCH_SCORING_CHUNK_SIZE: int = 50000
+BATCH_SCORING_MAX_IN_FLIGHT_PER_WORKER: int = 2 # chunks read ahead per scoring process, bounds memory
+BATCH_SCORING_MODEL_FORMAT: str = "dill" # sklearn scores large chunks faster than the compiled model's tree walk
+
+"""
+Benchmark related constant start with BENCHMARK var name
+"""
+BENCHMARK_RESULTS_DIR: str = "benchmark_results"
+BENCHMARK_BATCH_SIZES = (1, 10, 100, 1000, 10000, 100000)
+BENCHMARK_HTTP_BATCH_SIZES = (1, 100, 1000, 10000) # JSON encoding dominates beyond these
+BENCHMARK_CONCURRENCY_LEVELS = (1, 8, 64, 256)
+BENCHMARK_HTTP_MAX_ROWS_IN_FLIGHT: int = 262144 # larger batch size x concurrency cases are skipped
+BENCHMARK_TRAIN_ROWS: int = 20000 # rows the synthetic model of the inference benchmark is trained on
+BENCHMARK_MIN_SECONDS: float = 1.0 # each case repeats for at least this long
+BENCHMARK_MIN_REPEATS: int = 5
+BENCHMARK_MAX_REGRESSION: float = 0.2 # allowed relative p95 increase or throughput decrease against a baseline
+BENCHMARK_PIPELINE_ROWS = (100000, 1000000, 10000000)
+BENCHMARK_WORK_DIR: str = os.path.join(BENCHMARK_RESULTS_DIR, "pipeline_runs") # generated collections and run artifacts
+
+"""
+Synthetic data related constant start with SYNTHETIC_DATA var name
+"""
+SYNTHETIC_DATA_CHUNK_SIZE: int = 1000000 # rows generated at once, bounds the memory of file and MongoDB output
+SYNTHETIC_DATA_MONGO_BATCH_SIZE: int = 10000 # records per insert_many call
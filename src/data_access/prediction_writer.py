@@ -0,0 +1,172 @@
+import asyncio
+import os
+import sys
+import time
+from typing import List, Optional
+
+from src.constants import (DATABASE_NAME, MONGODB_URL_KEY, PREDICTION_LOG_BATCH_SIZE, PREDICTION_LOG_COLLECTION_NAME,
+                           PREDICTION_LOG_COLLECTION_NAME_ENV_KEY, PREDICTION_LOG_ENABLED,
+                           PREDICTION_LOG_ENABLED_ENV_KEY, PREDICTION_LOG_FLUSH_INTERVAL_SECONDS,
+                           PREDICTION_LOG_POLICY, PREDICTION_LOG_POLICY_ENV_KEY, PREDICTION_LOG_QUEUE_SIZE,
+                           PREDICTION_LOG_SHUTDOWN_TIMEOUT_SECONDS)
+from src.exception import MyException
+from src.logger import logging
+
+# queued by stop() behind the pending records
+_STOP = object()
+
+
+class PredictionWriter:
+    """
+    Background writer persisting served predictions to a MongoDB collection.
+
+    Request handlers only put records on a bounded asyncio queue; a background task takes
+    them off in batches of up to batch_size records, or whatever arrived within
+    flush_interval, and writes each batch with one unordered insert_many, so a single bad
+    record does not stop the rest of its batch.
+    When the queue is full, the "drop" policy discards new records and counts them, so a
+    slow database never adds request latency, and the "block" policy makes requests wait
+    for room, so no record is lost. stop() flushes what is queued on shutdown.
+    """
+    def __init__(self, collection_name: Optional[str] = None, database_name: str = DATABASE_NAME,
+                 policy: Optional[str] = None, max_queue_size: int = PREDICTION_LOG_QUEUE_SIZE,
+                 batch_size: int = PREDICTION_LOG_BATCH_SIZE,
+                 flush_interval: float = PREDICTION_LOG_FLUSH_INTERVAL_SECONDS, collection=None):
+        """
+        collection_name: collection to write to, defaults to the PREDICTION_LOG_COLLECTION_NAME
+                         environment variable and then to the constant
+        policy: "drop" or "block", defaults like collection_name
+        collection: async collection to write to instead of the one in database_name
+        """
+        self.collection_name = collection_name or os.getenv(PREDICTION_LOG_COLLECTION_NAME_ENV_KEY,
+                                                            PREDICTION_LOG_COLLECTION_NAME)
+        self.database_name = database_name
+        self.policy = (policy or os.getenv(PREDICTION_LOG_POLICY_ENV_KEY, PREDICTION_LOG_POLICY)).lower()
+        if self.policy not in ("drop", "block"):
+            raise MyException(Exception(f"Unknown prediction log policy: {self.policy}"), sys)
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.collection = collection
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        """True while the writer accepts records"""
+        return self._task is not None and not self._stopping
+
+    async def start(self) -> None:
+        """
+        Starts the background task. Does nothing if prediction logging is disabled by the
+        PREDICTION_LOG_ENABLED environment variable or MongoDB is not configured.
+        """
+        enabled = os.getenv(PREDICTION_LOG_ENABLED_ENV_KEY, str(PREDICTION_LOG_ENABLED)).lower() in ("1", "true", "yes")
+        if not enabled or (self.collection is None and os.getenv(MONGODB_URL_KEY) is None):
+            logging.info("Prediction logging is disabled")
+            return
+        try:
+            if self.collection is None:
+                # imported here so that importing the app does not load pymongo
+                from src.configuration.async_mongo_db_connection import AsyncMongoDBClient
+                self.collection = AsyncMongoDBClient(database_name=self.database_name).database[self.collection_name]
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+            logging.info(f"Prediction logging to {self.database_name}.{self.collection_name} with policy {self.policy}")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    async def record(self, records: List[dict]) -> None:
+        """
+        Queues prediction records for writing, applying the backpressure policy when the queue is full.
+        """
+        if not self.enabled:
+            return
+        for record in records:
+            if self.policy == "block":
+                await self._queue.put(record)
+            else:
+                try:
+                    self._queue.put_nowait(record)
+                except asyncio.QueueFull:
+                    self.dropped += 1
+
+    async def _next_batch(self) -> tuple:
+        """
+        Waits for the first record, then collects more until the batch is full or flush_interval passed.
+        Returns: the batch and whether the writer was asked to stop
+        """
+        record = await self._queue.get()
+        if record is _STOP:
+            return [], True
+        batch = [record]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                record = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if record is _STOP:
+                return batch, True
+            batch.append(record)
+        return batch, False
+
+    async def _write(self, batch: list) -> None:
+        try:
+            await self.collection.insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except Exception as e:
+            # with an unordered insert the records before and after a failing one are still written
+            inserted = (getattr(e, "details", None) or {}).get("nInserted", 0)
+            self.written += inserted
+            self.failed += len(batch) - inserted
+            logging.info(f"Writing {len(batch)} prediction records failed, {inserted} written: {e}")
+
+    async def _run(self) -> None:
+        stop = False
+        while not stop:
+            batch, stop = await self._next_batch()
+            if batch:
+                await self._write(batch)
+
+    async def stop(self, timeout: float = PREDICTION_LOG_SHUTDOWN_TIMEOUT_SECONDS) -> None:
+        """
+        Stops accepting records and waits up to timeout seconds for the queued ones to be written.
+        """
+        if self._task is None:
+            return
+        self._stopping = True
+        try:
+            # queued behind the pending records, so everything before it is written first
+            await asyncio.wait_for(self._queue.put(_STOP), timeout=timeout)
+            await asyncio.wait_for(self._task, timeout=timeout)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+            logging.info(f"Prediction writer did not flush within {timeout}s")
+        while not self._queue.empty():
+            if self._queue.get_nowait() is not _STOP:
+                self.dropped += 1
+        self._task = None
+        logging.info(f"Prediction writer stopped: {self.stats()}")
+
+    def stats(self) -> dict:
+        """Returns the counters of the writer"""
+        return {
+            "enabled": self.enabled,
+            "policy": self.policy,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
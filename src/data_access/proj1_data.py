@@ -1,11 +1,13 @@
 import sys
 import pandas as pd
 import numpy as np
-from typing import Optional
+from typing import Iterator, Optional
 
 from src.configuration.mongo_db_connection import MongoDBClient
 from src.constants import DATABASE_NAME
 from src.exception import MyException
+from src.logger import logging
+from src.utils.profiler import profile_stage
 
 class Proj1Data:
     """
@@ -42,16 +44,46 @@ class Proj1Data:
             if database_name is None:
                 collection = self.mongo_client.database[collection_name]
             else:
-                collection = self.mongo_client[database_name][collection_name]
+                collection = self.mongo_client.client[database_name][collection_name]
 
             # Convert collection data to DataFrame and preprocess
             print("Fetching data from mongoDB")
-            df = pd.DataFrame(list(collection.find()))
+            with profile_stage("mongo_fetch") as stage:
+                df = pd.DataFrame(list(collection.find()))
+                stage.rows_out = len(df)
             print(f"Data fecthed with len: {len(df)}")
+            logging.info(f"MongoDB connection pool: {MongoDBClient.get_pool_stats()}")
             if "id" in df.columns.to_list():
-                df = df.drop(columns=["id"], axis=1)
+                df = df.drop(columns=["id"])
             df.replace({"na":np.nan},inplace=True)
             return df
 
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+    def iter_collection_batches(self, collection_name: str, batch_size: int,
+                                database_name: Optional[str] = None) -> Iterator[pd.DataFrame]:
+        """
+        Streams a MongoDB collection as DataFrames of at most batch_size records, so that
+        collections larger than memory can be processed chunk by chunk.
+
+        Unlike export_collection_as_dataframe, the 'id' column is kept, so that results can
+        be joined back to the records; '_id' is not fetched.
+        """
+        try:
+            if database_name is None:
+                collection = self.mongo_client.database[collection_name]
+            else:
+                collection = self.mongo_client.client[database_name][collection_name]
+
+            records = []
+            for record in collection.find({}, {"_id": 0}, batch_size=batch_size):
+                records.append(record)
+                if len(records) == batch_size:
+                    yield pd.DataFrame(records).replace({"na": np.nan})
+                    records = []
+            if records:
+                yield pd.DataFrame(records).replace({"na": np.nan})
+
+        except Exception as e:
+            raise MyException(e, sys)
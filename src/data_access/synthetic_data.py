@@ -0,0 +1,244 @@
+import argparse
+import os
+import sys
+import time
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.constants import (COLLECTION_NAME, SCHEMA_FILE_PATH, SYNTHETIC_DATA_CHUNK_SIZE,
+                           SYNTHETIC_DATA_MONGO_BATCH_SIZE)
+from src.exception import MyException
+from src.logger import logging
+from src.utils.main_utils import read_yaml_file
+
+
+class SyntheticDataGenerator:
+    """
+    Generates records shaped like the production collection from the distributions section
+    of config/schema.yaml: categorical frequencies, numeric distributions and a Response
+    whose rate depends on other columns, with the production class imbalance.
+
+    Every column is drawn for a whole chunk at once with numpy, so millions of rows take
+    seconds. Output is generated in chunks of chunk_size rows, which bounds memory when
+    writing files or inserting into MongoDB; the data depends on random_state and chunk_size.
+
+    Supported distribution types, see config/schema.yaml:
+        sequence     consecutive integers from start
+        categorical  values with their probabilities, optionally `other: [low, high]` integers
+                     drawn uniformly for the remaining probability
+        bernoulli    0/1 with rate, optionally rescaled per row by `depends_on` factors
+        uniform      integers between low and high, both included
+        mixture      weighted normal components ({mean, std}) and point masses ({value}), clipped
+    """
+    def __init__(self, schema_file_path: str = SCHEMA_FILE_PATH, random_state: Optional[int] = 0,
+                 chunk_size: int = SYNTHETIC_DATA_CHUNK_SIZE):
+        """
+        schema_file_path: schema with the columns, their types and the distributions section
+        random_state: seed of the generated data, None for different data on every run
+        chunk_size: rows generated at once
+        """
+        try:
+            schema = read_yaml_file(file_path=schema_file_path)
+            self.column_types = {name: column_type for column in schema["columns"]
+                                 for name, column_type in column.items()}
+            self.distributions = schema["distributions"]
+            self.random_state = random_state
+            self.chunk_size = chunk_size
+            self._validate()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _validate(self) -> None:
+        generated = []
+        for name, distribution in self.distributions.items():
+            if name not in self.column_types:
+                raise Exception(f"Distribution of {name}, which is not a schema column")
+            if not hasattr(self, f"_draw_{distribution['type']}"):
+                raise Exception(f"Unknown distribution type {distribution['type']} of {name}")
+            for dependency in distribution.get("depends_on", {}):
+                if dependency not in generated:
+                    raise Exception(f"{name} depends on {dependency}, which must be listed before it")
+            generated.append(name)
+        missing = set(self.column_types) - set(self.distributions)
+        if missing:
+            raise Exception(f"No distribution for the schema columns {sorted(missing)}")
+
+    def _draw_sequence(self, rng, distribution: dict, rows: int, offset: int, chunk: dict) -> np.ndarray:
+        return np.arange(rows, dtype=np.int64) + distribution.get("start", 0) + offset
+
+    def _draw_categorical(self, rng, distribution: dict, rows: int, offset: int, chunk: dict):
+        values = list(distribution["values"])
+        probabilities = np.array(list(distribution["values"].values()), dtype=np.float64)
+        other = distribution.get("other")
+        if other is None:
+            codes = rng.choice(len(values), size=rows, p=probabilities / probabilities.sum())
+            if all(isinstance(value, str) for value in values):
+                return pd.Categorical.from_codes(codes, categories=values)
+            return np.asarray(values)[codes]
+        # the last code stands for the values drawn from the other range
+        probabilities = np.append(probabilities, max(0.0, 1.0 - probabilities.sum()))
+        codes = rng.choice(len(probabilities), size=rows, p=probabilities / probabilities.sum())
+        result = np.append(np.asarray(values, dtype=np.float64), np.nan)[codes]
+        is_other = codes == len(values)
+        result[is_other] = rng.integers(other[0], other[1] + 1, size=int(is_other.sum()))
+        return result
+
+    def _draw_bernoulli(self, rng, distribution: dict, rows: int, offset: int, chunk: dict) -> np.ndarray:
+        rate = distribution["rate"]
+        factors = np.ones(rows)
+        for column, column_factors in distribution.get("depends_on", {}).items():
+            factors *= pd.Series(chunk[column]).map(column_factors).astype(np.float64).fillna(1.0).to_numpy()
+        # rescaled so that the rate over the chunk stays at rate
+        if factors.mean() > 0:
+            factors *= rate / factors.mean()
+        probabilities = np.clip(factors, 0.0, 1.0)
+        return (rng.random(rows) < probabilities).astype(np.int64)
+
+    def _draw_uniform(self, rng, distribution: dict, rows: int, offset: int, chunk: dict) -> np.ndarray:
+        return rng.integers(distribution["low"], distribution["high"] + 1, size=rows)
+
+    def _draw_mixture(self, rng, distribution: dict, rows: int, offset: int, chunk: dict) -> np.ndarray:
+        components = distribution["components"]
+        weights = np.array([component["weight"] for component in components], dtype=np.float64)
+        # a point mass is a component with its value as mean and no spread
+        means = np.array([component.get("value", component.get("mean")) for component in components], dtype=np.float64)
+        stds = np.array([component.get("std", 0.0) for component in components], dtype=np.float64)
+        component = rng.choice(len(components), size=rows, p=weights / weights.sum())
+        values = means[component] + stds[component] * rng.standard_normal(rows)
+        if "clip" in distribution:
+            values = np.clip(values, *distribution["clip"])
+        return values
+
+    def _cast(self, name: str, values):
+        column_type = self.column_types[name]
+        if column_type == "int":
+            return np.rint(values).astype(np.int64) if np.asarray(values).dtype.kind == "f" else \
+                np.asarray(values, dtype=np.int64)
+        if column_type == "float":
+            # the float columns of the collection hold whole numbers
+            return np.round(np.asarray(values, dtype=np.float64))
+        return values
+
+    def generate_chunk(self, rows: int, offset: int = 0, chunk_index: int = 0) -> pd.DataFrame:
+        """
+        Generates rows records in schema column order.
+        offset: position of the first record, where sequences continue
+        chunk_index: selects the random stream, so that chunks differ from each other
+        """
+        try:
+            rng = np.random.default_rng(None if self.random_state is None else [self.random_state, chunk_index])
+            chunk = {}
+            for name, distribution in self.distributions.items():
+                chunk[name] = self._cast(name, getattr(self, f"_draw_{distribution['type']}")(
+                    rng, distribution, rows, offset, chunk))
+            return pd.DataFrame({name: chunk[name] for name in self.column_types})
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def iter_chunks(self, rows: int) -> Iterator[pd.DataFrame]:
+        """Generates rows records as DataFrames of at most chunk_size rows"""
+        for chunk_index, offset in enumerate(range(0, rows, self.chunk_size)):
+            yield self.generate_chunk(min(self.chunk_size, rows - offset), offset, chunk_index)
+
+    def generate(self, rows: int) -> pd.DataFrame:
+        """Generates rows records as one DataFrame"""
+        try:
+            chunks = list(self.iter_chunks(rows))
+            if not chunks:
+                return self.generate_chunk(0)
+            return chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def write_file(self, rows: int, file_path: str) -> None:
+        """
+        Writes rows records to a CSV file, or to a Parquet file if file_path ends with
+        .parquet, chunk by chunk.
+        """
+        logging.info(f"Entered write_file method of SyntheticDataGenerator class, {rows} rows to {file_path}")
+        try:
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            if file_path.endswith(".parquet"):
+                # imported here, pyarrow is only needed for Parquet output: pip install -e .[parquet]
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                writer = None
+                try:
+                    for chunk in self.iter_chunks(rows):
+                        table = pa.Table.from_pandas(chunk, preserve_index=False)
+                        if writer is None:
+                            writer = pq.ParquetWriter(file_path, table.schema)
+                        writer.write_table(table)
+                finally:
+                    if writer is not None:
+                        writer.close()
+            else:
+                for chunk_index, chunk in enumerate(self.iter_chunks(rows)):
+                    chunk.to_csv(file_path, mode="w" if chunk_index == 0 else "a", header=chunk_index == 0,
+                                 index=False)
+            logging.info("Exited write_file method of SyntheticDataGenerator class")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def insert_into_collection(self, rows: int, collection_name: str = COLLECTION_NAME,
+                               database_name: Optional[str] = None, batch_size: int = SYNTHETIC_DATA_MONGO_BATCH_SIZE,
+                               drop: bool = False) -> int:
+        """
+        Bulk inserts rows records into a MongoDB collection, e.g. of a local MongoDB named by
+        the MONGODB_URL environment variable, with unordered insert_many calls of batch_size
+        records.
+        drop: empties the collection first
+        Returns: the number of inserted records
+        """
+        logging.info(f"Entered insert_into_collection method of SyntheticDataGenerator class, "
+                     f"{rows} rows into {collection_name}")
+        try:
+            # imported here so that generating files does not need pymongo
+            from src.configuration.mongo_db_connection import MongoDBClient
+            from src.constants import DATABASE_NAME
+            mongo_client = MongoDBClient(database_name=database_name or DATABASE_NAME)
+            collection = mongo_client.database[collection_name]
+            if drop:
+                collection.drop()
+            inserted = 0
+            for chunk in self.iter_chunks(rows):
+                # categories as strings and numpy scalars as Python numbers, which BSON encodes
+                records = chunk.astype({name: object for name in chunk.columns
+                                        if isinstance(chunk[name].dtype, pd.CategoricalDtype)}).to_dict("records")
+                for start in range(0, len(records), batch_size):
+                    result = collection.insert_many(records[start:start + batch_size], ordered=False)
+                    inserted += len(result.inserted_ids)
+            logging.info(f"Exited insert_into_collection method of SyntheticDataGenerator class, {inserted} inserted")
+            return inserted
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+
+def main(argv=None) -> None:
+    """Command line entry point: generates a collection into a file or MongoDB"""
+    parser = argparse.ArgumentParser(description="Generate synthetic records shaped like the production collection.")
+    parser.add_argument("--rows", type=int, required=True)
+    parser.add_argument("--output", help="CSV or .parquet file to write, Parquet needs the parquet extra")
+    parser.add_argument("--collection", help="MongoDB collection to insert into, needs MONGODB_URL")
+    parser.add_argument("--database", help="MongoDB database, defaults to DATABASE_NAME")
+    parser.add_argument("--drop", action="store_true", help="empty the collection first")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=SYNTHETIC_DATA_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    if not args.output and not args.collection:
+        parser.error("one of --output and --collection is required")
+
+    generator = SyntheticDataGenerator(random_state=args.seed, chunk_size=args.chunk_size)
+    start = time.perf_counter()
+    if args.output:
+        generator.write_file(args.rows, args.output)
+        print(f"Wrote {args.rows} rows to {args.output} in {time.perf_counter() - start:.1f}s")
+    if args.collection:
+        inserted = generator.insert_into_collection(args.rows, args.collection, args.database, drop=args.drop)
+        print(f"Inserted {inserted} rows into {args.collection} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class DataIngestionArtifact:
@@ -22,11 +23,13 @@ class ClassificationMetricArtifact:
     f1_score: float
     precision_score: float
     recall_score: float
+    roc_auc_score: Optional[float] = None
 
 @dataclass
 class ModelTrainerArtifact:
     trained_model_file_path: str
     metric_artifact: ClassificationMetricArtifact
+    compiled_model_file_path: Optional[str] = None
 
 @dataclass
 class ModelEvaluationArtifact:
@@ -34,9 +37,13 @@ class ModelEvaluationArtifact:
     changed_accuracy:float
     s3_model_path:str
     trained_model_path:str 
+    trained_model_metric_artifact: Optional[ClassificationMetricArtifact] = None
+    data_fingerprint: Optional[str] = None
+    compiled_model_path: Optional[str] = None
 
 @dataclass
 class ModelPusherArtifact:
     bucket_name:str
     s3_model_path:str
+    model_version: Optional[str] = None
     
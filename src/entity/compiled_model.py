@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import mmap
+import struct
+
+import numpy as np
+import pandas as pd
+
+from src.entity.estimator import DEFAULT_DECISION_THRESHOLD, apply_decision_threshold
+from src.exception import MyException
+from src.logger import logging
+
+COMPILED_MODEL_MAGIC = b"VIMODEL1"
+COMPILED_MODEL_ALIGNMENT = 64
+COMPILED_MODEL_PREDICT_BATCH_SIZE = 8192
+
+
+class CompiledModel:
+    """
+    Flat array form of a MyModel made of the ColumnTransformer scaling pipeline and a
+    RandomForestClassifier, with the same predict interface as MyModel.
+
+    The preprocessing is stored as per output column parameters of
+    out = (x[source] - sub) / div * mul + add, which reproduces StandardScaler, MinMaxScaler
+    and passthrough columns operation for operation. The forest is stored as concatenated
+    node arrays of all trees and evaluated for all trees and rows at once.
+
+    Saved models are a single file of a JSON header followed by the raw, aligned arrays.
+    Loading mmaps the file read-only and wraps the arrays without copying them, so loading
+    is near-instant and all processes of a host share the model through the page cache.
+    """
+    def __init__(self, arrays: dict, meta: dict, buffer: mmap.mmap = None):
+        """
+        arrays: flat preprocessing and forest arrays, see compile_model
+        meta: feature names, classes and forest shape
+        buffer: mmap backing the arrays, kept open as long as the model lives
+        """
+        self.arrays = arrays
+        self.meta = meta
+        self._buffer = buffer
+        self.feature_names = meta["feature_names"]
+        self.classes = np.asarray(meta["classes"])
+        self.decision_threshold = meta.get("decision_threshold", DEFAULT_DECISION_THRESHOLD)
+
+    def prefetch(self) -> None:
+        """Asks the kernel to read the whole mapped file in, so no request pays for page faults."""
+        if self._buffer is not None and hasattr(mmap, "MADV_WILLNEED"):
+            self._buffer.madvise(mmap.MADV_WILLNEED)
+
+    def transform(self, features: np.ndarray) -> np.ndarray:
+        """Applies the scaling of the preprocessing object to a raw feature matrix."""
+        a = self.arrays
+        x = features[:, a["source"]].astype(np.float64)
+        x = (x - a["sub"]) / a["div"] * a["mul"] + a["add"]
+        # sklearn trees evaluate splits on float32 features
+        return x.astype(np.float32)
+
+    def _forest_proba(self, x: np.ndarray) -> np.ndarray:
+        """Averages the leaf class probabilities of all trees for a scaled feature matrix."""
+        a = self.arrays
+        n_rows = x.shape[0]
+        # feature-major copy, so that x[row, feature] is flat[feature * n_rows + row]
+        flat = np.ascontiguousarray(x.T).ravel()
+        rows = np.arange(n_rows, dtype=a["children"].dtype)
+        nodes = np.repeat(a["roots"][:, None], n_rows, axis=1)
+        # leaves point to themselves, so max_depth steps settle every row in its leaf
+        for _ in range(self.meta["max_depth"]):
+            go_right = flat.take(a["feature"].take(nodes) * n_rows + rows) > a["threshold"].take(nodes)
+            nodes = a["children"].take(nodes * 2 + go_right)
+        return a["value"][nodes].mean(axis=0)
+
+    def predict_proba_array(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities for a raw feature matrix with columns in feature_names order."""
+        if not np.all(np.isfinite(features)):
+            raise ValueError("Input contains NaN or infinity")
+        x = self.transform(features)
+        return np.concatenate([self._forest_proba(x[start:start + COMPILED_MODEL_PREDICT_BATCH_SIZE])
+                               for start in range(0, len(x), COMPILED_MODEL_PREDICT_BATCH_SIZE)]
+                              or [np.empty((0, len(self.classes)))])
+
+    def predict_proba(self, dataframe: pd.DataFrame) -> np.ndarray:
+        try:
+            return self.predict_proba_array(dataframe[self.feature_names].to_numpy(dtype=np.float64))
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict(self, dataframe: pd.DataFrame, threshold: float = None) -> np.ndarray:
+        """
+        Function accepts preprocessed inputs (with all custom transformations already applied),
+        applies scaling and performs prediction, like MyModel.predict.
+        threshold: overrides the decision threshold of the model
+        """
+        try:
+            threshold = self.decision_threshold if threshold is None else threshold
+            return apply_decision_threshold(self.classes, self.predict_proba(dataframe)[:, -1], threshold)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def __repr__(self):
+        return f"CompiledModel(n_trees={len(self.arrays['roots'])})"
+
+    def __str__(self):
+        return self.__repr__()
+
+
+def _compile_preprocessing(preprocessing_object) -> tuple:
+    """Extracts per output column scaling parameters from the fitted ColumnTransformer."""
+    from sklearn.compose import ColumnTransformer
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import FunctionTransformer, MinMaxScaler, StandardScaler
+
+    column_transformer = preprocessing_object
+    if isinstance(column_transformer, Pipeline):
+        if len(column_transformer.steps) != 1:
+            raise Exception("Only single step preprocessing pipelines can be compiled")
+        column_transformer = column_transformer.steps[0][1]
+    if not isinstance(column_transformer, ColumnTransformer):
+        raise Exception(f"Cannot compile preprocessing object {type(column_transformer).__name__}")
+
+    feature_names = [str(name) for name in column_transformer.feature_names_in_]
+    source, sub, div, mul, add = [], [], [], [], []
+    for _, transformer, columns in column_transformer.transformers_:
+        if transformer == "drop":
+            continue
+        indices = [column if isinstance(column, (int, np.integer)) else feature_names.index(column)
+                   for column in columns]
+        ones, zeros = np.ones(len(indices)), np.zeros(len(indices))
+        if isinstance(transformer, StandardScaler):
+            params = (transformer.mean_ if transformer.with_mean else zeros,
+                      transformer.scale_ if transformer.with_std else ones, ones, zeros)
+        elif isinstance(transformer, MinMaxScaler) and not transformer.clip:
+            params = (zeros, ones, transformer.scale_, transformer.min_)
+        elif transformer == "passthrough" or (isinstance(transformer, FunctionTransformer) and transformer.func is None):
+            params = (zeros, ones, ones, zeros)
+        else:
+            raise Exception(f"Cannot compile transformer {type(transformer).__name__}")
+        source.extend(indices)
+        for values, param in zip((sub, div, mul, add), params):
+            values.extend(np.asarray(param, dtype=np.float64))
+
+    arrays = {"source": np.asarray(source, dtype=np.int64)}
+    for name, values in zip(("sub", "div", "mul", "add"), (sub, div, mul, add)):
+        arrays[name] = np.asarray(values, dtype=np.float64)
+    return arrays, feature_names
+
+
+def _compile_forest(forest) -> tuple:
+    """Concatenates the node arrays of all trees of the fitted forest."""
+    from sklearn.ensemble import RandomForestClassifier
+
+    if not isinstance(forest, RandomForestClassifier) or forest.n_outputs_ != 1:
+        raise Exception(f"Cannot compile model {type(forest).__name__}")
+
+    roots, children, feature, threshold, value = [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        node_ids = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        children.append(np.stack([np.where(is_leaf, node_ids, tree.children_left),
+                                  np.where(is_leaf, node_ids, tree.children_right)], axis=1) + offset)
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(tree.threshold)
+        node_value = tree.value[:, 0, :]
+        value.append(node_value / node_value.sum(axis=1, keepdims=True))
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "roots": np.asarray(roots, dtype=np.int64),
+        # children[node] = (left, right), flattened so that the next node is children[2 * node + go_right]
+        "children": np.concatenate(children).astype(np.int64).ravel(),
+        "feature": np.concatenate(feature).astype(np.int64),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value).astype(np.float64),
+    }
+    return arrays, max_depth
+
+
+def compile_model(model) -> CompiledModel:
+    """
+    Converts a MyModel into a CompiledModel.
+    model: MyModel made of a ColumnTransformer pipeline and a RandomForestClassifier
+    return: CompiledModel with the same predictions
+    """
+    try:
+        preprocessing_arrays, feature_names = _compile_preprocessing(model.preprocessing_object)
+        forest_arrays, max_depth = _compile_forest(model.trained_model_object)
+        meta = {"feature_names": feature_names,
+                "classes": model.trained_model_object.classes_.tolist(),
+                "decision_threshold": float(getattr(model, "decision_threshold", DEFAULT_DECISION_THRESHOLD)),
+                "max_depth": int(max_depth)}
+        return CompiledModel(arrays={**preprocessing_arrays, **forest_arrays}, meta=meta)
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def save_compiled_model(file_path: str, model) -> None:
+    """
+    Saves a MyModel in the compiled, mmap-able format.
+    file_path: str location of file to save
+    model: MyModel or CompiledModel to save
+    """
+    logging.info("Entered the save_compiled_model method of compiled_model")
+    try:
+        compiled = model if isinstance(model, CompiledModel) else compile_model(model)
+        layout, offset = {}, 0
+        for name, array in compiled.arrays.items():
+            array = np.ascontiguousarray(array)
+            layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += -(-array.nbytes // COMPILED_MODEL_ALIGNMENT) * COMPILED_MODEL_ALIGNMENT
+        header = json.dumps({"arrays": layout, "meta": compiled.meta}).encode()
+        data_start = -(-(len(COMPILED_MODEL_MAGIC) + 8 + len(header)) // COMPILED_MODEL_ALIGNMENT) * COMPILED_MODEL_ALIGNMENT
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file_obj:
+            file_obj.write(COMPILED_MODEL_MAGIC + struct.pack("<Q", len(header)) + header)
+            for name, array in compiled.arrays.items():
+                file_obj.seek(data_start + layout[name]["offset"])
+                file_obj.write(np.ascontiguousarray(array).tobytes())
+        logging.info("Exited the save_compiled_model method of compiled_model")
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def is_compiled_model_file(file_path: str) -> bool:
+    """Checks whether the file is in the compiled model format rather than a dill pickle."""
+    with open(file_path, "rb") as file_obj:
+        return file_obj.read(len(COMPILED_MODEL_MAGIC)) == COMPILED_MODEL_MAGIC
+
+
+def load_compiled_model(file_path: str) -> CompiledModel:
+    """
+    Maps a compiled model file into memory without copying its arrays.
+    file_path: str location of file to load
+    return: CompiledModel backed by a read-only mmap of the file
+    """
+    try:
+        with open(file_path, "rb") as file_obj:
+            buffer = mmap.mmap(file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        if buffer[:len(COMPILED_MODEL_MAGIC)] != COMPILED_MODEL_MAGIC:
+            raise Exception(f"{file_path} is not a compiled model file")
+        header_start = len(COMPILED_MODEL_MAGIC) + 8
+        (header_length,) = struct.unpack("<Q", buffer[len(COMPILED_MODEL_MAGIC):header_start])
+        header = json.loads(buffer[header_start:header_start + header_length])
+        data_start = -(-(header_start + header_length) // COMPILED_MODEL_ALIGNMENT) * COMPILED_MODEL_ALIGNMENT
+
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                         offset=data_start + spec["offset"]).reshape(spec["shape"])
+        return CompiledModel(arrays=arrays, meta=header["meta"], buffer=buffer)
+    except Exception as e:
+        raise MyException(e, sys) from e
@@ -10,6 +10,8 @@ class TrainingPipelineConfig:
     pipeline_name: str = PIPELINE_NAME
     artifact_dir: str = os.path.join(ARTIFACT_DIR, TIMESTAMP)
     timestamp: str = TIMESTAMP
+    profile_file_path: str = os.path.join(ARTIFACT_DIR, TIMESTAMP, PIPELINE_PROFILE_FILE_NAME)
+    flamegraph_file_path: str = os.path.join(ARTIFACT_DIR, TIMESTAMP, PIPELINE_PROFILE_FLAMEGRAPH_FILE_NAME)
 
 
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
@@ -42,7 +44,9 @@ class DataTransformationConfig:
 class ModelTrainerConfig:
     model_trainer_dir : str = os.path.join(training_pipeline_config.artifact_dir,MODEL_TRAINER_DIR_NAME)
     trained_model_file_path:str = os.path.join(model_trainer_dir,MODEL_TRAINER_TRAINED_MODEL_DIR,MODEL_FILE_NAME)
+    compiled_model_file_path:str = os.path.join(model_trainer_dir,MODEL_TRAINER_TRAINED_MODEL_DIR,MODEL_COMPILED_FILE_NAME)
     expected_accuracy: float = MODEL_TRAINER_EXPECTED_SCORE
+    decision_threshold: float = MODEL_TRAINER_DECISION_THRESHOLD
     model_config_file_path: str = MODEL_TRAINER_MODEL_CONFIG_FILE_PATH
     _n_estimators: float = MODEL_TRAINER_N_ESTIMATORS 
     _min_samples_split = MODEL_TRAINER_MIN_SAMPLES_SPLIT
@@ -53,7 +57,14 @@ class ModelTrainerConfig:
 
 @dataclass
 class ModelEvaluationConfig:
+    model_evaluation_dir: str = os.path.join(training_pipeline_config.artifact_dir, MODEL_EVALUATION_DIR_NAME)
+    evaluation_report_file_path: str = os.path.join(model_evaluation_dir, MODEL_EVALUATION_REPORT_FILE_NAME)
+    scoring_cache_dir: str = MODEL_EVALUATION_SCORING_CACHE_DIR
     changed_threshold_score:float = MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE
+    evaluation_mode: str = MODEL_EVALUATION_MODE
+    bootstrap_resamples: int = MODEL_EVALUATION_BOOTSTRAP_RESAMPLES
+    bootstrap_confidence: float = MODEL_EVALUATION_BOOTSTRAP_CONFIDENCE
+    bootstrap_random_state: int = MODEL_EVALUATION_BOOTSTRAP_RANDOM_STATE
     bucket_name : str = MODEL_BUCKET_NAME
     s3_model_key_path:str = MODEL_FILE_NAME
 
@@ -61,6 +72,7 @@ class ModelEvaluationConfig:
 class ModelPusherConfig:
     bucket_name:str=MODEL_BUCKET_NAME
     s3_model_key_path:str=MODEL_FILE_NAME
+    registry_prefix:str=MODEL_PUSHER_S3_KEY
 
 
 @dataclass
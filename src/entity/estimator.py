@@ -1,8 +1,13 @@
 import sys
+from typing import TYPE_CHECKING
 
+import numpy as np
 import pandas as pd
 from pandas import DataFrame
-from sklearn.pipeline import Pipeline
+
+if TYPE_CHECKING:
+    # only needed for annotations; sklearn is loaded when a pickled model is unpickled
+    from sklearn.pipeline import Pipeline
 
 from src.exception import MyException
 from src.logger import logging
@@ -19,30 +24,68 @@ class TargetValueMapping:
         mapping_response = self._asdict()
         return dict(zip(mapping_response.values(),mapping_response.keys()))
     
+DEFAULT_DECISION_THRESHOLD = 0.5
+
+def apply_decision_threshold(classes: np.ndarray, positive_proba: np.ndarray, threshold: float) -> np.ndarray:
+    """
+    Labels rows whose positive class probability is above the threshold with the positive class.
+    Classes learned from a float target, e.g. 0.0 and 1.0, are returned as integers.
+    """
+    classes = np.asarray(classes)
+    if classes.dtype.kind == "f" and np.all(np.mod(classes, 1) == 0):
+        classes = classes.astype(np.int64)
+    return classes[(np.asarray(positive_proba) > threshold).astype(int)]
+
 class MyModel:
-    def __init__(self,preprocessing_object : Pipeline,trained_model_object: object):
+    def __init__(self,preprocessing_object : "Pipeline",trained_model_object: object,
+                 decision_threshold: float = DEFAULT_DECISION_THRESHOLD):
         """
         preprocessing_object: Input Object of preprocesser
         trained_model_object: Input Object of trained model 
+        decision_threshold: positive class probability above which predict returns the positive class
         """
 
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        self.decision_threshold = decision_threshold
+
+    @property
+    def classes(self) -> np.ndarray:
+        return self.trained_model_object.classes_
+
+    def __setstate__(self, state):
+        # models pickled before the threshold was stored with them use the default
+        state.setdefault("decision_threshold", DEFAULT_DECISION_THRESHOLD)
+        self.__dict__.update(state)
+
+    def predict_proba(self,dataframe:pd.DataFrame)->np.ndarray:
+        """
+        Function accepts preprocessed inputs (with all custom transformations already applied),
+        applies scaling using preprocessing_object and returns the class probabilities,
+        one column per class in trained_model_object.classes_ order.
+        """
+        try:
+            transformed_feature = self.preprocessing_object.transform(dataframe)
+            return self.trained_model_object.predict_proba(transformed_feature)
+        except Exception as e:
+            raise MyException(e, sys) from e
 
-    def predict(self,dataframe:pd.DataFrame)->DataFrame:
+    def predict(self,dataframe:pd.DataFrame,threshold:float = None)->DataFrame:
         """
         Function accepts preprocessed inputs (with all custom transformations already applied),
         applies scaling using preprocessing_object, and performs prediction on transformed features.
+        threshold: overrides the decision threshold of the model
         """
         try:
-            logging.info("Starting prediction process.")
+            logging.debug("Starting prediction process.")
 
-            # Step 1: Apply scaling transformations using the pre-trained preprocessing object
-            transformed_feature = self.preprocessing_object.transform(dataframe)
+            # Step 1 and 2: scale the features and get the class probabilities of the trained model
+            probabilities = self.predict_proba(dataframe)
 
-            # Step 2: Perform predictions using the trained model
-            logging.info("Using the trained model to get predictions")
-            predictions = self.trained_model_object.predict(transformed_feature)
+            # Step 3: label with the positive class above the decision threshold
+            logging.debug("Using the trained model to get predictions")
+            threshold = self.decision_threshold if threshold is None else threshold
+            predictions = apply_decision_threshold(self.classes, probabilities[:, -1], threshold)
 
             return predictions
         
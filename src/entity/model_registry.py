@@ -0,0 +1,146 @@
+import sys
+import json
+import hashlib
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src.cloud_storage.storage_service import StorageService
+from src.constants import (MODEL_FILE_NAME, MODEL_PUSHER_S3_KEY, MODEL_REGISTRY_MANIFEST_FILE_NAME,
+                           MODEL_REGISTRY_METADATA_FILE_NAME)
+from src.exception import MyException
+from src.logger import logging
+
+
+class ModelRegistry:
+    """
+    Versioned model registry kept in a storage bucket.
+
+    Layout under the registry prefix:
+        versions/<version>/model.pkl       immutable model artifact
+        versions/<version>/metadata.json   metrics, data fingerprint, schema hash, ...
+        manifest.json                      {"production": <version>, "history": [...]}
+
+    Readers only ever follow the manifest, and the manifest is replaced with a single
+    conditional PUT, so promotion and rollback are atomic and concurrent readers always
+    see either the old or the new production version.
+    """
+    def __init__(self, bucket_name: str, storage: StorageService, registry_prefix: str = MODEL_PUSHER_S3_KEY):
+        """
+        bucket_name: name of your model bucket
+        storage: storage service holding the registry
+        registry_prefix: key prefix of the registry inside the bucket
+        """
+        self.bucket_name = bucket_name
+        self.storage = storage
+        self.registry_prefix = registry_prefix.strip("/")
+        self.manifest_key = f"{self.registry_prefix}/{MODEL_REGISTRY_MANIFEST_FILE_NAME}"
+
+    def get_model_key(self, version: str, file_name: str = MODEL_FILE_NAME) -> str:
+        """Returns the key of an artifact file of the given version"""
+        return f"{self.registry_prefix}/versions/{version}/{file_name}"
+
+    def get_manifest(self) -> Tuple[dict, Optional[str]]:
+        """
+        Returns the manifest and its ETag, or an empty manifest and None if the registry is empty
+        """
+        try:
+            if not self.storage.s3_key_path_available(bucket_name=self.bucket_name, s3_key=self.manifest_key):
+                return {"production": None, "history": []}, None
+            data, etag = self.storage.get_object_bytes(key=self.manifest_key, bucket_name=self.bucket_name)
+            return json.loads(data), etag
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_production_version(self) -> Optional[str]:
+        """Returns the version currently marked as production, if any"""
+        manifest, _ = self.get_manifest()
+        return manifest["production"]
+
+    def list_versions(self) -> List[str]:
+        """Returns all registered versions, ordered by registration time"""
+        try:
+            keys = self.storage.list_keys(prefix=f"{self.registry_prefix}/versions/", bucket_name=self.bucket_name)
+            return sorted({key.split("/")[-2] for key in keys if key.endswith(MODEL_REGISTRY_METADATA_FILE_NAME)})
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_metadata(self, version: str) -> dict:
+        """Returns the metadata stored with a version"""
+        try:
+            data, _ = self.storage.get_object_bytes(
+                key=self.get_model_key(version, MODEL_REGISTRY_METADATA_FILE_NAME), bucket_name=self.bucket_name)
+            return json.loads(data)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def register_model(self, from_file: str, metadata: dict, extra_files: Optional[Dict[str, str]] = None) -> str:
+        """
+        Uploads a model file as a new immutable version and returns the version id.
+        The version id combines the registration time with the model content hash.
+        from_file: your local system model path
+        metadata: metrics, data fingerprint, schema hash and anything else worth keeping
+        extra_files: other artifacts of the version, as {file name in the registry: local path}
+        """
+        logging.info("Entered the register_model method of ModelRegistry class")
+        try:
+            digest = hashlib.sha256()
+            with open(from_file, "rb") as file_obj:
+                for chunk in iter(lambda: file_obj.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            model_sha256 = digest.hexdigest()
+            created_at = datetime.now()
+            version = f"v{created_at.strftime('%Y%m%d%H%M%S')}-{model_sha256[:8]}"
+
+            metadata_key = self.get_model_key(version, MODEL_REGISTRY_METADATA_FILE_NAME)
+            if self.storage.s3_key_path_available(bucket_name=self.bucket_name, s3_key=metadata_key):
+                raise Exception(f"Model version {version} is already registered")
+
+            extra_files = extra_files or {}
+            self.storage.upload_file(from_file, to_filename=self.get_model_key(version),
+                                     bucket_name=self.bucket_name, remove=False)
+            for file_name, file_path in extra_files.items():
+                self.storage.upload_file(file_path, to_filename=self.get_model_key(version, file_name),
+                                         bucket_name=self.bucket_name, remove=False)
+            # metadata is written last and create-only: a version exists once its metadata does
+            metadata = {**metadata, "version": version, "created_at": created_at.isoformat(),
+                        "model_sha256": model_sha256, "files": [MODEL_FILE_NAME] + list(extra_files)}
+            self.storage.put_object_bytes(json.dumps(metadata, indent=4, default=str).encode(),
+                                          key=metadata_key, bucket_name=self.bucket_name, if_none_match=True)
+            logging.info(f"Registered model version {version}")
+            return version
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _swap_manifest(self, manifest: dict, etag: Optional[str]) -> None:
+        """Replaces the manifest only if nobody changed it since it was read"""
+        self.storage.put_object_bytes(json.dumps(manifest, indent=4).encode(), key=self.manifest_key,
+                                      bucket_name=self.bucket_name, if_match=etag, if_none_match=etag is None)
+
+    def promote(self, version: str) -> None:
+        """Marks a registered version as production with an atomic manifest swap"""
+        logging.info("Entered the promote method of ModelRegistry class")
+        try:
+            if version not in self.list_versions():
+                raise Exception(f"Model version {version} is not registered")
+            manifest, etag = self.get_manifest()
+            manifest["history"] = manifest["history"] + [version]
+            manifest["production"] = version
+            self._swap_manifest(manifest, etag)
+            logging.info(f"Promoted model version {version} to production")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def rollback(self) -> str:
+        """Restores the previously promoted version as production and returns it"""
+        logging.info("Entered the rollback method of ModelRegistry class")
+        try:
+            manifest, etag = self.get_manifest()
+            if len(manifest["history"]) < 2:
+                raise Exception("No previous production version to roll back to")
+            manifest["history"] = manifest["history"][:-1]
+            manifest["production"] = manifest["history"][-1]
+            self._swap_manifest(manifest, etag)
+            logging.info(f"Rolled back production to model version {manifest['production']}")
+            return manifest["production"]
+        except Exception as e:
+            raise MyException(e, sys) from e
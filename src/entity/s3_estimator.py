@@ -1,22 +1,61 @@
-from src.cloud_storage.aws_storage import SimpleStorageService
+from src.cloud_storage.storage_service import StorageService,get_storage_service
+from src.cloud_storage.model_cache import LocalModelCache
 from src.exception import MyException
+from src.logger import logging
 from src.entity.estimator import MyModel
+from src.entity.compiled_model import is_compiled_model_file,load_compiled_model
+from src.entity.model_registry import ModelRegistry
+from src.utils.main_utils import load_object
+from src.constants import MODEL_ARTIFACT_FORMAT,MODEL_ARTIFACT_FORMAT_ENV_KEY,MODEL_COMPILED_FILE_NAME
+import os
 import sys
 from pandas import DataFrame
 
+def load_model_file(file_path: str):
+    """
+    Load a local model file, mapping it read-only if it is in the compiled format and
+    unpickling it otherwise
+    """
+    if is_compiled_model_file(file_path):
+        return load_compiled_model(file_path=file_path)
+    return load_object(file_path=file_path)
+
+
 class Proj1Estimator:
     """
     This class is used to save and retrieve models in a s3 bucket and to do prediction 
     """
-    def __init__(self,bucket_name,model_path,):
+    def __init__(self,bucket_name,model_path,storage: StorageService = None,model_cache: LocalModelCache = None,
+                 model_format: str = None):
         """
         bucket_name : name of your model bucket
-        model_path: Location of your model in bucket
+        model_path: Location of your model in bucket, used when the model registry has no production version
+        storage: storage service holding the bucket, the configured storage backend by default
+        model_cache: local on-disk cache the model is loaded through
+        model_format: "dill" or "compiled", defaults to the MODEL_ARTIFACT_FORMAT environment variable
+                      and then to the MODEL_ARTIFACT_FORMAT constant
         """
         self.bucket_name = bucket_name
-        self.s3 = SimpleStorageService()
+        self.s3 = storage if storage is not None else get_storage_service()
+        self.model_cache = model_cache if model_cache is not None else LocalModelCache()
         self.model_path = model_path
+        self.model_format = (model_format or os.getenv(MODEL_ARTIFACT_FORMAT_ENV_KEY,MODEL_ARTIFACT_FORMAT)).lower()
+        self.registry = ModelRegistry(bucket_name=bucket_name,storage=self.s3)
+        self.model_version: str = None
         self.loaded_model: MyModel = None
+        self._is_model_path_resolved = False
+
+    def resolve_model_path(self)->str:
+        """
+        Point model_path at the production version of the model registry, if there is one
+        """
+        if not self._is_model_path_resolved:
+            version = self.registry.get_production_version()
+            if version is not None:
+                self.model_version = version
+                self.model_path = self.registry.get_model_key(version)
+            self._is_model_path_resolved = True
+        return self.model_path
         
     def is_model_present(self,model_path):
         try:
@@ -25,12 +64,62 @@ class Proj1Estimator:
             print(e)
             return False
         
+    def get_model_file(self)->str:
+        """
+        Return the local path of the model in the local model cache, downloading it if needed.
+        With the compiled format the mmap-able artifact of the production version is used
+        when it was registered with one, otherwise the dill model.
+        """
+        try:
+            try:
+                model_path = self.resolve_model_path()
+                if self.model_format == "compiled" and self.model_version is not None:
+                    compiled_path = self.registry.get_model_key(self.model_version,MODEL_COMPILED_FILE_NAME)
+                    if self.is_model_present(compiled_path):
+                        model_path = compiled_path
+            except Exception as e:
+                # the manifest is unreachable too, fall back to the model resolved last time
+                resolution = self.model_cache.get_resolution(self.bucket_name,self.registry.manifest_key)
+                if resolution is None:
+                    raise
+                logging.info(f"Model registry unreachable ({e}), using the last resolved model {resolution['key']}")
+                self.model_version = resolution["version"]
+                return self.model_cache.get_model_file(storage=self.s3,bucket_name=self.bucket_name,
+                                                       key=resolution["key"])
+            file_path = self.model_cache.get_model_file(storage=self.s3,bucket_name=self.bucket_name,key=model_path)
+            self.model_cache.save_resolution(self.bucket_name,self.registry.manifest_key,model_path,self.model_version)
+            return file_path
+        except Exception as e:
+            raise MyException(e,sys)
+
     def load_model(self,)->MyModel:
         """
-        Load the model from the model_path
+        Load the model from the model_path, through the local model cache
         """
-        return self.s3.load_model(self.model_path,bucket_name=self.bucket_name)
+        try:
+            return load_model_file(self.get_model_file())
+        except Exception as e:
+            raise MyException(e,sys)
     
+    def get_model_version(self)->str:
+        """
+        Return the registry version of the model, or the ETag of the model object if it was
+        not pushed through the model registry
+        """
+        try:
+            return self.model_version or f"etag-{self.get_model_etag()}"
+        except Exception as e:
+            raise MyException(e,sys)
+
+    def get_model_etag(self)->str:
+        """
+        Return the ETag of the model object, which changes whenever a new model is pushed
+        """
+        try:
+            return self.s3.get_object_etag(key=self.resolve_model_path(),bucket_name=self.bucket_name)
+        except Exception as e:
+            raise MyException(e,sys)
+
     def save_model(self,from_file,remove:bool = False)->None:
         """
         Save the model to the model_path
@@ -48,11 +137,25 @@ class Proj1Estimator:
         except Exception as e:
             raise MyException(e,sys)
         
-    def predict(self,dataframe: DataFrame):
+    def predict_proba(self,dataframe: DataFrame):
+        """
+        Return the class probabilities of the model, one column per class
+        """
+        try:
+            if self.loaded_model is None:
+                self.loaded_model = self.load_model()
+            return self.loaded_model.predict_proba(dataframe)
+        except Exception as e:
+            raise MyException(e,sys)
+
+    def predict(self,dataframe: DataFrame,threshold: float = None):
+        """
+        threshold: overrides the decision threshold stored with the model
+        """
         try:
             if self.loaded_model is None:
                 self.loaded_model = self.load_model()
-            return self.loaded_model.predict(dataframe=dataframe)
+            return self.loaded_model.predict(dataframe,threshold=threshold)
         except Exception as e:
             raise MyException(e,sys)
 
@@ -9,24 +9,45 @@ def error_message_detail(error: Exception, error_detail: sys) -> str:
     :param error_detail: The sys module to access traceback details.
     :return: A formatted error message string.
     """
+    file_name, line_number = _error_location(error, error_detail)
+    return _format_error_message(file_name, line_number, error)
+
+def _error_location(error: Exception, error_detail: sys) -> tuple:
+    """
+    Returns the file name and line number where the exception occurred, without formatting
+    anything. Falls back to the traceback of the error itself and then to the frame raising
+    it when no exception is being handled.
+    """
     # Extract traceback details (exception information)
     _, _, exc_tb = error_detail.exc_info()
+    exc_tb = exc_tb or getattr(error, "__traceback__", None)
+    if exc_tb is not None:
+        return exc_tb.tb_frame.f_code.co_filename, exc_tb.tb_lineno
+    # the caller of MyException.__init__
+    frame = sys._getframe(2)
+    return frame.f_code.co_filename, frame.f_lineno
 
-    # Get the file name where the exception occurred
-    file_name = exc_tb.tb_frame.f_code.co_filename
+def _format_error_message(file_name: str, line_number: int, error) -> str:
+    return f"Error occurred in python script: [{file_name}] at line number [{line_number}]: {str(error)}"
 
-    # Create a formatted error message string with file name, line number, and the actual error
-    line_number = exc_tb.tb_lineno
-    error_message = f"Error occurred in python script: [{file_name}] at line number [{line_number}]: {str(error)}"
-    
-    # Log the error for better tracking
-    logging.error(error_message)
-    
-    return error_message
+def _wraps_logged_error(error) -> bool:
+    """True if error is a MyException or was raised from one with `raise ... from`, which has been logged already"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, MyException):
+            return True
+        seen.add(id(error))
+        error = error.__cause__
+    return False
 
 class MyException(Exception):
     """
     Custom exception class for handling errors in the US visa application.
+
+    Components wrap and re-wrap the same error at every layer, so construction is kept cheap:
+    only the file name and line number are captured, and the detailed message is formatted
+    the first time it is read. The error is logged once, by the innermost MyException;
+    wrapping a MyException again, directly or through a chain of causes, does not log.
     """
     def __init__(self, error_message: str, error_detail: sys):
         """
@@ -38,11 +59,23 @@ class MyException(Exception):
         # Call the base class constructor with the error message
         super().__init__(error_message)
 
-        # Format the detailed error message using the error_message_detail function
-        self.error_message = error_message_detail(error_message, error_detail)
+        self.error = error_message
+        self.file_name, self.line_number = _error_location(error_message, error_detail)
+        self._error_message = None
+
+        # Log the error for better tracking, formatted only if the record is emitted
+        if not _wraps_logged_error(error_message):
+            logging.error("%s", self)
+
+    @property
+    def error_message(self) -> str:
+        """The detailed error message, formatted on first use"""
+        if self._error_message is None:
+            self._error_message = _format_error_message(self.file_name, self.line_number, self.error)
+        return self._error_message
 
     def __str__(self) -> str:
         """
         Returns the string representation of the error message.
         """
-        return self.error_message
\ No newline at end of file
+        return self.error_message
@@ -1,8 +1,16 @@
+import atexit
+import copy
+import itertools
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from from_root import from_root
-from datetime import datetime
+from datetime import datetime, timezone
+
+from src.constants import (LOG_DEBUG_SAMPLE_RATE, LOG_DEBUG_SAMPLE_RATE_ENV_KEY, LOG_FORMAT, LOG_FORMAT_ENV_KEY,
+                           LOG_LEVELS, LOG_LEVELS_ENV_KEY, LOG_QUEUE_ENABLED, LOG_QUEUE_ENABLED_ENV_KEY, LOG_QUEUE_SIZE)
 
 # Constants for log configuration
 LOG_DIR = 'logs'
@@ -12,22 +20,170 @@ BACKUP_COUNT = 3  # Number of backup log files to keep
 
 # Construct log file path
 log_dir_path = os.path.join(from_root(), LOG_DIR)
-os.makedirs(log_dir_path, exist_ok=True)
 log_file_path = os.path.join(log_dir_path, LOG_FILE)
 
+class LazyRotatingFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler that creates the log directory and file on the first record
+    instead of at import.
+    """
+    def __init__(self, filename, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line, for log shippers.
+    """
+    def format(self, record):
+        payload = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "function": record.funcName,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            payload["exception"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+class ModuleLevelFilter(logging.Filter):
+    """
+    Applies per module levels: a record passes if its level reaches the level configured for
+    its logger name or the closest parent logger name ("a.b.c", then "a.b", then "a") or, for
+    the modules logging through the root logger, its module name, and otherwise the default level.
+    """
+    def __init__(self, default_level: int, module_levels: dict):
+        super().__init__()
+        self.default_level = default_level
+        self.module_levels = module_levels
+
+    def _threshold(self, record) -> int:
+        name = record.name
+        while name:
+            level = self.module_levels.get(name)
+            if level is not None:
+                return level
+            name = name.rpartition(".")[0]
+        level = self.module_levels.get(record.module)
+        return self.default_level if level is None else level
+
+    def filter(self, record):
+        return record.levelno >= self._threshold(record)
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    Passes every record above DEBUG and one in every 1 / rate DEBUG records, so that debug
+    logging on hot paths costs a counter increment for the records it drops.
+    """
+    def __init__(self, rate: float):
+        super().__init__()
+        self.every = max(1, round(1 / rate)) if rate > 0 else 0
+        self._counter = itertools.count()
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG:
+            return True
+        return self.every > 0 and next(self._counter) % self.every == 0
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Queue handler for a bounded queue: records are dropped and counted when the queue is full
+    instead of blocking the caller. Only the message is rendered in the calling thread,
+    formatting and I/O are left to the listener thread.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def parse_log_levels(spec: str):
+    """
+    Parses a level spec such as "INFO,prediction_pipeline=DEBUG,botocore=WARNING".
+    Returns: the default level and the per module levels
+    """
+    default_level, module_levels = logging.DEBUG, {}
+    for entry in filter(None, (entry.strip() for entry in spec.split(","))):
+        name, _, level = entry.rpartition("=")
+        level = logging.getLevelName(level.strip().upper())
+        if not isinstance(level, int):
+            raise ValueError(f"Unknown log level in {LOG_LEVELS_ENV_KEY}: {entry}")
+        if name:
+            module_levels[name.strip()] = level
+        else:
+            default_level = level
+    return default_level, module_levels
+
+log_listener: QueueListener = None
+log_queue_handler: DroppingQueueHandler = None
+
+def _start_listener(handlers) -> None:
+    global log_listener
+    log_queue_handler.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    log_listener = QueueListener(log_queue_handler.queue, *handlers, respect_handler_level=True)
+    log_listener.start()
+
+def _restart_listener_after_fork() -> None:
+    # the listener thread does not exist in a forked child and the inherited queue may have
+    # been locked by it at fork time, so the child gets a new queue and listener
+    if log_listener is not None:
+        _start_listener(log_listener.handlers)
+
+def stop_logging() -> None:
+    """Writes out the queued records and stops the listener thread"""
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
 def configure_logger():
     """
     Configures logging with a rotating file handler and a console handler.
+
+    By default records go through a bounded queue to a listener thread that formats and
+    writes them, so that logging calls never wait for disk or console I/O. The environment
+    variables LOG_QUEUE, LOG_FORMAT ("text" or "json"), LOG_LEVELS and LOG_DEBUG_SAMPLE_RATE
+    override the constants of the same names.
     """
+    global log_queue_handler
+    default_level, module_levels = parse_log_levels(os.getenv(LOG_LEVELS_ENV_KEY, LOG_LEVELS))
+
     # Create a custom logger
     logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)
-    
+    # records below the lowest configured level are not even created
+    logger.setLevel(min([default_level, *module_levels.values()]))
+    for name, level in module_levels.items():
+        logging.getLogger(name).setLevel(level)
+
     # Define formatter
-    formatter = logging.Formatter("[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s")
+    if os.getenv(LOG_FORMAT_ENV_KEY, LOG_FORMAT).lower() == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter("[ %(asctime)s ] %(name)s - %(levelname)s - %(message)s")
 
     # File handler with rotation
-    file_handler = RotatingFileHandler(log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT)
+    file_handler = LazyRotatingFileHandler(log_file_path, maxBytes=MAX_LOG_SIZE, backupCount=BACKUP_COUNT)
     file_handler.setFormatter(formatter)
     file_handler.setLevel(logging.DEBUG)
     
@@ -35,10 +191,24 @@ def configure_logger():
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
     console_handler.setLevel(logging.INFO)
-    
-    # Add handlers to the logger
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+
+    filters = [ModuleLevelFilter(default_level, module_levels),
+               DebugSamplingFilter(float(os.getenv(LOG_DEBUG_SAMPLE_RATE_ENV_KEY, LOG_DEBUG_SAMPLE_RATE)))]
+    if os.getenv(LOG_QUEUE_ENABLED_ENV_KEY, str(LOG_QUEUE_ENABLED)).lower() in ("1", "true", "yes"):
+        # records are filtered in the calling thread, before they are queued
+        log_queue_handler = DroppingQueueHandler(None)
+        for log_filter in filters:
+            log_queue_handler.addFilter(log_filter)
+        _start_listener([file_handler, console_handler])
+        logger.addHandler(log_queue_handler)
+        atexit.register(stop_logging)
+        os.register_at_fork(after_in_child=_restart_listener_after_fork)
+    else:
+        # Add handlers to the logger
+        for handler in (file_handler, console_handler):
+            for log_filter in filters:
+                handler.addFilter(log_filter)
+            logger.addHandler(handler)
 
 # Configure the logger
 configure_logger()
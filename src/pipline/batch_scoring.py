@@ -0,0 +1,247 @@
+"""
+Offline batch scoring of large files and collections with the production model.
+
+    score --input customers.csv --output scores.csv
+    score --input customers.parquet --output scores.parquet --workers 8
+    score --input mongo:Proj1-Data --output scores.csv --chunk-size 100000
+
+Input is streamed in chunks, every chunk is scored in a vectorized way by a pool of
+worker processes and results are written in input order as they arrive, so memory stays
+bounded by a few chunks whatever the input size. Parquet needs the optional pyarrow package.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.constants import (BATCH_SCORING_CHUNK_SIZE, BATCH_SCORING_MAX_IN_FLIGHT_PER_WORKER,
+                           BATCH_SCORING_MODEL_FORMAT, MODEL_BUCKET_NAME, MODEL_FILE_NAME)
+from src.entity.estimator import apply_decision_threshold
+from src.exception import MyException
+from src.logger import logging
+
+MONGO_INPUT_PREFIX = "mongo:"
+
+# model of a scoring worker process, loaded once by _init_worker
+_worker_model = None
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow, pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Reading and writing Parquet files needs pyarrow, install it with `pip install pyarrow`") from e
+
+
+def raw_to_features(df: pd.DataFrame, feature_names: list) -> np.ndarray:
+    """
+    Turns a chunk of raw records into the float64 model feature matrix.
+
+    Applies the same custom transformations as training (gender mapping and the Vehicle_Age
+    and Vehicle_Damage dummies) with explicit category comparisons rather than get_dummies,
+    whose output columns depend on the categories present in the chunk. Chunks that already
+    contain the model features are used as they are.
+    """
+    if "Gender" in df.columns and not pd.api.types.is_numeric_dtype(df["Gender"]):
+        df = df.assign(Gender=df["Gender"].map({"Female": 0, "Male": 1}))
+    if "Vehicle_Age" in df.columns:
+        df = df.assign(Vehicle_Age_lt_1_Year=(df["Vehicle_Age"] == "< 1 Year").astype(int),
+                       Vehicle_Age_gt_2_Years=(df["Vehicle_Age"] == "> 2 Years").astype(int))
+    if "Vehicle_Damage" in df.columns:
+        df = df.assign(Vehicle_Damage_Yes=(df["Vehicle_Damage"] == "Yes").astype(int))
+    return df[feature_names].apply(pd.to_numeric).to_numpy(dtype=np.float64)
+
+
+def _init_worker(model_file: str) -> None:
+    """Loads the model once per worker process; a compiled model is mapped, not copied"""
+    from src.entity.s3_estimator import load_model_file
+    global _worker_model
+    _worker_model = load_model_file(model_file)
+
+
+def _score_chunk(chunk_index: int, df: pd.DataFrame, feature_names: list, id_column: Optional[str],
+                 threshold: Optional[float]) -> tuple:
+    """Scores one chunk in the worker process and returns it with its index"""
+    model = _worker_model
+    # a compiled model reads columns by position, so they are selected in its own order
+    features = raw_to_features(df, getattr(model, "feature_names", feature_names))
+    if hasattr(model, "predict_proba_array"):
+        probabilities = model.predict_proba_array(features)[:, -1]
+    else:
+        probabilities = model.predict_proba(pd.DataFrame(features, columns=feature_names))[:, -1]
+    threshold = model.decision_threshold if threshold is None else threshold
+    result = pd.DataFrame({"probability": probabilities,
+                           "prediction": apply_decision_threshold(model.classes, probabilities, threshold)})
+    if id_column is not None and id_column in df.columns:
+        result.insert(0, id_column, df[id_column].to_numpy())
+    return chunk_index, result
+
+
+class BatchScorer:
+    """
+    Streams records from a CSV or Parquet file or a MongoDB collection through the model
+    and writes the scores to a CSV or Parquet file.
+    """
+    def __init__(self, model_file: str, chunk_size: int = BATCH_SCORING_CHUNK_SIZE, workers: int = None,
+                 id_column: Optional[str] = "id", threshold: Optional[float] = None):
+        """
+        model_file: local model file, dill or compiled, see resolve_model_file
+        chunk_size: number of records scored together
+        workers: number of scoring processes, 0 scores in this process. Defaults to the number of cores
+        id_column: column copied from the input to the output to identify the records
+        threshold: overrides the decision threshold stored with the model
+        """
+        from src.pipline.prediction_pipeline import VehicleDataClassifier
+        self.model_file = model_file
+        self.chunk_size = chunk_size
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.id_column = id_column
+        self.threshold = threshold
+        self.feature_names = VehicleDataClassifier.get_feature_names()
+
+    @staticmethod
+    def resolve_model_file(bucket_name: str = MODEL_BUCKET_NAME, model_path: str = MODEL_FILE_NAME,
+                           model_format: str = BATCH_SCORING_MODEL_FORMAT) -> str:
+        """
+        Returns the local cached file of the production model.
+        model_format: "dill" by default, sklearn scores large chunks faster; "compiled" maps one
+                      copy of the model shared by all workers, which saves memory instead
+        """
+        from src.entity.s3_estimator import Proj1Estimator
+        return Proj1Estimator(bucket_name=bucket_name, model_path=model_path, model_format=model_format).get_model_file()
+
+    def iter_chunks(self, input_path: str) -> Iterator[pd.DataFrame]:
+        """Streams the input as DataFrames of at most chunk_size records"""
+        if input_path.startswith(MONGO_INPUT_PREFIX):
+            from src.data_access.proj1_data import Proj1Data
+            yield from Proj1Data().iter_collection_batches(input_path[len(MONGO_INPUT_PREFIX):], self.chunk_size)
+        elif input_path.endswith(".parquet"):
+            _, pq = _import_pyarrow()
+            for batch in pq.ParquetFile(input_path).iter_batches(batch_size=self.chunk_size):
+                yield batch.to_pandas()
+        else:
+            yield from pd.read_csv(input_path, chunksize=self.chunk_size, na_values="na")
+
+    @staticmethod
+    def _open_writer(output_path: str):
+        """Returns a function appending a result chunk to the output file, and one closing it"""
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        if output_path.endswith(".parquet"):
+            pa, pq = _import_pyarrow()
+            state = {"writer": None}
+
+            def write(result: pd.DataFrame):
+                table = pa.Table.from_pandas(result, preserve_index=False)
+                if state["writer"] is None:
+                    state["writer"] = pq.ParquetWriter(output_path, table.schema)
+                state["writer"].write_table(table)
+
+            def close():
+                if state["writer"] is not None:
+                    state["writer"].close()
+            return write, close
+
+        state = {"header": True}
+
+        def write(result: pd.DataFrame):
+            result.to_csv(output_path, mode="w" if state["header"] else "a", header=state["header"], index=False)
+            state["header"] = False
+        return write, lambda: None
+
+    def score(self, input_path: str, output_path: str) -> dict:
+        """
+        Scores the input into the output file.
+        Returns: number of rows, seconds and rows per second
+        """
+        logging.info("Entered the score method of BatchScorer class")
+        try:
+            write, close = self._open_writer(output_path)
+            start = time.perf_counter()
+            rows = 0
+
+            def on_result(result: pd.DataFrame):
+                nonlocal rows
+                write(result)
+                rows += len(result)
+                elapsed = time.perf_counter() - start
+                logging.info(f"Scored {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s)")
+
+            try:
+                args = (self.feature_names, self.id_column, self.threshold)
+                if self.workers == 0:
+                    _init_worker(self.model_file)
+                    for chunk_index, df in enumerate(self.iter_chunks(input_path)):
+                        on_result(_score_chunk(chunk_index, df, *args)[1])
+                else:
+                    self._score_parallel(input_path, args, on_result)
+            finally:
+                close()
+
+            seconds = time.perf_counter() - start
+            summary = {"rows": rows, "seconds": seconds, "rows_per_second": rows / seconds if seconds else 0.0}
+            logging.info(f"Exited the score method of BatchScorer class: {summary}")
+            return summary
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _score_parallel(self, input_path: str, args: tuple, on_result) -> None:
+        """
+        Scores chunks in worker processes and hands results on in input order. At most
+        BATCH_SCORING_MAX_IN_FLIGHT_PER_WORKER chunks per worker are held at a time, counting
+        both the submitted chunks and the results waiting for an earlier, slower chunk.
+        """
+        max_in_flight = self.workers * BATCH_SCORING_MAX_IN_FLIGHT_PER_WORKER
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.model_file,)) as executor:
+            in_flight, done_chunks, next_index = set(), {}, 0
+
+            def collect(return_when):
+                nonlocal next_index
+                done, _ = wait(in_flight, return_when=return_when)
+                for future in done:
+                    in_flight.discard(future)
+                    chunk_index, result = future.result()
+                    done_chunks[chunk_index] = result
+                while next_index in done_chunks:
+                    on_result(done_chunks.pop(next_index))
+                    next_index += 1
+
+            for chunk_index, df in enumerate(self.iter_chunks(input_path)):
+                in_flight.add(executor.submit(_score_chunk, chunk_index, df, *args))
+                # results waiting in done_chunks imply their predecessor is still in flight
+                while len(in_flight) + len(done_chunks) >= max_in_flight:
+                    collect(FIRST_COMPLETED)
+            while in_flight:
+                collect(FIRST_COMPLETED)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score a CSV/Parquet file or a MongoDB collection with the production model")
+    parser.add_argument("--input", required=True, help=f"CSV or .parquet file, or {MONGO_INPUT_PREFIX}<collection>")
+    parser.add_argument("--output", required=True, help="CSV or .parquet file to write the scores to")
+    parser.add_argument("--model-file", default=None, help="local model file instead of the production model")
+    parser.add_argument("--chunk-size", type=int, default=BATCH_SCORING_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None, help="scoring processes, 0 to score in process")
+    parser.add_argument("--id-column", default="id")
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--model-format", choices=("dill", "compiled"), default=BATCH_SCORING_MODEL_FORMAT,
+                        help="format of the production model to score with")
+    args = parser.parse_args(argv)
+
+    model_file = args.model_file or BatchScorer.resolve_model_file(model_format=args.model_format)
+    scorer = BatchScorer(model_file=model_file, chunk_size=args.chunk_size, workers=args.workers,
+                         id_column=args.id_column, threshold=args.threshold)
+    summary = scorer.score(args.input, args.output)
+    print(f"Scored {summary['rows']} rows in {summary['seconds']:.1f}s ({summary['rows_per_second']:.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,22 @@
+import os
 import sys
+import time
+import threading
+from itertools import chain
+from operator import attrgetter
+import numpy as np
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from src.constants import (PREDICTION_CACHE_MAX_BATCH_ROWS, SCHEMA_FILE_PATH, SERVING_SHARED_MODEL_PATH_ENV_KEY,
+                           SERVING_SHARED_MODEL_VERSION_ENV_KEY, SERVING_WARM_UP_BATCH_SIZES)
+from typing import Sequence, Tuple, Type
 from src.entity.config_entity import VehiclePredictorConfig
-from src.entity.s3_estimator import Proj1Estimator
+from src.entity.estimator import DEFAULT_DECISION_THRESHOLD, apply_decision_threshold
+from src.entity.s3_estimator import Proj1Estimator, load_model_file
 from src.exception import MyException
 from src.logger import logging
-from pandas import DataFrame
+from src.utils.main_utils import read_yaml_file
+from src.utils.prediction_cache import PredictionCache
+from pandas import DataFrame, to_numeric
 
 class VehicleData:
     def __init__(self,
@@ -55,7 +68,7 @@ class VehicleData:
         """
         This function returns a dictionary from VehicleData class input
         """
-        logging.info("Entered get_usvisa_data_as_dict method as VehicleData class")
+        logging.debug("Entered get_usvisa_data_as_dict method as VehicleData class")
 
         try:
             input_data = {
@@ -72,14 +85,24 @@ class VehicleData:
                 "Vehicle_Damage_Yes": [self.Vehicle_Damage_Yes]
             }
 
-            logging.info("Created vehicle data dict")
-            logging.info("Exited get_vehicle_data_as_dict method as VehicleData class")
+            logging.debug("Created vehicle data dict")
+            logging.debug("Exited get_vehicle_data_as_dict method as VehicleData class")
             return input_data
 
         except Exception as e:
             raise MyException(e, sys) from e
 
 class VehicleDataClassifier:
+    # the model is loaded once per process and shared by all requests
+    _model = None
+    _model_version: str = None
+    _model_load_seconds: float = None
+    _model_lock = threading.Lock()
+    _is_warm = False
+    _feature_names: list = None
+    # per row predictions of the current model version, shared by all requests of the process
+    prediction_cache = PredictionCache()
+
     def __init__(self,prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig(),) -> None:
         """
         :param prediction_pipeline_config: Configuration for prediction the value
@@ -89,20 +112,251 @@ class VehicleDataClassifier:
         except Exception as e:
             raise MyException(e, sys)
 
-    def predict(self, dataframe) -> str:
+    @classmethod
+    def preload_shared_model(cls, prediction_pipeline_config: VehiclePredictorConfig = VehiclePredictorConfig()) -> str:
+        """
+        Called by the parent process of the serving workers before they are started.
+        Loads the production model in the compiled format and exports its local file through
+        the SHARED_MODEL_PATH environment variable. Forked workers inherit the read-only mapping
+        and spawned workers map the same file, so the model arrays exist once in the page cache
+        instead of once per worker.
+        Returns: path of the shared model file
+        """
+        try:
+            logging.info("Entered preload_shared_model method of VehicleDataClassifier class")
+            estimator = Proj1Estimator(
+                bucket_name=prediction_pipeline_config.model_bucket_name,
+                model_path=prediction_pipeline_config.model_file_path,
+                model_format="compiled",
+            )
+            start = time.perf_counter()
+            model_file = estimator.get_model_file()
+            model_version = estimator.get_model_version()
+            model = load_model_file(model_file)
+            cls._check_feature_order(model)
+            with cls._model_lock:
+                cls._model = model
+                cls._model_version = model_version
+                cls._model_load_seconds = time.perf_counter() - start
+                cls._is_warm = False
+            os.environ[SERVING_SHARED_MODEL_PATH_ENV_KEY] = model_file
+            os.environ[SERVING_SHARED_MODEL_VERSION_ENV_KEY] = model_version
+            logging.info(f"Shared model file {model_file} of version {model_version}")
+            return model_file
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_model(self):
+        """
+        Returns the model of this process. It is attached to the file shared by the parent
+        process when there is one, and otherwise loaded through Proj1Estimator.
+        """
+        if VehicleDataClassifier._model is None:
+            with VehicleDataClassifier._model_lock:
+                if VehicleDataClassifier._model is None:
+                    start = time.perf_counter()
+                    shared_model_file = os.getenv(SERVING_SHARED_MODEL_PATH_ENV_KEY)
+                    if shared_model_file and os.path.exists(shared_model_file):
+                        logging.info(f"Attaching to shared model file {shared_model_file}")
+                        model = load_model_file(shared_model_file)
+                        model_version = os.getenv(SERVING_SHARED_MODEL_VERSION_ENV_KEY) or None
+                    else:
+                        estimator = Proj1Estimator(
+                            bucket_name=self.prediction_pipeline_config.model_bucket_name,
+                            model_path=self.prediction_pipeline_config.model_file_path,
+                        )
+                        model = estimator.load_model()
+                        model_version = estimator.get_model_version()
+                    VehicleDataClassifier._check_feature_order(model)
+                    VehicleDataClassifier._model_version = model_version
+                    VehicleDataClassifier._model_load_seconds = time.perf_counter() - start
+                    VehicleDataClassifier._model = model
+        return VehicleDataClassifier._model
+
+    @classmethod
+    def get_model_version(cls) -> str:
+        """Returns the version of the loaded model, None before it is loaded"""
+        return cls._model_version
+
+    @classmethod
+    def get_model_load_seconds(cls) -> float:
+        """Returns the seconds loading the model took, None before it is loaded"""
+        return cls._model_load_seconds
+
+    @classmethod
+    def is_ready(cls) -> bool:
+        """True once the model is loaded, its version is known and it was warmed up"""
+        return cls._is_warm and cls._model is not None and cls._model_version is not None
+
+    @classmethod
+    def get_feature_names(cls) -> list:
+        """Returns the model input features in model order, as listed in the schema feature ranges"""
+        if cls._feature_names is None:
+            cls._feature_names = list(read_yaml_file(file_path=SCHEMA_FILE_PATH)["feature_ranges"])
+        return cls._feature_names
+
+    @classmethod
+    def _check_feature_order(cls, model) -> None:
+        """
+        Requests are decoded into matrices in get_feature_names order, and a compiled model
+        reads their columns by position: a model trained with another column order would
+        silently score the wrong features, so it is refused at load.
+        """
+        model_feature_names = getattr(model, "feature_names", None)
+        if model_feature_names is not None and list(model_feature_names) != cls.get_feature_names():
+            raise Exception(f"Model features {list(model_feature_names)} are not in the schema feature order "
+                            f"{cls.get_feature_names()}")
+
+    @staticmethod
+    def get_warm_up_data(batch_size: int, random_state: int = 0) -> DataFrame:
+        """
+        Returns a batch of synthetic model inputs drawn from the feature ranges of the schema
+        """
+        feature_ranges = read_yaml_file(file_path=SCHEMA_FILE_PATH)["feature_ranges"]
+        rng = np.random.default_rng(random_state)
+        return DataFrame({name: rng.integers(low, high + 1, size=batch_size)
+                          for name, (low, high) in feature_ranges.items()})
+
+    def warm_up(self, batch_sizes=SERVING_WARM_UP_BATCH_SIZES) -> None:
+        """
+        Loads the model and sends synthetic batches of representative sizes through the path
+        of a request: validated rows, decode_features, predict_proba_array and label. The
+        download, deserialization and first call allocations are then not paid by requests.
+        """
+        try:
+            logging.info("Entered warm_up method of VehicleDataClassifier class")
+            model = self.get_model()
+            if hasattr(model, "prefetch"):
+                model.prefetch()
+            row_model = build_vehicle_features_model(self.get_feature_names())
+            for batch_size in batch_sizes:
+                rows = [row_model.model_validate(record)
+                        for record in self.get_warm_up_data(batch_size).to_dict(orient="records")]
+                start = time.perf_counter()
+                self.label(self.predict_proba_array(decode_features(rows)))
+                logging.info(f"Warm-up batch of {batch_size} rows took {time.perf_counter() - start:.4f}s")
+            # the synthetic rows went through the prediction cache like requests, they are not kept
+            VehicleDataClassifier.prediction_cache.clear()
+            VehicleDataClassifier._is_warm = True
+            logging.info(f"Exited warm_up method of VehicleDataClassifier class, model version {self.get_model_version()}")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def get_decision_threshold(self) -> float:
+        """Returns the decision threshold stored with the model"""
+        return getattr(self.get_model(), "decision_threshold", DEFAULT_DECISION_THRESHOLD)
+
+    def _model_proba(self, features: np.ndarray) -> np.ndarray:
+        """Positive class probabilities of the model for a numeric feature matrix"""
+        model = self.get_model()
+        if hasattr(model, "predict_proba_array"):
+            return model.predict_proba_array(features)[:, -1]
+        # the preprocessing of a dill model selects its columns by name and scales in the input dtype
+        dataframe = DataFrame(features.astype(np.float64), columns=self.get_feature_names())
+        return model.predict_proba(dataframe)[:, -1]
+
+    def predict_proba_array(self, features: np.ndarray) -> np.ndarray:
+        """
+        Returns the positive class probability of every row of a numeric feature matrix with
+        columns in get_feature_names order. Probabilities rather than labels are cached, so
+        that requests with different thresholds share the cache.
+        """
+        try:
+            if len(features) == 0:
+                return np.empty(0, dtype=np.float64)
+            cache = VehicleDataClassifier.prediction_cache
+            if not cache.enabled or len(features) > PREDICTION_CACHE_MAX_BATCH_ROWS:
+                return self._model_proba(features)
+
+            self.get_model()  # loads the model and with it its version
+            model_version = self.get_model_version()
+            row_keys = cache.row_keys(features)
+            result = cache.get_many(model_version, row_keys)
+            missing = [i for i, value in enumerate(result) if value is None]
+            if missing:
+                probabilities = self._model_proba(features[missing])
+                cache.put_many(model_version, row_keys[missing], probabilities)
+                for i, probability in zip(missing, probabilities):
+                    result[i] = probability
+            return np.asarray(result, dtype=np.float64)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict_proba(self, dataframe) -> np.ndarray:
+        """
+        Returns the positive class probability of every row of a DataFrame of model features
+        """
+        try:
+            features = dataframe[self.get_feature_names()].apply(to_numeric).to_numpy(dtype=np.float64)
+            return self.predict_proba_array(features)
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def label(self, probabilities: np.ndarray, threshold: float = None) -> np.ndarray:
+        """
+        Turns positive class probabilities into class labels.
+        threshold: overrides the decision threshold stored with the model
+        """
+        threshold = self.get_decision_threshold() if threshold is None else threshold
+        return apply_decision_threshold(self.get_model().classes, probabilities, threshold)
+
+    def rank(self, features: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the row positions of the k rows of a feature matrix with the highest positive
+        class probability, highest first, and their probabilities
+        """
+        try:
+            probabilities = self.predict_proba_array(features)
+            k = min(k, len(probabilities))
+            if k == 0:
+                return np.empty(0, dtype=np.int64), probabilities[:0]
+            top = np.argpartition(-probabilities, k - 1)[:k]
+            top = top[np.argsort(-probabilities[top], kind="stable")]
+            return top, probabilities[top]
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def predict(self, dataframe, threshold: float = None) -> str:
         """
         This is the method of VehicleDataClassifier
+        threshold: overrides the decision threshold stored with the model
         Returns: Prediction in string format
         """
         try:
-            logging.info("Entered predict method of VehicleDataClassifier class")
-            model = Proj1Estimator(
-                bucket_name=self.prediction_pipeline_config.model_bucket_name,
-                model_path=self.prediction_pipeline_config.model_file_path,
-            )
-            result =  model.predict(dataframe)
+            logging.debug("Entered predict method of VehicleDataClassifier class")
+            result = self.label(self.predict_proba(dataframe), threshold=threshold)
             
             return result
         
         except Exception as e:
-            raise MyException(e, sys)
\ No newline at end of file
+            raise MyException(e, sys)
+
+
+def build_vehicle_features_model(feature_names: list) -> Type[BaseModel]:
+    """
+    Generates the typed request model of one row from the model feature list. Every feature
+    is a required finite number; form strings are parsed into floats by pydantic, so invalid
+    input is rejected before it reaches the model.
+    """
+    fields = {name: (float, Field(..., allow_inf_nan=False)) for name in feature_names}
+    return create_model("VehicleFeatures", __config__=ConfigDict(extra="ignore"), **fields)
+
+
+_row_buffer = threading.local()
+
+def decode_features(rows: Sequence[BaseModel]) -> np.ndarray:
+    """
+    Decodes validated rows into a float32 feature matrix with columns in model order.
+    A single row is written into a preallocated buffer of the calling thread, which stays
+    valid until the thread decodes the next row.
+    """
+    feature_names = VehicleDataClassifier.get_feature_names()
+    get_features = attrgetter(*feature_names)
+    if len(rows) == 1:
+        buffer = getattr(_row_buffer, "features", None)
+        if buffer is None or buffer.shape[1] != len(feature_names):
+            buffer = _row_buffer.features = np.empty((1, len(feature_names)), dtype=np.float32)
+        buffer[0] = get_features(rows[0])
+        return buffer
+    return np.fromiter(chain.from_iterable(map(get_features, rows)), dtype=np.float32,
+                       count=len(rows) * len(feature_names)).reshape(len(rows), len(feature_names))
@@ -1,6 +1,9 @@
+import os
 import sys
+from src.constants import PIPELINE_PROFILE_FLAMEGRAPH_ENV_KEY
 from src.exception import MyException
 from src.logger import logging
+from src.utils.profiler import StageProfiler, profile_stage
 
 from src.components.data_ingestion import DataIngestion
 from src.components.data_validation import DataValidation
@@ -9,7 +12,8 @@ from src.components.model_trainer import ModelTrainer
 from src.components.model_evaluation import ModelEvaluation
 from src.components.model_pusher import ModelPusher
 
-from src.entity.config_entity import (DataIngestionConfig,
+from src.entity.config_entity import (TrainingPipelineConfig,
+                                      DataIngestionConfig,
                                       DataValidationConfig,
                                       DataTransformationConfig,
                                       ModelTrainerConfig,
@@ -24,7 +28,12 @@ from src.entity.artifact_entity import (DataIngestionArtifact,
                                         ModelPusherArtifact)
 
 class TrainingPipeline:
-    def __init__(self):
+    def __init__(self,proj1_data=None):
+        """
+        proj1_data: source of the training collection passed to DataIngestion, MongoDB by default
+        """
+        self.proj1_data = proj1_data
+        self.training_pipeline_config = TrainingPipelineConfig()
         self.data_ingestion_config = DataIngestionConfig()
         self.data_validation_config = DataValidationConfig()
         self.data_transformation_config = DataTransformationConfig()
@@ -32,6 +41,7 @@ class TrainingPipeline:
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
 
+    @profile_stage("data_ingestion")
     def start_data_ingestion(self)->DataIngestionArtifact:
         """
         This method of the Training Pipeline class is responsible for starting the data ingestion component
@@ -39,7 +49,7 @@ class TrainingPipeline:
         try:
             logging.info("Entered the start_data_ingestion method of the TrainingPipeline class")
             logging.info("Getting the data from mongodb")
-            data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config)
+            data_ingestion = DataIngestion(data_ingestion_config=self.data_ingestion_config,proj1_data=self.proj1_data)
             data_ingestion_artifact = data_ingestion.initiate_data_ingestion()
             logging.info("Got the train and test set from mongodb")
             logging.info("Exited the start_data_ingestion method of TrainingPipeline class")
@@ -47,6 +57,7 @@ class TrainingPipeline:
         except Exception as e:
             raise MyException(e,sys) from e
 
+    @profile_stage("data_validation")
     def start_data_validation(self,data_ingestion_artifact: DataIngestionArtifact)->DataValidationArtifact:
         """
         This method of the Training Pipeline class is responsible for starting the data validation component
@@ -68,6 +79,7 @@ class TrainingPipeline:
             raise MyException(e,sys) from e
 
 
+    @profile_stage("data_transformation")
     def start_data_transformation(self,data_ingestion_artifact: DataIngestionArtifact,data_validation_artifact: DataValidationArtifact)->DataTransformationArtifact:
         """
         This method of TrainingPipeline class is responsible for running data tranformation component
@@ -81,6 +93,7 @@ class TrainingPipeline:
         except Exception as e:
             raise MyException(e,sys)
 
+    @profile_stage("model_trainer")
     def start_model_trainer(self,data_transformation_artifact: DataTransformationArtifact)->ModelTrainerArtifact:
         """
         This method of TrainingPipeline class is responsible for starting model training
@@ -93,6 +106,7 @@ class TrainingPipeline:
         except Exception as e:
             raise MyException(e,sys)
 
+    @profile_stage("model_evaluation")
     def start_model_evaluation(self,data_ingestion_artifact: DataIngestionArtifact,
                                model_trainer_artifact: ModelTrainerArtifact)->ModelEvaluationArtifact:
         """
@@ -108,6 +122,7 @@ class TrainingPipeline:
             raise MyException(e,sys) 
 
 
+    @profile_stage("model_pusher")
     def start_model_pusher(self, model_evaluation_artifact: ModelEvaluationArtifact) -> ModelPusherArtifact:
         """
         This method of TrainPipeline class is responsible for starting model pushing
@@ -123,21 +138,32 @@ class TrainingPipeline:
 
     def run_pipeline(self,)->None:
         """
-        This method of TrainingPipeline class is responsible for running complete pipeline
+        This method of TrainingPipeline class is responsible for running complete pipeline.
+        The run is profiled stage by stage into a profile.json next to its artifacts.
         """
+        flamegraph_file_path = None
+        if os.getenv(PIPELINE_PROFILE_FLAMEGRAPH_ENV_KEY, "0").lower() in ("1", "true", "yes"):
+            flamegraph_file_path = self.training_pipeline_config.flamegraph_file_path
+        profiler = StageProfiler(profile_file_path=self.training_pipeline_config.profile_file_path,
+                                 flamegraph_file_path=flamegraph_file_path)
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact,
-                                                                          data_validation_artifact=data_validation_artifact)
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
-            model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
-                                                                    model_trainer_artifact=model_trainer_artifact)
-            
-            if not model_evaluation_artifact.is_model_accepted:
-                logging.info(f"Model not accepted.")
-                return None
-            model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
-
+            with profiler.activate():
+                self._run_stages()
         except Exception as e:
-            raise MyException(e,sys) from e
\ No newline at end of file
+            raise MyException(e,sys) from e
+        finally:
+            profiler.write()
+
+    def _run_stages(self)->None:
+        data_ingestion_artifact = self.start_data_ingestion()
+        data_validation_artifact = self.start_data_validation(data_ingestion_artifact=data_ingestion_artifact)
+        data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact=data_ingestion_artifact,
+                                                                      data_validation_artifact=data_validation_artifact)
+        model_trainer_artifact = self.start_model_trainer(data_transformation_artifact=data_transformation_artifact)
+        model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact=data_ingestion_artifact,
+                                                                model_trainer_artifact=model_trainer_artifact)
+
+        if not model_evaluation_artifact.is_model_accepted:
+            logging.info(f"Model not accepted.")
+            return None
+        model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact=model_evaluation_artifact)
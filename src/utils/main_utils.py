@@ -1,5 +1,6 @@
 import os
 import sys
+import hashlib
 
 import numpy as np
 import dill
@@ -80,3 +81,19 @@ def save_object(file_path: str, obj: object) -> None:
 
     except Exception as e:
         raise MyException(e, sys) from e
+
+
+def file_fingerprint(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Returns a sha256 hex digest of the file content, read in chunks.
+    file_path: str location of file to fingerprint
+    return: str hex digest
+    """
+    try:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except Exception as e:
+        raise MyException(e, sys) from e
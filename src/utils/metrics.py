@@ -0,0 +1,192 @@
+"""
+Process local metrics of the prediction service in the Prometheus text exposition format.
+
+Updates are meant for the request hot path: every metric keeps one shard per thread, so an
+update is a thread-local lookup and an addition on values only that thread writes, without
+locks. A scrape sums the shards of all threads. Values that already exist elsewhere, such
+as the prediction cache counters or the model version, are read at scrape time by
+collector functions instead of being updated per request.
+
+Each process exposes its own metrics; with several workers behind one port, every scrape
+is answered by one of them.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _ShardedMetric:
+    """Base of the metrics keeping one shard of values per thread"""
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards: List[dict] = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            # taken once per thread, never per update
+            with self._shards_lock:
+                self._shards.append(shard)
+            return shard
+
+    def _snapshot(self) -> List[dict]:
+        with self._shards_lock:
+            shards = list(self._shards)
+        # copy each shard, the owning thread may add keys while the scrape reads it
+        return [dict(shard) for shard in shards]
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_ShardedMetric):
+    """Monotonic counter with optional labels"""
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, labels: Tuple = ()) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        totals: Dict[Tuple, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return self.header() + [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+                                for labels, value in sorted(totals.items())]
+
+
+class Histogram(_ShardedMetric):
+    """Histogram with fixed upper bounds and optional labels"""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float], labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Tuple = ()) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # per bucket counts, the last one for values above all bounds, then sum
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def collect(self) -> List[str]:
+        totals: Dict[Tuple, list] = {}
+        for shard in self._snapshot():
+            for labels, state in shard.items():
+                total = totals.setdefault(labels, [0] * len(state))
+                for index, value in enumerate(list(state)):
+                    total[index] += value
+        lines = self.header()
+        labelnames = self.labelnames + ("le",)
+        for labels, total in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), total[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(labelnames, labels + (_format_value(bound),))} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Metrics of the process, rendered together in the Prometheus text format.
+    Collectors are functions called at scrape time that return
+    (name, type, documentation, [(labels dict, value), ...]) tuples for values kept elsewhere.
+    """
+    def __init__(self):
+        self._metrics: List[_ShardedMetric] = []
+        self._collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: Iterable[float],
+                  labelnames: Sequence[str] = ()) -> Histogram:
+        metric = Histogram(name, documentation, buckets, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], Iterable[tuple]]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            for name, metric_type, documentation, samples in collector():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} "
+                                     f"{_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware observing the latency of every HTTP request into a histogram labelled
+    with the route template, method and status code. Route templates rather than paths keep
+    the number of series bounded.
+    """
+    def __init__(self, app, histogram: Histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            self.histogram.observe(time.perf_counter() - start,
+                                   (getattr(route, "path", "other"), scope["method"], str(status)))
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from src.constants import (PREDICTION_CACHE_MAX_BYTES, PREDICTION_CACHE_MAX_BYTES_ENV_KEY, PREDICTION_CACHE_TTL_SECONDS,
+                           PREDICTION_CACHE_TTL_SECONDS_ENV_KEY)
+from src.exception import MyException
+
+# approximate memory of one entry besides its key and value: entry tuple, expiry float and OrderedDict node
+PREDICTION_CACHE_ENTRY_OVERHEAD = 200
+
+
+class PredictionCache:
+    """
+    Process local LRU cache of per row predictions with a time to live.
+
+    Rows are keyed on their normalized feature vector, the float64 bytes of the features in
+    model order, so that the same quote submitted as form strings, ints or floats hits the
+    same entry, and on the model version.
+    The cache is cleared when it sees a new model version, so predictions of a swapped out
+    model are never returned and do not hold memory.
+    """
+    def __init__(self, max_bytes: int = None, ttl_seconds: float = None):
+        """
+        max_bytes: approximate memory bound of the cache, 0 disables it. Defaults to the
+                   PREDICTION_CACHE_MAX_BYTES environment variable and then to the constant
+        ttl_seconds: seconds an entry stays valid, defaults like max_bytes
+        """
+        self.max_bytes = max_bytes if max_bytes is not None else int(
+            os.getenv(PREDICTION_CACHE_MAX_BYTES_ENV_KEY, PREDICTION_CACHE_MAX_BYTES))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.getenv(PREDICTION_CACHE_TTL_SECONDS_ENV_KEY, PREDICTION_CACHE_TTL_SECONDS))
+        self.model_version = None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @staticmethod
+    def row_keys(features: np.ndarray) -> np.ndarray:
+        """
+        Returns one key per row of a feature matrix with columns in model order: the bytes of
+        the row as float64, which identify it exactly without hashing.
+        """
+        try:
+            normalized = np.ascontiguousarray(features, dtype=np.float64)
+            return normalized.view(f"V{normalized.shape[1] * 8}").ravel()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    def _set_model_version(self, model_version: str) -> None:
+        if model_version != self.model_version:
+            self._entries.clear()
+            self._bytes = 0
+            self.model_version = model_version
+
+    def get_many(self, model_version: str, row_keys: np.ndarray) -> list:
+        """
+        Looks rows up by key. Returns the cached value per row, None for misses.
+        """
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            self._set_model_version(model_version)
+            for row_key in row_keys.tolist():
+                entry = self._entries.get(row_key)
+                if entry is not None and entry[0] < now:
+                    self._remove(row_key)
+                    self.expirations += 1
+                    entry = None
+                if entry is None:
+                    self.misses += 1
+                    values.append(None)
+                else:
+                    self._entries.move_to_end(row_key)
+                    self.hits += 1
+                    values.append(entry[1])
+        return values
+
+    def put_many(self, model_version: str, row_keys: np.ndarray, values) -> None:
+        """
+        Stores one value per row and evicts least recently used entries beyond max_bytes.
+        """
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._set_model_version(model_version)
+            for row_key, value in zip(row_keys.tolist(), values):
+                if row_key in self._entries:
+                    self._remove(row_key)
+                size = PREDICTION_CACHE_ENTRY_OVERHEAD + sys.getsizeof(row_key) + sys.getsizeof(value)
+                self._entries[row_key] = (expires_at, value, size)
+                self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, row_key) -> None:
+        _, _, size = self._entries.pop(row_key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the counters used to size the cache"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
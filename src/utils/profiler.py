@@ -0,0 +1,223 @@
+"""
+Stage level wall time, CPU time, memory and row count profiling of pipeline runs.
+
+    profiler = StageProfiler(profile_file_path="artifact/<run>/profile.json")
+    with profiler.activate():
+        with profile_stage("mongo_fetch") as stage:
+            df = fetch()
+            stage.rows_out = len(df)
+    profiler.write()
+
+Components call profile_stage, which records into the active profiler and does nothing
+when there is none, so they can be run and tested without profiling. Stages nest; every
+stage is reported with its path, e.g. "data_ingestion/mongo_fetch".
+"""
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import List, Optional
+
+from src.constants import PIPELINE_PROFILE_SAMPLING_RATE
+from src.exception import MyException
+from src.logger import logging
+
+PROC_STATUS_PATH = "/proc/self/status"
+PROC_CLEAR_REFS_PATH = "/proc/self/clear_refs"
+
+
+def _read_proc_status_bytes(field_name: str) -> Optional[int]:
+    """Reads a memory field of /proc/self/status in bytes, None where /proc is not available"""
+    try:
+        with open(PROC_STATUS_PATH) as status:
+            for line in status:
+                if line.startswith(field_name + ":"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the peak RSS of the process to its current RSS, Linux only"""
+    try:
+        with open(PROC_CLEAR_REFS_PATH, "w") as clear_refs:
+            clear_refs.write("5")
+        return True
+    except OSError:
+        return False
+
+
+@dataclass
+class StageRecord:
+    """Measurements of one profiled stage"""
+    name: str
+    path: str
+    started_at: str
+    rows_in: Optional[int] = None
+    rows_out: Optional[int] = None
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    rss_start_bytes: Optional[int] = None
+    rss_end_bytes: Optional[int] = None
+    peak_rss_bytes: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class _OpenStage:
+    record: StageRecord
+    wall_start: float
+    cpu_start: float
+    peak_rss: int = 0
+    children: List[str] = field(default_factory=list)
+
+
+class StageProfiler:
+    """
+    Records wall time, process CPU time, peak RSS and rows in/out of nested pipeline stages
+    and writes them as one JSON profile per run, optionally with a flamegraph of the whole
+    run recorded by the py-spy sampling profiler.
+
+    Peak RSS per stage is measured by resetting the kernel's peak RSS counter when a stage
+    starts and reading it when it ends; the peak of an enclosing stage includes the peaks
+    of the stages it contains. Where the counter cannot be reset, the peak is that of the
+    process so far.
+    """
+    current: Optional["StageProfiler"] = None
+
+    def __init__(self, profile_file_path: str, flamegraph_file_path: Optional[str] = None):
+        """
+        profile_file_path: JSON file the profile is written to
+        flamegraph_file_path: SVG file of the flamegraph, None records none
+        """
+        self.profile_file_path = profile_file_path
+        self.flamegraph_file_path = flamegraph_file_path
+        self.records: List[StageRecord] = []
+        self._open: List[_OpenStage] = []
+        self._lock = threading.Lock()
+        self._sampler: Optional[subprocess.Popen] = None
+        self._started_at = None
+        self._wall_start = None
+
+    def _update_peaks(self) -> None:
+        """Folds the current peak RSS into all open stages"""
+        peak = _read_proc_status_bytes("VmHWM")
+        if peak is not None:
+            for open_stage in self._open:
+                open_stage.peak_rss = max(open_stage.peak_rss, peak)
+
+    @contextmanager
+    def stage(self, name: str, rows_in: Optional[int] = None):
+        """
+        Profiles the enclosed block as a stage. Yields the StageRecord, on which the block
+        can set rows_in and rows_out.
+        """
+        with self._lock:
+            self._update_peaks()
+            _reset_peak_rss()
+            path = "/".join([open_stage.record.name for open_stage in self._open] + [name])
+            record = StageRecord(name=name, path=path, started_at=datetime.now().isoformat(), rows_in=rows_in,
+                                 rss_start_bytes=_read_proc_status_bytes("VmRSS"))
+            self._open.append(_OpenStage(record=record, wall_start=time.perf_counter(), cpu_start=time.process_time()))
+        try:
+            yield record
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            with self._lock:
+                open_stage = self._open.pop()
+                self._update_peaks()
+                record.wall_seconds = time.perf_counter() - open_stage.wall_start
+                record.cpu_seconds = time.process_time() - open_stage.cpu_start
+                record.rss_end_bytes = _read_proc_status_bytes("VmRSS")
+                record.peak_rss_bytes = max(open_stage.peak_rss, _read_proc_status_bytes("VmHWM") or 0) or None
+                for parent in self._open:
+                    parent.peak_rss = max(parent.peak_rss, record.peak_rss_bytes or 0)
+                self.records.append(record)
+            logging.info(f"Stage {record.path}: {record.wall_seconds:.2f}s wall, {record.cpu_seconds:.2f}s cpu, "
+                         f"peak rss {(record.peak_rss_bytes or 0) / 2 ** 20:.0f} MiB, "
+                         f"rows {record.rows_in} -> {record.rows_out}")
+
+    def _start_sampler(self) -> None:
+        """Starts py-spy recording this process, if it is installed"""
+        if self.flamegraph_file_path is None:
+            return
+        py_spy = shutil.which("py-spy")
+        if py_spy is None:
+            logging.info("py-spy is not installed, no flamegraph is recorded")
+            return
+        os.makedirs(os.path.dirname(self.flamegraph_file_path) or ".", exist_ok=True)
+        self._sampler = subprocess.Popen([py_spy, "record", "--pid", str(os.getpid()),
+                                          "--rate", str(PIPELINE_PROFILE_SAMPLING_RATE),
+                                          "--format", "flamegraph", "--output", self.flamegraph_file_path],
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def _stop_sampler(self) -> None:
+        """Stops py-spy, which writes the flamegraph on SIGINT"""
+        if self._sampler is None:
+            return
+        self._sampler.send_signal(signal.SIGINT)
+        try:
+            self._sampler.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self._sampler.kill()
+        if self._sampler.returncode != 0 or not os.path.exists(self.flamegraph_file_path):
+            logging.info(f"py-spy exited with {self._sampler.returncode}, the flamegraph may be missing; "
+                         f"recording another process needs ptrace permission")
+        self._sampler = None
+
+    @contextmanager
+    def activate(self):
+        """Makes this the profiler profile_stage records into, and samples the run if configured"""
+        previous, StageProfiler.current = StageProfiler.current, self
+        self._started_at = datetime.now().isoformat()
+        self._wall_start = time.perf_counter()
+        self._start_sampler()
+        try:
+            yield self
+        finally:
+            self._stop_sampler()
+            StageProfiler.current = previous
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self._started_at,
+            "wall_seconds": time.perf_counter() - self._wall_start if self._wall_start is not None else None,
+            "pid": os.getpid(),
+            "flamegraph": self.flamegraph_file_path if self.flamegraph_file_path and os.path.exists(
+                self.flamegraph_file_path) else None,
+            "stages": [asdict(record) for record in sorted(self.records, key=lambda record: record.started_at)],
+        }
+
+    def write(self) -> None:
+        """Writes the profile JSON to profile_file_path"""
+        try:
+            os.makedirs(os.path.dirname(self.profile_file_path) or ".", exist_ok=True)
+            with open(self.profile_file_path, "w") as profile_file:
+                json.dump(self.to_dict(), profile_file, indent=2)
+            logging.info(f"Pipeline profile written to {self.profile_file_path}")
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+
+@contextmanager
+def profile_stage(name: str, rows_in: Optional[int] = None):
+    """
+    Profiles the enclosed block as a stage of the active StageProfiler. Without an active
+    profiler it yields a StageRecord that is not recorded. Usable as a decorator as well.
+    """
+    profiler = StageProfiler.current
+    if profiler is None:
+        yield StageRecord(name=name, path=name, started_at="", rows_in=rows_in)
+        return
+    with profiler.stage(name, rows_in=rows_in) as record:
+        yield record
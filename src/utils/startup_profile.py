@@ -0,0 +1,89 @@
+"""
+Import-time report and startup budget check of the serving process.
+
+    python -m src.utils.startup_profile              # report of the slowest imports
+    python -m src.utils.startup_profile --check      # exit code 1 if over budget
+
+The module is imported in a fresh interpreter with -X importtime, so the numbers are
+those of a cold worker start and are not affected by modules already imported here.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from src.constants import SERVING_FORBIDDEN_IMPORTS, SERVING_IMPORT_BUDGET_SECONDS
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+IMPORT_SCRIPT = (
+    "import json, sys, time\n"
+    "start = time.perf_counter()\n"
+    "import {module}\n"
+    "print(json.dumps({{'seconds': time.perf_counter() - start, 'modules': sorted(sys.modules)}}))\n"
+)
+
+
+def profile_imports(module: str = "app") -> dict:
+    """
+    Imports the module in a subprocess and returns its import profile.
+    return: dict with the total import seconds, the loaded module names and the per module
+            self and cumulative import times in seconds
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_SCRIPT.format(module=module)],
+                            capture_output=True, text=True, cwd=PROJECT_ROOT)
+    if result.returncode != 0:
+        raise Exception(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append({"module": name.strip(), "self": int(self_us) / 1e6, "cumulative": int(cumulative_us) / 1e6})
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+    profile["timings"] = timings
+    return profile
+
+
+def check_profile(profile: dict, budget_seconds: float = SERVING_IMPORT_BUDGET_SECONDS,
+                  forbidden_imports=SERVING_FORBIDDEN_IMPORTS) -> list:
+    """
+    Returns the startup budget violations of an import profile, empty if there are none.
+    """
+    violations = []
+    if profile["seconds"] > budget_seconds:
+        violations.append(f"import took {profile['seconds']:.2f}s, budget is {budget_seconds:.2f}s")
+    loaded = {name.split(".")[0] for name in profile["modules"]}
+    for name in forbidden_imports:
+        if name in loaded:
+            violations.append(f"{name} is imported on the serving path")
+    return violations
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Import-time report of the serving process")
+    parser.add_argument("--module", default="app", help="module to import, app by default")
+    parser.add_argument("--top", type=int, default=25, help="number of slowest imports to list")
+    parser.add_argument("--budget", type=float, default=SERVING_IMPORT_BUDGET_SECONDS)
+    parser.add_argument("--check", action="store_true", help="exit with 1 if the budget is exceeded")
+    parser.add_argument("--json", action="store_true", help="print the full profile as JSON")
+    args = parser.parse_args(argv)
+
+    profile = profile_imports(args.module)
+    if args.json:
+        print(json.dumps(profile, indent=2))
+    else:
+        print(f"import {args.module}: {profile['seconds']:.3f}s, {len(profile['modules'])} modules loaded")
+        print(f"{'cumulative':>12} {'self':>10}  module")
+        for timing in sorted(profile["timings"], key=lambda t: t["cumulative"], reverse=True)[:args.top]:
+            print(f"{timing['cumulative']:>11.3f}s {timing['self']:>9.3f}s  {timing['module']}")
+
+    violations = check_profile(profile, budget_seconds=args.budget)
+    for violation in violations:
+        print(f"startup budget violation: {violation}", file=sys.stderr)
+    return 1 if args.check and violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
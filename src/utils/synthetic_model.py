@@ -0,0 +1,52 @@
+"""
+Synthetic records, features and a model trained on them, for tests and benchmarks that
+must run without MongoDB, the model registry or any storage.
+"""
+import numpy as np
+import pandas as pd
+
+from src.constants import TARGET_COLUMN
+from src.data_access.synthetic_data import SyntheticDataGenerator
+
+
+def generate_raw_data(rows: int, random_state: int = 0) -> pd.DataFrame:
+    """Returns rows records shaped like the production collection, see SyntheticDataGenerator"""
+    return SyntheticDataGenerator(random_state=random_state).generate(rows)
+
+
+def raw_data_to_features(df: pd.DataFrame) -> pd.DataFrame:
+    """Returns the model input features, with columns in model order, of raw records"""
+    from src.pipline.batch_scoring import raw_to_features
+    from src.pipline.prediction_pipeline import VehicleDataClassifier
+
+    feature_names = VehicleDataClassifier.get_feature_names()
+    return pd.DataFrame(raw_to_features(df, feature_names), columns=feature_names)
+
+
+def generate_features(rows: int, random_state: int = 0) -> pd.DataFrame:
+    """Returns model input features of synthetic records"""
+    return raw_data_to_features(generate_raw_data(rows, random_state))
+
+
+def build_synthetic_model(train_rows: int, random_state: int = 0):
+    """
+    Trains a model on synthetic rows with the preprocessing and the RandomForest parameters
+    of the training pipeline, without SMOTEENN, the model registry or any storage.
+    Returns: the MyModel
+    """
+    from src.components.data_transformation import DataTransformation
+    from src.components.model_trainer import ModelTrainer
+    from src.entity.config_entity import ModelTrainerConfig
+    from src.entity.estimator import MyModel
+
+    raw_data = generate_raw_data(train_rows, random_state)
+    features = raw_data_to_features(raw_data)
+    target = raw_data[TARGET_COLUMN].to_numpy()
+    preprocessor = DataTransformation(data_ingestion_artifact=None, data_transformation_config=None,
+                                      data_validation_artifact=None).get_data_transformer_object()
+    train = np.c_[preprocessor.fit_transform(features), target]
+    model_trainer_config = ModelTrainerConfig()
+    model, _ = ModelTrainer(data_transformation_artifact=None,
+                            model_trainer_config=model_trainer_config).model_object_and_report(train, train)
+    return MyModel(preprocessing_object=preprocessor, trained_model_object=model,
+                   decision_threshold=model_trainer_config.decision_threshold)
@@ -0,0 +1,23 @@
+import pytest
+
+from src.cloud_storage.memory_storage import InMemoryStorageService
+
+BUCKET_NAME = "test-bucket"
+
+
+@pytest.fixture
+def storage():
+    """An empty in-memory storage, its buckets are shared by the whole process"""
+    InMemoryStorageService.buckets.clear()
+    yield InMemoryStorageService()
+    InMemoryStorageService.buckets.clear()
+
+
+class UnreachableStorage(InMemoryStorageService):
+    """In-memory storage whose reads fail like an S3 outage"""
+
+    def _get(self, key, bucket_name):
+        raise ConnectionError("storage unreachable")
+
+    def list_keys(self, prefix, bucket_name):
+        raise ConnectionError("storage unreachable")
@@ -0,0 +1,82 @@
+import time
+
+import dill
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.constants import BATCH_SCORING_MAX_IN_FLIGHT_PER_WORKER
+from src.pipline.batch_scoring import BatchScorer
+from src.pipline.prediction_pipeline import VehicleDataClassifier
+
+ROWS = 2000
+CHUNK_SIZE = 100
+
+
+class VintageModel:
+    """Scores a row with its Vintage / ROWS and takes longest on the first chunk"""
+    classes = np.array([0.0, 1.0])
+    decision_threshold = 0.5
+
+    def predict_proba(self, dataframe: pd.DataFrame) -> np.ndarray:
+        vintage = dataframe["Vintage"].to_numpy()
+        if vintage.min() == 0:
+            time.sleep(0.5)  # the first chunk finishes after the chunks submitted behind it
+        return np.c_[1 - vintage / ROWS, vintage / ROWS]
+
+
+@pytest.fixture
+def scoring_files(tmp_path):
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(dill.dumps(VintageModel()))
+    features = pd.DataFrame(0, index=range(ROWS), columns=VehicleDataClassifier.get_feature_names())
+    features["Vintage"] = np.arange(ROWS)
+    features.insert(0, "id", np.arange(ROWS) + 1)
+    input_file = tmp_path / "input.csv"
+    features.to_csv(input_file, index=False)
+    return str(model_file), str(input_file)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_results_are_written_in_input_order(scoring_files, tmp_path, workers):
+    model_file, input_file = scoring_files
+    output_file = tmp_path / f"scores_{workers}.csv"
+    summary = BatchScorer(model_file, chunk_size=CHUNK_SIZE, workers=workers).score(input_file, str(output_file))
+
+    scores = pd.read_csv(output_file)
+    assert summary["rows"] == ROWS
+    assert scores["id"].tolist() == list(range(1, ROWS + 1))
+    np.testing.assert_allclose(scores["probability"], np.arange(ROWS) / ROWS)
+    assert scores["prediction"].tolist() == [int(vintage / ROWS > 0.5) for vintage in range(ROWS)]
+
+
+class RecordingScorer(BatchScorer):
+    """Records how many chunks were read ahead of the chunks written"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written = 0
+        self.read_ahead = []
+
+    def iter_chunks(self, input_path):
+        for chunk_index, df in enumerate(super().iter_chunks(input_path)):
+            self.read_ahead.append(chunk_index - self.written)
+            yield df
+
+    def _open_writer(self, output_path):
+        write, close = BatchScorer._open_writer(output_path)
+
+        def counting_write(result):
+            self.written += 1
+            write(result)
+        return counting_write, close
+
+
+def test_chunks_in_flight_are_bounded(scoring_files, tmp_path):
+    model_file, input_file = scoring_files
+    scorer = RecordingScorer(model_file, chunk_size=CHUNK_SIZE, workers=2)
+    scorer.score(input_file, str(tmp_path / "scores.csv"))
+
+    # while the first chunk is slow, the later ones finish but must wait to be written in order
+    assert len(scorer.read_ahead) == ROWS // CHUNK_SIZE
+    assert max(scorer.read_ahead) <= 2 * BATCH_SCORING_MAX_IN_FLIGHT_PER_WORKER
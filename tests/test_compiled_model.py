@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from src.entity.compiled_model import (CompiledModel, compile_model, is_compiled_model_file, load_compiled_model,
+                                       save_compiled_model)
+from src.utils.synthetic_model import build_synthetic_model, generate_features
+
+
+@pytest.fixture(scope="module")
+def model():
+    return build_synthetic_model(train_rows=3000, random_state=0)
+
+
+@pytest.fixture(scope="module")
+def features():
+    # other seed than the training rows, so unseen category values and extremes show up
+    return generate_features(2000, random_state=1)
+
+
+def test_compiled_model_matches_sklearn(model, features):
+    compiled = compile_model(model)
+    np.testing.assert_allclose(compiled.predict_proba(features), model.predict_proba(features), rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(compiled.predict(features), model.predict(features))
+    np.testing.assert_array_equal(compiled.predict(features, threshold=0.2), model.predict(features, threshold=0.2))
+
+
+def test_saved_compiled_model_matches_sklearn(model, features, tmp_path):
+    model_file = str(tmp_path / "model" / "model.bin")
+    save_compiled_model(model_file, model)
+    assert is_compiled_model_file(model_file)
+
+    loaded = load_compiled_model(model_file)
+    assert isinstance(loaded, CompiledModel)
+    np.testing.assert_allclose(loaded.predict_proba(features), model.predict_proba(features), rtol=0, atol=1e-9)
+    np.testing.assert_array_equal(loaded.predict(features), model.predict(features))
@@ -0,0 +1,14 @@
+import numpy as np
+
+from src.entity.estimator import apply_decision_threshold
+
+
+def test_float_classes_are_labelled_as_integers():
+    labels = apply_decision_threshold(np.array([0.0, 1.0]), np.array([0.2, 0.7, 0.5]), threshold=0.5)
+    assert labels.dtype.kind == "i"
+    assert labels.tolist() == [0, 1, 0]
+
+
+def test_non_integral_classes_are_kept():
+    assert apply_decision_threshold(np.array(["no", "yes"]), np.array([0.9]), 0.5).tolist() == ["yes"]
+    assert apply_decision_threshold(np.array([0.5, 1.5]), np.array([0.1]), 0.5).tolist() == [0.5]
@@ -0,0 +1,59 @@
+import logging
+import sys
+
+import pytest
+
+from src.exception import MyException
+
+
+def error_records(caplog):
+    return [record for record in caplog.records if record.levelno == logging.ERROR]
+
+
+def raise_wrapped():
+    try:
+        raise ValueError("bad input")
+    except Exception as e:
+        raise MyException(e, sys) from e
+
+
+def test_rewrapped_error_is_logged_once(caplog):
+    caplog.set_level(logging.ERROR)
+    with pytest.raises(MyException) as outer:
+        try:
+            raise_wrapped()
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    records = error_records(caplog)
+    assert len(records) == 1
+    assert "bad input" in records[0].getMessage()
+    assert "bad input" in str(outer.value)
+
+
+def test_error_raised_from_a_logged_one_is_not_logged_again(caplog):
+    caplog.set_level(logging.ERROR)
+    with pytest.raises(MyException):
+        try:
+            try:
+                raise_wrapped()
+            except MyException as e:
+                raise RuntimeError("loading failed") from e
+        except Exception as e:
+            raise MyException(e, sys) from e
+
+    assert len(error_records(caplog)) == 1
+
+
+def test_error_message_is_formatted_on_first_use():
+    logging.disable(logging.ERROR)
+    try:
+        error = MyException(ValueError("bad input"), sys)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    assert error._error_message is None
+    assert error.file_name == __file__
+    message = str(error)
+    assert message.endswith(": bad input") and f"[{__file__}]" in message
+    assert error.error_message is error._error_message
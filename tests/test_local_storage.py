@@ -0,0 +1,31 @@
+import os
+
+import dill
+import pytest
+
+from src.cloud_storage.local_storage import LocalStorageService
+from tests.conftest import BUCKET_NAME
+
+
+def test_load_model_unpickles_with_dill(tmp_path):
+    storage = LocalStorageService(root_dir=str(tmp_path / "storage"))
+    model_file = tmp_path / "model.pkl"
+    # a lambda can only be pickled by dill
+    model_file.write_bytes(dill.dumps({"score": lambda x: x + 1}))
+    storage.upload_file(str(model_file), "models/model.pkl", BUCKET_NAME, remove=False)
+    assert storage.load_model("model.pkl", BUCKET_NAME, model_dir="models")["score"](1) == 2
+
+
+def test_failed_upload_leaves_no_temporary_file(tmp_path):
+    storage = LocalStorageService(root_dir=str(tmp_path / "storage"))
+    storage.create_folder("models", BUCKET_NAME)
+    with pytest.raises(Exception):
+        storage.upload_file(str(tmp_path / "missing.pkl"), "models/model.pkl", BUCKET_NAME)
+    bucket_dir = tmp_path / "storage" / BUCKET_NAME / "models"
+    assert [name for name in os.listdir(bucket_dir) if name.startswith(".tmp-")] == []
+
+
+def test_downloaded_model_is_unpickled_with_dill(storage):
+    # StorageService.load_model, used by the S3 and in-memory backends
+    storage.put_object_bytes(dill.dumps({"score": lambda x: x + 1}), key="models/model.pkl", bucket_name=BUCKET_NAME)
+    assert storage.load_model("model.pkl", BUCKET_NAME, model_dir="models")["score"](1) == 2
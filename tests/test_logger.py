@@ -0,0 +1,38 @@
+import logging
+import queue
+
+from src.logger import DroppingQueueHandler, ModuleLevelFilter, parse_log_levels
+
+
+def make_record(name, level, module="module"):
+    return logging.makeLogRecord({"name": name, "levelno": level, "levelname": logging.getLevelName(level),
+                                  "module": module, "msg": "message"})
+
+
+def test_child_loggers_take_the_level_of_the_closest_configured_parent():
+    default_level, module_levels = parse_log_levels("WARNING,botocore=DEBUG,botocore.credentials=ERROR")
+    log_filter = ModuleLevelFilter(default_level, module_levels)
+
+    assert log_filter.filter(make_record("botocore.endpoint", logging.DEBUG))
+    assert log_filter.filter(make_record("botocore.endpoint.http", logging.DEBUG))
+    assert not log_filter.filter(make_record("botocore.credentials", logging.WARNING))
+    assert log_filter.filter(make_record("botocore.credentials", logging.ERROR))
+    # only dotted parents count, not name prefixes
+    assert not log_filter.filter(make_record("botocorex", logging.INFO))
+    assert log_filter.filter(make_record("botocorex", logging.WARNING))
+
+
+def test_root_logger_records_use_their_module_level():
+    log_filter = ModuleLevelFilter(logging.INFO, {"prediction_pipeline": logging.DEBUG})
+
+    assert log_filter.filter(make_record("root", logging.DEBUG, module="prediction_pipeline"))
+    assert not log_filter.filter(make_record("root", logging.DEBUG, module="batch_scoring"))
+
+
+def test_full_queue_drops_and_counts_records():
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    for _ in range(3):
+        handler.handle(make_record("app", logging.INFO))
+
+    assert handler.queue.qsize() == 1
+    assert handler.dropped == 2
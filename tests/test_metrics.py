@@ -0,0 +1,52 @@
+import threading
+
+from src.utils.metrics import MetricsRegistry
+
+
+def test_render_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests served", ("route", "status"))
+    latency = registry.histogram("latency_seconds", "Request latency", buckets=(0.1, 0.5), labelnames=("route",))
+    registry.register_collector(lambda: [("model_info", "gauge", "Loaded model", [({"version": 'v1"x'}, 1)]),
+                                         ("queue_depth", "gauge", "Queued calls", [({}, None)])])
+
+    requests.inc(labels=("/predict", "200"))
+    requests.inc(2, labels=("/", "200"))
+    latency.observe(0.05, ("/",))
+    latency.observe(0.1, ("/",))
+    latency.observe(2.5, ("/",))
+
+    assert registry.render() == "\n".join([
+        "# HELP requests_total Requests served",
+        "# TYPE requests_total counter",
+        'requests_total{route="/",status="200"} 2',
+        'requests_total{route="/predict",status="200"} 1',
+        "# HELP latency_seconds Request latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/",le="0.1"} 2',
+        'latency_seconds_bucket{route="/",le="0.5"} 2',
+        'latency_seconds_bucket{route="/",le="+Inf"} 3',
+        'latency_seconds_sum{route="/"} 2.65',
+        'latency_seconds_count{route="/"} 3',
+        "# HELP model_info Loaded model",
+        "# TYPE model_info gauge",
+        'model_info{version="v1\\"x"} 1',
+        "# HELP queue_depth Queued calls",
+        "# TYPE queue_depth gauge",
+    ]) + "\n"
+
+
+def test_shards_of_all_threads_are_summed():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests served")
+
+    def serve():
+        for _ in range(1000):
+            requests.inc()
+
+    threads = [threading.Thread(target=serve) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert "requests_total 4000\n" in registry.render()
@@ -0,0 +1,129 @@
+import os
+import fcntl
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from src.cloud_storage.memory_storage import InMemoryStorageService
+from src.cloud_storage.model_cache import LocalModelCache
+from src.entity.model_registry import ModelRegistry
+from src.entity.s3_estimator import Proj1Estimator
+from tests.conftest import BUCKET_NAME, UnreachableStorage
+
+
+def register_and_promote(storage, tmp_path, content: bytes) -> str:
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(content)
+    registry = ModelRegistry(bucket_name=BUCKET_NAME, storage=storage)
+    version = registry.register_model(str(model_file), metadata={})
+    registry.promote(version)
+    return version
+
+
+def test_outage_serves_last_resolved_model(storage, tmp_path):
+    version = register_and_promote(storage, tmp_path, b"model v1")
+    cache = LocalModelCache(cache_dir=str(tmp_path / "cache"))
+    estimator = Proj1Estimator(bucket_name=BUCKET_NAME, model_path="model.pkl", storage=storage, model_cache=cache)
+    cached_path = estimator.get_model_file()
+    assert estimator.model_version == version
+
+    # a new process starting during the outage, neither the manifest nor the ETag can be read
+    restarted = Proj1Estimator(bucket_name=BUCKET_NAME, model_path="model.pkl", storage=UnreachableStorage(),
+                               model_cache=LocalModelCache(cache_dir=cache.cache_dir))
+    assert restarted.get_model_file() == cached_path
+    assert restarted.model_version == version
+    assert Path(cached_path).read_bytes() == b"model v1"
+
+
+def test_outage_without_cached_model_raises(storage, tmp_path):
+    register_and_promote(storage, tmp_path, b"model v1")
+    estimator = Proj1Estimator(bucket_name=BUCKET_NAME, model_path="model.pkl", storage=UnreachableStorage(),
+                               model_cache=LocalModelCache(cache_dir=str(tmp_path / "cache")))
+    with pytest.raises(Exception, match="storage unreachable"):
+        estimator.get_model_file()
+
+
+def put_models(storage, sizes: dict) -> None:
+    for key, size in sizes.items():
+        storage.put_object_bytes(key.encode()[:1] * size, key=key, bucket_name=BUCKET_NAME)
+
+
+def cached_keys(paths: dict) -> set:
+    return {key for key, path in paths.items() if os.path.exists(path)}
+
+
+def test_hit_does_not_download_again(storage, tmp_path):
+    put_models(storage, {"a.pkl": 10})
+    cache = LocalModelCache(cache_dir=str(tmp_path), max_bytes=1000)
+    path = cache.get_model_file(storage, BUCKET_NAME, "a.pkl")
+    storage.put_object_bytes(b"changed", key="a.pkl", bucket_name=BUCKET_NAME)
+    # a new ETag is a new entry, the old one stays until it is evicted
+    new_path = cache.get_model_file(storage, BUCKET_NAME, "a.pkl")
+    assert new_path != path
+    assert Path(new_path).read_bytes() == b"changed"
+    assert cache.get_model_file(storage, BUCKET_NAME, "a.pkl") == new_path
+
+
+def test_least_recently_used_entries_are_evicted(storage, tmp_path):
+    put_models(storage, {"a.pkl": 100, "b.pkl": 100, "c.pkl": 100})
+    cache = LocalModelCache(cache_dir=str(tmp_path), max_bytes=250)
+    paths = {"a.pkl": cache.get_model_file(storage, BUCKET_NAME, "a.pkl"),
+             "b.pkl": cache.get_model_file(storage, BUCKET_NAME, "b.pkl")}
+    # b was used before a, whatever the resolution of the file system clock
+    os.utime(paths["b.pkl"], (1000, 1000))
+    os.utime(paths["a.pkl"], (2000, 2000))
+
+    paths["c.pkl"] = cache.get_model_file(storage, BUCKET_NAME, "c.pkl")
+    assert cached_keys(paths) == {"a.pkl", "c.pkl"}
+
+
+def test_entry_in_use_is_not_evicted(storage, tmp_path):
+    put_models(storage, {"a.pkl": 100, "b.pkl": 100, "c.pkl": 100})
+    cache = LocalModelCache(cache_dir=str(tmp_path), max_bytes=150)
+    paths = {"a.pkl": cache.get_model_file(storage, BUCKET_NAME, "a.pkl")}
+    os.utime(paths["a.pkl"], (1000, 1000))
+    paths["b.pkl"] = cache.get_model_file(storage, BUCKET_NAME, "b.pkl")
+    assert cached_keys(paths) == {"b.pkl"}
+    os.utime(paths["b.pkl"], (1000, 1000))
+
+    # another process is looking b up and holds its entry lock
+    entry_name = os.path.splitext(os.path.basename(paths["b.pkl"]))[0]
+    with open(os.path.join(cache.cache_dir, f"{entry_name}.lock"), "w") as entry_lock:
+        fcntl.flock(entry_lock, fcntl.LOCK_EX)
+        paths["c.pkl"] = cache.get_model_file(storage, BUCKET_NAME, "c.pkl")
+    assert cached_keys(paths) == {"b.pkl", "c.pkl"}
+
+
+class CountingStorage(InMemoryStorageService):
+    def __init__(self):
+        super().__init__()
+        self.downloads = 0
+        self.downloads_lock = threading.Lock()
+
+    def download_file(self, key, to_filename, bucket_name):
+        with self.downloads_lock:
+            self.downloads += 1
+        time.sleep(0.05)  # keeps the other lookups waiting on the entry lock
+        super().download_file(key, to_filename, bucket_name)
+
+
+def test_concurrent_misses_download_once(storage, tmp_path):
+    put_models(storage, {"a.pkl": 100})
+    counting_storage = CountingStorage()
+    results = []
+
+    def lookup():
+        # a cache per thread, like separate processes sharing the directory
+        cache = LocalModelCache(cache_dir=str(tmp_path), max_bytes=1000)
+        results.append(cache.get_model_file(counting_storage, BUCKET_NAME, "a.pkl"))
+
+    threads = [threading.Thread(target=lookup) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counting_storage.downloads == 1
+    assert len(results) == 8 and len(set(results)) == 1
+    assert Path(results[0]).read_bytes() == b"a" * 100
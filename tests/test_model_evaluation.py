@@ -0,0 +1,130 @@
+import json
+
+import dill
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.model_evaluation import ModelEvaluation
+from src.entity.artifact_entity import DataIngestionArtifact, ModelTrainerArtifact
+from src.entity.config_entity import ModelEvaluationConfig
+
+
+class ScoreColumnModel:
+    """Model whose positive class probability is a column of the test data"""
+
+    def __init__(self, score_column: str, decision_threshold: float):
+        self.score_column = score_column
+        self.decision_threshold = decision_threshold
+
+    def predict_proba(self, x: pd.DataFrame) -> np.ndarray:
+        scores = x[self.score_column].to_numpy(dtype=np.float64)
+        return np.c_[1 - scores, scores]
+
+
+class FakeEstimator:
+    """Production model stand-in counting how often it is downloaded"""
+
+    def __init__(self, model):
+        self.model = model
+        self.loads = 0
+
+    def get_model_etag(self) -> str:
+        return "etag"
+
+    def load_model(self):
+        self.loads += 1
+        return self.model
+
+
+def make_evaluation(tmp_path, y, trained_scores, best_scores, trained_threshold=0.5, best_model=None, **config):
+    rows = len(y)
+    test_file = tmp_path / "test.csv"
+    pd.DataFrame({"Gender": ["Male", "Female"] * (rows // 2) + ["Male"] * (rows % 2),
+                  "Vehicle_Age": "1-2 Year", "Vehicle_Damage": "Yes",
+                  "trained_score": trained_scores, "best_score": best_scores, "Response": y}).to_csv(test_file, index=False)
+    model_file = tmp_path / "model.pkl"
+    with open(model_file, "wb") as file_obj:
+        dill.dump(ScoreColumnModel("trained_score", trained_threshold), file_obj)
+
+    eval_config = ModelEvaluationConfig(model_evaluation_dir=str(tmp_path / "evaluation"),
+                                        evaluation_report_file_path=str(tmp_path / "evaluation" / "report.json"),
+                                        scoring_cache_dir=str(tmp_path / "cache"), **config)
+    evaluation = ModelEvaluation(eval_config, DataIngestionArtifact(trained_file_path=str(test_file),
+                                                                   test_file_path=str(test_file)),
+                                 ModelTrainerArtifact(trained_model_file_path=str(model_file), metric_artifact=None))
+    evaluation.get_best_model = lambda: best_model
+    return evaluation
+
+
+def read_report(evaluation) -> dict:
+    with open(evaluation.model_eval_config.evaluation_report_file_path) as report_file:
+        return json.load(report_file)
+
+
+def test_each_model_is_scored_at_its_own_threshold(tmp_path):
+    y = np.array([1, 1, 0, 0])
+    best_model = FakeEstimator(ScoreColumnModel("best_score", decision_threshold=0.8))
+    evaluation = make_evaluation(tmp_path, y, trained_scores=[0.9, 0.6, 0.4, 0.1], best_scores=[0.9, 0.6, 0.4, 0.1],
+                                 best_model=best_model)
+    result = evaluation.evaluate_model()
+
+    # at 0.5 both positives are found, at the production model's 0.8 only one
+    assert result.trained_model_metric_artifact.recall_score == 1.0
+    assert result.best_model_metric_artifact.recall_score == 0.5
+    report = read_report(evaluation)
+    assert report["trained_model"]["decision_threshold"] == 0.5
+    assert report["best_model"]["decision_threshold"] == 0.8
+
+    # the cached scores keep the production model's threshold
+    assert evaluation.evaluate_model().best_model_metric_artifact.recall_score == 0.5
+    assert best_model.loads == 1
+    assert read_report(evaluation)["best_model"]["decision_threshold"] == 0.8
+
+
+def test_model_is_accepted_without_production_model(tmp_path):
+    y = np.array([1, 0])
+    evaluation = make_evaluation(tmp_path, y, trained_scores=[0.9, 0.1], best_scores=[0.0, 0.0])
+    result = evaluation.evaluate_model()
+    assert result.is_model_accepted
+    assert result.best_model_f1_score is None
+    assert "best_model" not in read_report(evaluation)
+
+
+def evaluate(tmp_path, mode, y, trained_found, best_found):
+    """
+    Evaluates two models that label the first trained_found and best_found positives of y
+    as positive, and every negative as negative
+    """
+    positives = np.flatnonzero(y == 1)
+    trained_scores, best_scores = np.full(len(y), 0.1), np.full(len(y), 0.1)
+    trained_scores[positives[:trained_found]] = 0.9
+    best_scores[positives[:best_found]] = 0.9
+    best_model = FakeEstimator(ScoreColumnModel("best_score", decision_threshold=0.5))
+    return make_evaluation(tmp_path / mode, y, trained_scores, best_scores, best_model=best_model,
+                           evaluation_mode=mode, changed_threshold_score=0.02).evaluate_model()
+
+
+@pytest.mark.parametrize("rows, trained_found, best_found, point_accepts, bootstrap_accepts", [
+    # one more positive found on 40 rows: above the threshold, but not with 95% confidence
+    (40, 15, 14, True, False),
+    # twice the recall on 2000 rows: accepted either way
+    (2000, 1000, 500, True, True),
+    # worse than production: rejected either way
+    (2000, 500, 1000, False, False),
+])
+def test_bootstrap_accepts_only_confident_improvements(tmp_path, rows, trained_found, best_found, point_accepts,
+                                                       bootstrap_accepts):
+    y = np.array([1, 0] * (rows // 2))
+    (tmp_path / "point").mkdir()
+    (tmp_path / "bootstrap").mkdir()
+    point = evaluate(tmp_path, "point", y, trained_found, best_found)
+    bootstrap = evaluate(tmp_path, "bootstrap", y, trained_found, best_found)
+
+    assert point.difference == pytest.approx(bootstrap.difference)
+    assert point.is_model_accepted == point_accepts
+    assert point_accepts == (point.difference > 0.02)
+    assert point.difference_ci_low is None
+    assert bootstrap.difference_ci_low <= bootstrap.difference <= bootstrap.difference_ci_high
+    assert bootstrap.is_model_accepted == bootstrap_accepts
+    assert bootstrap_accepts == (bootstrap.difference_ci_low > 0.02)
@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from src.cloud_storage.memory_storage import InMemoryStorageService
+from src.entity.model_registry import ModelRegistry
+from tests.conftest import BUCKET_NAME
+
+
+def register(registry: ModelRegistry, tmp_path, content: bytes) -> str:
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(content)
+    return registry.register_model(str(model_file), metadata={"content": content.decode()})
+
+
+def test_promote_and_rollback(storage, tmp_path):
+    registry = ModelRegistry(bucket_name=BUCKET_NAME, storage=storage)
+    assert registry.get_production_version() is None
+    first = register(registry, tmp_path, b"model v1")
+    second = register(registry, tmp_path, b"model v2")
+    assert registry.list_versions() == sorted([first, second])
+
+    registry.promote(first)
+    registry.promote(second)
+    assert registry.get_production_version() == second
+    assert registry.get_metadata(second)["content"] == "model v2"
+
+    assert registry.rollback() == first
+    assert registry.get_production_version() == first
+    with pytest.raises(Exception, match="No previous production version"):
+        registry.rollback()
+
+
+def test_promote_of_unregistered_version_fails(storage):
+    registry = ModelRegistry(bucket_name=BUCKET_NAME, storage=storage)
+    with pytest.raises(Exception, match="is not registered"):
+        registry.promote("v20000101000000-deadbeef")
+    assert registry.get_manifest() == ({"production": None, "history": []}, None)
+
+
+def test_version_is_registered_once(storage, tmp_path):
+    registry = ModelRegistry(bucket_name=BUCKET_NAME, storage=storage)
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(b"model v1")
+    version = registry.register_model(str(model_file), metadata={})
+    # the metadata of a version is written create-only
+    with pytest.raises(Exception, match="already exists"):
+        storage.put_object_bytes(b"{}", key=registry.get_model_key(version, "metadata.json"),
+                                 bucket_name=BUCKET_NAME, if_none_match=True)
+
+
+class RacingStorage(InMemoryStorageService):
+    """Makes concurrent manifest readers all read before any of them writes"""
+
+    def __init__(self, readers: int):
+        super().__init__()
+        self.barrier = threading.Barrier(readers, timeout=10)
+
+    def get_object_bytes(self, key, bucket_name):
+        result = super().get_object_bytes(key, bucket_name)
+        if key.endswith("manifest.json"):
+            self.barrier.wait()
+        return result
+
+
+@pytest.mark.parametrize("writers", [2, 4])
+def test_concurrent_promote_has_one_winner(storage, tmp_path, writers):
+    registry = ModelRegistry(bucket_name=BUCKET_NAME, storage=storage)
+    initial = register(registry, tmp_path, b"model v0")
+    registry.promote(initial)
+    versions = [register(registry, tmp_path, f"model v{index + 1}".encode()) for index in range(writers)]
+
+    racing_registry = ModelRegistry(bucket_name=BUCKET_NAME, storage=RacingStorage(readers=writers))
+    promoted, failures = [], []
+
+    def promote(version):
+        try:
+            racing_registry.promote(version)
+            promoted.append(version)
+        except Exception as e:
+            failures.append(e)
+
+    threads = [threading.Thread(target=promote, args=(version,)) for version in versions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # every writer read the same manifest, so only the first conditional PUT may land
+    assert len(promoted) == 1
+    assert len(failures) == writers - 1
+    assert all("modified concurrently" in str(failure) for failure in failures)
+    manifest, _ = registry.get_manifest()
+    assert manifest == {"production": promoted[0], "history": [initial, promoted[0]]}
+
+    # the losing writers can retry against the new manifest
+    loser = next(version for version in versions if version != promoted[0])
+    registry.promote(loser)
+    assert registry.get_manifest()[0]["history"] == [initial, promoted[0], loser]
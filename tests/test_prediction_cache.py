@@ -0,0 +1,51 @@
+import numpy as np
+
+from src.utils import prediction_cache
+from src.utils.prediction_cache import PredictionCache
+
+
+def keys(*rows):
+    return PredictionCache.row_keys(np.array(rows, dtype=np.float64))
+
+
+def test_equal_rows_of_any_dtype_share_a_key():
+    assert keys([1, 2.0]).tolist() == PredictionCache.row_keys(np.array([[1, 2]], dtype=np.float32)).tolist()
+
+
+def test_new_model_version_invalidates_entries():
+    cache = PredictionCache(max_bytes=10 ** 6, ttl_seconds=60)
+    cache.put_many("v1", keys([1, 2], [3, 4]), [0.1, 0.2])
+    assert cache.get_many("v1", keys([1, 2], [5, 6])) == [0.1, None]
+
+    # the first lookup with the new version clears the predictions of the old model
+    assert cache.get_many("v2", keys([1, 2])) == [None]
+    assert cache.stats()["entries"] == 0
+    cache.put_many("v2", keys([1, 2]), [0.7])
+    assert cache.get_many("v2", keys([1, 2])) == [0.7]
+    assert cache.get_many("v1", keys([1, 2])) == [None]
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now[0])
+    cache = PredictionCache(max_bytes=10 ** 6, ttl_seconds=60)
+    cache.put_many("v1", keys([1, 2]), [0.1])
+
+    now[0] += 59
+    assert cache.get_many("v1", keys([1, 2])) == [0.1]
+    now[0] += 2
+    assert cache.get_many("v1", keys([1, 2])) == [None]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"], stats["entries"]) == (1, 1, 1, 0)
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = PredictionCache(max_bytes=10 ** 6, ttl_seconds=60)
+    cache.put_many("v1", keys([1], [2]), [0.1, 0.2])
+    entry_bytes = cache.stats()["bytes"] // 2
+    cache.max_bytes = 2 * entry_bytes
+    cache.get_many("v1", keys([1]))  # [2] is now the least recently used
+
+    cache.put_many("v1", keys([3]), [0.3])
+    assert cache.get_many("v1", keys([1], [2], [3])) == [0.1, None, 0.3]
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,39 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.pipline.prediction_pipeline import VehicleDataClassifier
+
+
+def test_model_in_schema_feature_order_is_accepted():
+    model = SimpleNamespace(feature_names=list(VehicleDataClassifier.get_feature_names()))
+    VehicleDataClassifier._check_feature_order(model)
+    # a dill model selects its columns by name and has no order to check
+    VehicleDataClassifier._check_feature_order(object())
+
+
+def test_model_in_other_feature_order_is_refused():
+    model = SimpleNamespace(feature_names=list(reversed(VehicleDataClassifier.get_feature_names())))
+    with pytest.raises(Exception, match="not in the schema feature order"):
+        VehicleDataClassifier._check_feature_order(model)
+
+
+def test_warm_up_goes_through_the_request_path(monkeypatch):
+    calls = []
+    classifier = VehicleDataClassifier()
+
+    def predict_proba_array(features):
+        calls.append(features.shape)
+        return np.full(len(features), 0.9)
+
+    monkeypatch.setattr(VehicleDataClassifier, "_model", SimpleNamespace(classes=np.array([0.0, 1.0])))
+    monkeypatch.setattr(VehicleDataClassifier, "_model_version", "test")
+    monkeypatch.setattr(VehicleDataClassifier, "_is_warm", False)
+    monkeypatch.setattr(classifier, "predict_proba_array", predict_proba_array)
+    classifier.warm_up(batch_sizes=(1, 16))
+
+    # one matrix per batch, decoded from validated rows like the rows of a request
+    feature_count = len(VehicleDataClassifier.get_feature_names())
+    assert calls == [(1, feature_count), (16, feature_count)]
+    assert VehicleDataClassifier.is_ready()
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from src.constants import PREDICTION_LOG_ENABLED_ENV_KEY
+from src.data_access.prediction_writer import PredictionWriter
+
+
+class FakeCollection:
+    """In-memory stand-in for an async MongoDB collection, optionally holding writes until released"""
+    def __init__(self, released: bool = True):
+        self.batches = []
+        self.release = asyncio.Event()
+        if released:
+            self.release.set()
+
+    async def insert_many(self, documents, ordered=True):
+        await self.release.wait()
+        self.batches.append(list(documents))
+
+    @property
+    def documents(self):
+        return [document for batch in self.batches for document in batch]
+
+
+def records(count):
+    return [{"request": i} for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def prediction_log_enabled(monkeypatch):
+    monkeypatch.setenv(PREDICTION_LOG_ENABLED_ENV_KEY, "true")
+
+
+def test_drop_policy_discards_records_when_queue_is_full():
+    async def scenario():
+        collection = FakeCollection()
+        writer = PredictionWriter(policy="drop", max_queue_size=2, batch_size=1, collection=collection)
+        await writer.start()
+        # record() never waits under the drop policy, so the writer cannot take anything off meanwhile
+        await writer.record(records(5))
+        assert writer.dropped == 3
+        await writer.stop(timeout=5)
+        return writer, collection
+
+    writer, collection = asyncio.run(scenario())
+    assert collection.documents == records(2)
+    assert (writer.written, writer.dropped, writer.failed) == (2, 3, 0)
+
+
+def test_block_policy_waits_for_room_and_loses_nothing():
+    async def scenario():
+        collection = FakeCollection(released=False)
+        writer = PredictionWriter(policy="block", max_queue_size=1, batch_size=1, collection=collection)
+        await writer.start()
+        recording = asyncio.create_task(writer.record(records(5)))
+        await asyncio.sleep(0.05)
+        # the writer is stuck on its first insert, so the request waits for queue room
+        assert not recording.done()
+        collection.release.set()
+        await asyncio.wait_for(recording, timeout=5)
+        await writer.stop(timeout=5)
+        return writer, collection
+
+    writer, collection = asyncio.run(scenario())
+    assert collection.documents == records(5)
+    assert (writer.written, writer.dropped) == (5, 0)
+
+
+def test_stop_flushes_queued_records_without_waiting_for_the_interval():
+    async def scenario():
+        collection = FakeCollection()
+        writer = PredictionWriter(policy="drop", batch_size=100, flush_interval=60, collection=collection)
+        await writer.start()
+        await writer.record(records(3))
+        started = time.monotonic()
+        await writer.stop(timeout=5)
+        elapsed = time.monotonic() - started
+        # records arriving after stop() are ignored
+        await writer.record(records(1))
+        return writer, collection, elapsed
+
+    writer, collection, elapsed = asyncio.run(scenario())
+    assert elapsed < 5
+    assert collection.batches == [records(3)]
+    assert writer.stats()["enabled"] is False
+    assert (writer.written, writer.dropped) == (3, 0)
@@ -0,0 +1,30 @@
+import math
+import os
+
+import pytest
+
+from src.constants import SERVING_IMPORT_BUDGET_SECONDS
+from src.utils.startup_profile import check_profile, profile_imports
+
+
+@pytest.fixture(scope="module")
+def app_profile():
+    # profile_imports imports the app in a fresh interpreter, like a cold worker start
+    return profile_imports("app")
+
+
+def test_serving_import_loads_no_forbidden_module(app_profile):
+    assert check_profile(app_profile, budget_seconds=math.inf) == []
+
+
+@pytest.mark.skipif(not os.getenv("CHECK_STARTUP_BUDGET"),
+                    reason="wall clock budget, set CHECK_STARTUP_BUDGET=1 on a quiet machine to check it")
+def test_serving_import_within_budget(app_profile):
+    assert app_profile["seconds"] <= SERVING_IMPORT_BUDGET_SECONDS
+
+
+def test_check_profile_reports_violations():
+    profile = {"seconds": SERVING_IMPORT_BUDGET_SECONDS + 1, "modules": ["app", "sklearn.ensemble"]}
+    violations = check_profile(profile, forbidden_imports=("sklearn",))
+    assert len(violations) == 2
+    assert "sklearn is imported on the serving path" in violations